@@ -0,0 +1,212 @@
+"""
+Benchmark the balancer through the public `src/BCE.py` API.
+
+Two suites are run: the real reactions of `corpus.txt`, and synthetic equations of several
+scales from `generate`. For each suite the report gives the batch throughput of `balanceMany`
+(in this process) and of `verifyBalanced` on its results, the latency of `balanceChemicalEquation` overall and per size bucket
+(number of terms), and the mean and 90th percentile time of each stage from `instrument`.
+Caches are cleared before every pass, so each equation is solved, not looked up. The start up
+time of fresh interpreters is measured last, see `startup`.
+
+The results are compared with a stored baseline; any time more than `--tolerance` slower than
+the baseline is reported as a regression and makes the run exit with status 1.
+
+    python -m benchmarks.bench               # run and compare with benchmarks/baseline.json
+    python -m benchmarks.bench --save        # run and store the results as the new baseline
+
+Baselines are machine specific; save one on the machine the comparisons are run on.
+
+Functions:
+    main(list[string]) -> int
+    runSuite(list[string], int) -> tuple[dict, dict]
+    latencies(list[string], int) -> list[float]
+    batchTime(list[string], int) -> float
+    verifyTime(list[string], int) -> float
+    sizeBucket(string) -> string
+    compareBaseline(dict, dict, float) -> list[string]
+
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from time import perf_counter
+import numpy as np
+import src.BCE as BCE
+from .generate import Scale, syntheticEquations
+from .startup import printStartup, startupTimes
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS = os.path.join(BENCH_DIR, "corpus.txt")
+BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+# Scales of the synthetic suite
+SCALES = [
+    Scale(species=4, elements=3, depth=1, magnitude=10),
+    Scale(species=8, elements=7, depth=2, magnitude=100),
+    Scale(species=16, elements=15, depth=3, magnitude=1000),
+    Scale(species=32, elements=31, depth=3, magnitude=1000),
+]
+STAGES = ["scan", "small", "modular", "matrix", "reduce", "validate", "extract", "wrap"]
+
+def main(argv=None):
+    """
+    Run the benchmarks, print a report and compare it with the baseline.
+
+    Arguments:
+        argv: command line arguments, without the program name; defaults to sys.argv[1:] [list(string)]
+    Return:
+        status: 1 if a time regressed beyond the tolerance, otherwise 0 [int]
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench", description="Benchmark the chemical equation balancer.")
+    parser.add_argument("--count", type=int, default=200, help="synthetic equations per scale (default: 200)")
+    parser.add_argument("--repeat", type=int, default=5, help="passes per measurement; the fastest is kept (default: 5)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic equations (default: 0)")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline file (default: benchmarks/baseline.json)")
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown relative to the baseline, as a fraction (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    with open(CORPUS) as f:
+        corpus = [line.strip() for line in f if line.strip()]
+    synthetic = []
+    for idx, scale in enumerate(SCALES):
+        synthetic += syntheticEquations(args.count, scale, seed=args.seed + idx)
+
+    results = {
+        "config": {"count": args.count, "seed": args.seed, "python": platform.python_version(), "numpy": np.__version__},
+        "metrics": {},
+    }
+    for suite, equations in (("corpus", corpus), ("synthetic", synthetic)):
+        metrics, stages = runSuite(equations, args.repeat)
+        results["metrics"].update({f"{suite}.{name}": value for name, value in metrics.items()})
+        printSuite(suite, len(equations), metrics, stages)
+    startup, numpy_loaded = startupTimes(args.repeat)
+    results["metrics"].update({f"startup.{case}": value for case, value in startup.items()})
+    printStartup(startup, numpy_loaded)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nSaved baseline to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["config"]["count"] != args.count or baseline["config"]["seed"] != args.seed:
+        print("\nWarning: the baseline was run with a different --count or --seed")
+    regressions = compareBaseline(results["metrics"], baseline["metrics"], args.tolerance)
+    print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%} of {args.baseline}")
+    for line in regressions:
+        print("  " + line)
+    return 1 if regressions else 0
+
+def runSuite(equations, repeat):
+    """
+    Measure one suite of equations.
+
+    Arguments:
+        equations: unbalanced chemical equations [list(string)]
+        repeat: passes per measurement [int]
+    Return:
+        metrics: times in seconds, by metric name; lower is better [dict]
+        stages: statistics of each stage over every pass (stage : StageStats) [dict]
+    """
+    metrics = {"batch": batchTime(equations, repeat) / len(equations), "verify": verifyTime(equations, repeat)}
+    with BCE.instrumented() as instruments:
+        times = latencies(equations, repeat)
+    ordered = sorted(times)
+    for q in (50, 90, 99):
+        metrics[f"latency.p{q}"] = ordered[min(len(ordered) - 1, len(ordered) * q // 100)]
+    buckets = {}
+    for equation, elapsed in zip(equations, times):
+        buckets.setdefault(sizeBucket(equation), []).append(elapsed)
+    for bucket, bucket_times in buckets.items():
+        metrics[f"terms {bucket}.p50"] = float(np.median(bucket_times))
+    stages = instruments.snapshot().stages
+    # Stage percentiles are over single calls, not the fastest of several, so only means are compared
+    for stage in STAGES:
+        if stage in stages:
+            metrics[f"stage.{stage}.mean"] = stages[stage].mean
+    return metrics, stages
+
+def latencies(equations, repeat):
+    """Return the fastest time of `balanceChemicalEquation` on each equation over `repeat` passes."""
+    best = [float("inf")] * len(equations)
+    for _ in range(repeat):
+        clearCaches()
+        for idx, equation in enumerate(equations):
+            start = perf_counter()
+            BCE.balanceChemicalEquation(equation)
+            best[idx] = min(best[idx], perf_counter() - start)
+    return best
+
+def batchTime(equations, repeat):
+    """Return the fastest time of `balanceMany` (in this process) on all the equations over `repeat` passes."""
+    best = float("inf")
+    for _ in range(repeat):
+        clearCaches()
+        start = perf_counter()
+        BCE.balanceMany(equations, workers=1)
+        best = min(best, perf_counter() - start)
+    return best
+
+def verifyTime(equations, repeat):
+    """Return the fastest time per balanced equation of `verifyBalanced` on the equations that balance, over `repeat` passes."""
+    pairs = [(outcome.equation, outcome.coefficients) for outcome in BCE.balanceMany(equations, workers=1, arrays=False)
+             if outcome.error is None]
+    best = float("inf")
+    for _ in range(repeat):
+        clearCaches()
+        start = perf_counter()
+        BCE.verifyBalanced(pairs)
+        best = min(best, perf_counter() - start)
+    return best / max(1, len(pairs))
+
+def clearCaches():
+    BCE.result_cache.clear()
+    BCE.species_cache.clear()
+
+def sizeBucket(equation):
+    """Return the size bucket of an equation: its number of terms, rounded down to a power of two."""
+    terms = equation.count("+") + 2
+    low = 1 << (terms.bit_length() - 1)
+    return f"{low}-{2 * low - 1}"
+
+def compareBaseline(metrics, baseline, tolerance):
+    """
+    List the metrics that are slower than the baseline by more than `tolerance`.
+
+    Arguments:
+        metrics: current times, by metric name [dict]
+        baseline: baseline times, by metric name [dict]
+        tolerance: allowed slowdown, as a fraction of the baseline time [float]
+    Return:
+        regressions: one description per slower metric [list(string)]
+    """
+    regressions = []
+    for name, value in sorted(metrics.items()):
+        base = baseline.get(name)
+        if base and value > base * (1 + tolerance):
+            regressions.append(f"{name}: {value * 1e6:.1f} us vs {base * 1e6:.1f} us (+{value / base - 1:.0%})")
+    return regressions
+
+def printSuite(suite, size, metrics, stages):
+    """Print the report of one suite."""
+    print(f"\n{suite}: {size} equations")
+    print(f"  balanceMany          {1 / metrics['batch']:10.0f} eq/s")
+    print(f"  verifyBalanced       {1 / metrics['verify']:10.0f} eq/s")
+    print("  latency              " + "  ".join(f"p{q} {metrics[f'latency.p{q}'] * 1e6:8.1f} us" for q in (50, 90, 99)))
+    for name in sorted((name for name in metrics if name.startswith("terms ")), key=lambda name: int(name[6:].split("-")[0])):
+        print(f"  {name[:-4]:<20} p50 {metrics[name] * 1e6:8.1f} us")
+    for stage in STAGES:
+        if stage in stages:
+            print(f"  stage {stage:<14} mean {stages[stage].mean * 1e6:7.1f} us  p90 {stages[stage].p90 * 1e6:7.1f} us")
+
+if __name__ == "__main__":
+    sys.exit(main())
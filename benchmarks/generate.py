@@ -0,0 +1,150 @@
+"""
+Generate valid chemical equations of a given scale for benchmarking.
+
+Equations are built backwards from their solution: random positive coefficients and reactant
+compositions are drawn, the products are drawn to fit the reactant atom totals, and the last
+product takes whatever atoms remain. The compositions are arranged so that the solution is
+unique (see `drawCompositions`), so every generated equation balances. The same seed always
+yields the same equations.
+
+Elements are named A, B, ..., Z, Aa, Ab, ... so that any number of them is available.
+
+Classes:
+    Scale(int, int, int, int) -> namedtuple
+
+Functions:
+    syntheticEquations(int, Scale, int) -> list[string]
+    syntheticEquation(Random, Scale) -> string
+    drawCompositions(Random, int, int, int) -> tuple[list, list]
+    renderFormula(dict, int, Random) -> string
+    elementSymbols(int) -> list[string]
+
+"""
+import random
+import string
+from collections import namedtuple
+from math import gcd
+
+# Size of a generated equation:
+#     species : number of terms, reactants and products together
+#     elements : number of distinct elements; at least species - 1 for a unique solution
+#     depth : greatest nesting depth of parenthesized groups
+#     magnitude : largest balancing coefficient drawn (minimal coefficients may be smaller)
+Scale = namedtuple("Scale", ["species", "elements", "depth", "magnitude"])
+
+# Largest atom count of an element drawn for a term
+MAX_COUNT = 6
+
+def syntheticEquations(count, scale, seed=0):
+    """
+    Generate equations of one scale.
+
+    Arguments:
+        count: number of equations [int]
+        scale: size of every equation [Scale]
+        seed: seed of the random draws [int]
+    Return:
+        equations: unbalanced chemical equations [list(string)]
+    """
+    rng = random.Random(seed)
+    return [syntheticEquation(rng, scale) for _ in range(count)]
+
+def syntheticEquation(rng, scale):
+    """
+    Generate one equation with a unique balancing solution.
+
+    Arguments:
+        rng: source of the random draws [random.Random]
+        scale: size of the equation [Scale]
+    Return:
+        equation: unbalanced chemical equation [string]
+    Raises:
+        ValueError: if the scale cannot have a unique solution
+    """
+    species, elements, depth, magnitude = scale
+    if species < 2 or elements < species - 1 or magnitude < 1:
+        raise ValueError(f"no equation of {scale} has a unique solution")
+    symbols = elementSymbols(elements)
+    sides = drawCompositions(rng, species, elements, magnitude)
+    formulas = [[renderFormula(dict(zip(symbols, comp)), depth, rng) for comp in side] for side in sides]
+    return " + ".join(formulas[0]) + " : " + " + ".join(formulas[1])
+
+def drawCompositions(rng, species, elements, magnitude):
+    """
+    Draw atom counts of reactants and products that balance with a unique solution.
+
+    Every term but the last product owns one element: a reactant's is shared only with the
+    last product, a product's only with one reactant and the last product. Leaving out the
+    last product, the system matrix is then triangular with a non zero diagonal, so its rank
+    is one less than the number of terms. The remaining elements are spread at random.
+
+    Return:
+        sides: atom counts of each term, one list of length `elements` per term [tuple(list, list)]
+    """
+    n_reactants = rng.randint(1, species - 1)
+    n_products = species - n_reactants
+    owned = species - 1
+    reactants = [[0] * elements for _ in range(n_reactants)]
+    products = [[0] * elements for _ in range(n_products)]
+    react_coefs = [rng.randint(1, magnitude) for _ in range(n_reactants)]
+    prod_coefs = [rng.randint(1, magnitude) for _ in range(n_products - 1)]
+    for idx, comp in enumerate(reactants):
+        comp[idx] = rng.randint(1, MAX_COUNT)
+    for idx, comp in enumerate(products[:-1]):
+        el = n_reactants + idx
+        comp[el] = rng.randint(1, MAX_COUNT)
+        # Supply it from one reactant, leaving some over for the last product
+        src = rng.randrange(n_reactants)
+        need = prod_coefs[idx] * comp[el]
+        reactants[src][el] = -(-need // react_coefs[src]) + rng.randint(0, MAX_COUNT)
+    # Unowned elements are in some reactants and shared among the products
+    for el in range(owned, elements):
+        for src in rng.sample(range(n_reactants), rng.randint(1, min(n_reactants, 2))):
+            reactants[src][el] = rng.randint(1, MAX_COUNT)
+    totals = [sum(coef * comp[el] for coef, comp in zip(react_coefs, reactants)) for el in range(elements)]
+    for el in range(owned, elements):
+        for idx, coef in enumerate(prod_coefs):
+            if rng.random() < 0.5:
+                products[idx][el] = rng.randint(0, totals[el] // (coef * n_products))
+                totals[el] -= coef * products[idx][el]
+    for idx, coef in enumerate(prod_coefs):
+        totals[n_reactants + idx] -= coef * products[idx][n_reactants + idx]
+    # The last product is the remainder, divided by its coefficient
+    coef = 0
+    for total in totals:
+        coef = gcd(coef, total)
+    products[-1] = [total // coef for total in totals]
+    return reactants, products
+
+def renderFormula(composition, depth, rng):
+    """
+    Write atom counts as a formula, factoring some of them into nested groups.
+
+    Arguments:
+        composition: atom counts (element : count); zero counts are left out [dict]
+        depth: greatest nesting depth of groups [int]
+        rng: source of the random draws [random.Random]
+    Return:
+        formula: a term whose atom counts are `composition` [string]
+    """
+    composition = {el: ct for el, ct in composition.items() if ct}
+    group = {}
+    mult = rng.randint(2, 4)
+    if depth > 0:
+        group = {el: ct // mult for el, ct in composition.items() if ct >= mult and rng.random() < 0.6}
+    formula = ""
+    for el, ct in composition.items():
+        ct -= group.get(el, 0) * mult
+        if ct:
+            formula += el + (str(ct) if ct > 1 else "")
+    if group:
+        formula += "(" + renderFormula(group, depth - 1, rng) + ")" + str(mult)
+    return formula
+
+def elementSymbols(count):
+    """Return `count` distinct element symbols: A to Z, then Aa to Zz."""
+    symbols = list(string.ascii_uppercase)
+    symbols += [upper + lower for upper in string.ascii_uppercase for lower in string.ascii_lowercase]
+    if count > len(symbols):
+        raise ValueError(f"at most {len(symbols)} elements are available")
+    return symbols[:count]
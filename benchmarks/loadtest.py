@@ -0,0 +1,164 @@
+"""
+Load test the balancing service of `src/server.py`.
+
+Clients open connections and keep a fixed number of requests in flight on each, drawing
+equations from `corpus.txt` with a skewed popularity (a few reactions are asked for far more
+often than the rest, as in a busy service) mixed with synthetic equations that are each asked
+for once. The report gives the request throughput, the latency percentiles seen by clients, and
+how many requests the service coalesced and how full its batches were.
+
+By default a service is started in this process on a free port; `--connect` or `--unix` load
+an already running one instead, e.g. started with `python -m src.server`.
+
+    python -m benchmarks.loadtest --clients 32 --requests 200
+    python -m benchmarks.loadtest --batch-size 1          # without batching, for comparison
+
+Functions:
+    main(list[string]) -> int
+    loadTest(Namespace, list[string]) -> int
+    connector(callable, *args) -> callable
+    runLoad(callable, list[string], int, int, int) -> list[float]
+    drawRequests(list[string], list[string], int, int) -> list[string]
+
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+from time import perf_counter
+from src.server import BalanceService, startServer
+from .bench import CORPUS
+from .generate import Scale, syntheticEquations
+
+def main(argv=None):
+    """
+    Run a load test and print its report.
+
+    Arguments:
+        argv: command line arguments, without the program name; defaults to sys.argv[1:] [list(string)]
+    Return:
+        status: 1 if some request was not answered, otherwise 0 [int]
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description="Load test the balancing service.")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent connections (default 32)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per connection (default 200)")
+    parser.add_argument("--pipeline", type=int, default=1, help="requests in flight per connection (default 1)")
+    parser.add_argument("--unique", type=float, default=0.2,
+                        help="fraction of requests for synthetic equations asked for once (default 0.2)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the request mix (default 0)")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="load a running service over TCP")
+    parser.add_argument("--unix", metavar="PATH", help="load a running service over a Unix socket")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="processes of the in-process service; 0 uses every core")
+    parser.add_argument("--batch-size", type=int, default=64, help="batch size of the in-process service")
+    parser.add_argument("--batch-latency", type=float, default=2.0, help="batch latency of the in-process service, in milliseconds")
+    args = parser.parse_args(argv)
+
+    with open(CORPUS) as f:
+        corpus = [line.strip() for line in f if line.strip()]
+    total = args.clients * args.requests
+    unique = syntheticEquations(int(total * args.unique), Scale(species=8, elements=7, depth=2, magnitude=100), seed=args.seed)
+    equations = drawRequests(corpus, unique, total, args.seed)
+    return asyncio.run(loadTest(args, equations))
+
+async def loadTest(args, equations):
+    """Run the load test of `main` in an event loop."""
+    service, server = None, None
+    if args.unix:
+        connect = connector(asyncio.open_unix_connection, path=args.unix)
+    elif args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        connect = connector(asyncio.open_connection, host, int(port))
+    else:
+        service = BalanceService(args.workers or None, args.batch_size, args.batch_latency / 1000)
+        server = await startServer(service, "127.0.0.1", 0)
+        connect = connector(asyncio.open_connection, *server.sockets[0].getsockname()[:2])
+    start = perf_counter()
+    latencies = await runLoad(connect, equations, args.clients, args.requests, args.pipeline)
+    elapsed = perf_counter() - start
+    if server is not None:
+        server.close()
+        await service.close()
+
+    answered = sorted(latency for latency in latencies if latency is not None)
+    print(f"{len(answered)}/{len(latencies)} requests answered in {elapsed:.2f} s: {len(answered) / elapsed:.0f} req/s")
+    if answered:
+        print("  latency  " + "  ".join(f"p{q} {answered[min(len(answered) - 1, len(answered) * q // 100)] * 1e3:7.2f} ms"
+                                        for q in (50, 90, 99)))
+    if service is not None:
+        info = service.info()
+        print(f"  coalesced {info.coalesced / max(1, info.requests):.0%} of requests, "
+              f"{info.batches} batches of {info.equations / max(1, info.batches):.1f} equations on average")
+    return 0 if len(answered) == len(latencies) else 1
+
+def connector(open_connection, *args, **kwargs):
+    """Return a coroutine function opening a connection with the given arguments."""
+    return lambda: open_connection(*args, limit=2**20, **kwargs)
+
+async def runLoad(connect, equations, clients, requests, pipeline):
+    """
+    Send the requests over concurrent connections and time each of them.
+
+    Arguments:
+        connect: coroutine function returning a (reader, writer) pair [callable]
+        equations: equation of each request, `requests` per client [list(string)]
+        clients: number of connections [int]
+        requests: requests sent on each connection [int]
+        pipeline: requests in flight per connection [int]
+    Return:
+        latencies: seconds from sending each request to its reply, None if unanswered [list(float)]
+    """
+    latencies = [None] * len(equations)
+
+    async def client(first):
+        reader, writer = await connect()
+        sent, window = {}, asyncio.Semaphore(pipeline)
+
+        async def receive():
+            for _ in range(requests):
+                line = await reader.readline()
+                if not line:
+                    return
+                request_id = json.loads(line)["id"]
+                latencies[request_id] = perf_counter() - sent.pop(request_id)
+                window.release()
+
+        receiver = asyncio.create_task(receive())
+        for request_id in range(first, first + requests):
+            await window.acquire()
+            if receiver.done():
+                break
+            sent[request_id] = perf_counter()
+            writer.write(json.dumps({"id": request_id, "equation": equations[request_id]}).encode() + b"\n")
+            await writer.drain()
+        await receiver
+        writer.close()
+        await writer.wait_closed()
+
+    await asyncio.gather(*(client(idx * requests) for idx in range(clients)))
+    return latencies
+
+def drawRequests(popular, unique, count, seed=0):
+    """
+    Draw the equations of `count` requests.
+
+    Popular equations are drawn with weights 1, 1/2, 1/3, ... in their order, and each unique
+    one is used once, at a random position.
+
+    Arguments:
+        popular: equations asked for repeatedly [list(string)]
+        unique: equations asked for once [list(string)]
+        count: number of requests [int]
+        seed: seed of the draws [int]
+    Return:
+        equations: equation of each request [list(string)]
+    """
+    rng = random.Random(seed)
+    unique = unique[:count]
+    weights = [1 / (rank + 1) for rank in range(len(popular))]
+    equations = rng.choices(popular, weights, k=count - len(unique)) + list(unique)
+    rng.shuffle(equations)
+    return equations
+
+if __name__ == "__main__":
+    sys.exit(main())
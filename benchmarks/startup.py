@@ -0,0 +1,97 @@
+"""
+Benchmark the start up of the balancer in fresh interpreters.
+
+Each case runs in a new `python` process, so nothing is imported or cached beforehand, and is
+timed from launch to exit; the time of a bare interpreter is measured the same way and
+subtracted. The report also tells whether each case imported NumPy, which the balancer only
+needs for large equations and coefficient arrays.
+
+    python -m benchmarks.startup
+    python -X importtime -c "import src.BCE"      # where the import time goes
+
+Functions:
+    main(list[string]) -> int
+    startupTimes(int) -> tuple[dict, dict]
+    runCase(string, string, int) -> tuple[float, boolean]
+
+"""
+import argparse
+import os
+import subprocess
+import sys
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Code run by each case (name : (code, stdin)); each prints whether NumPy was imported
+CASES = {
+    "python": ("pass", None),
+    "import": ("import src.BCE", None),
+    "balance": ("import src.BCE as BCE; BCE.balanceChemicalEquation('C3H8 + O2 : CO2 + H2O')", None),
+    "cli": ("import src.cli as cli; cli.main([])", "C3H8 + O2 : CO2 + H2O\n"),
+}
+REPORT_NUMPY = "; import sys; print('numpy' in sys.modules, file=sys.stderr)"
+
+def main(argv=None):
+    """
+    Time the start up cases and print a report.
+
+    Arguments:
+        argv: command line arguments, without the program name; defaults to sys.argv[1:] [list(string)]
+    Return:
+        status: 0 [int]
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description="Benchmark the start up of the balancer.")
+    parser.add_argument("--repeat", type=int, default=10, help="runs of each case; the fastest is kept (default: 10)")
+    args = parser.parse_args(argv)
+    metrics, numpy_loaded = startupTimes(args.repeat)
+    printStartup(metrics, numpy_loaded)
+    return 0
+
+def startupTimes(repeat):
+    """
+    Time each case of `CASES` in fresh interpreters.
+
+    Arguments:
+        repeat: runs of each case [int]
+    Return:
+        metrics: fastest time of each case in seconds, less that of a bare interpreter [dict]
+        numpy_loaded: whether each case imported NumPy (case : boolean) [dict]
+    """
+    times, numpy_loaded = {}, {}
+    for case, (code, stdin) in CASES.items():
+        times[case], numpy_loaded[case] = runCase(code, stdin, repeat)
+    # Keep only what the balancer adds to the start up of the interpreter
+    metrics = {case: max(0.0, elapsed - times["python"]) for case, elapsed in times.items() if case != "python"}
+    del numpy_loaded["python"]
+    return metrics, numpy_loaded
+
+def runCase(code, stdin, repeat):
+    """
+    Run `code` in `repeat` fresh interpreters from the repository root.
+
+    Arguments:
+        code: Python code run with `python -c` [string]
+        stdin: input of the process [string]
+        repeat: number of runs [int]
+    Return:
+        elapsed: fastest time from launch to exit, in seconds [float]
+        numpy_loaded: whether the code imported NumPy [boolean]
+    """
+    best, loaded = float("inf"), False
+    for _ in range(repeat):
+        start = perf_counter()
+        proc = subprocess.run([sys.executable, "-c", code + REPORT_NUMPY], input=stdin, cwd=ROOT,
+                              capture_output=True, text=True, check=True)
+        best = min(best, perf_counter() - start)
+        loaded = proc.stderr.strip().splitlines()[-1] == "True"
+    return best, loaded
+
+def printStartup(metrics, numpy_loaded):
+    """Print the report of the start up cases."""
+    print("\nstartup: fresh interpreters, less a bare one")
+    for case, elapsed in metrics.items():
+        print(f"  {case:<20} {elapsed * 1e3:8.1f} ms  {'imports' if numpy_loaded[case] else 'without'} NumPy")
+
+if __name__ == "__main__":
+    sys.exit(main())
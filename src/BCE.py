@@ -6,8 +6,15 @@ Balance a chemical equation.
 Equations must contain exactly one reaction. All atoms must be present on both reactant and product sides of the equation.
 
 """
+import os
+from collections import deque, namedtuple
 from .methods import *
 
+# Result of balancing one equation of a batch; `error` is None on success
+BalanceOutcome = namedtuple("BalanceOutcome", ["index", "equation", "coefficients", "balanced", "error"])
+# Reason an equation of a batch was not balanced; `kind` is the exception class name
+BalanceFailure = namedtuple("BalanceFailure", ["kind", "message"])
+
 def balanceChemicalEquation(equation):
     """
     Balance a chemical equation.
@@ -18,15 +25,13 @@ def balanceChemicalEquation(equation):
         equation: unbalanced chemical equation [string]
     Return:
         balanced_equation: balanced chemical equation [string]
+    Raises:
+        BalancingError: if the equation is invalid or beyond the complexity limits, does not have a unique
+            solution, or takes longer than the time limit to solve (see `setLimits`)
     """
-    # Find coefficients
-    coefficients = findBalancingCoefficients(equation)
-    # Construct system matrix
-    sides_terms = processEquation(equation)[0]
-    # Inefficiency to address: lines 21 and 23 both call `processEquation(equation)`
-    # Rewrite equation
-    bal_eq = wrapSolvedEquation(sides_terms, coefficients)
-    return bal_eq
+    result = BalanceResult(equation)
+    traceResult(result)
+    return result.balanced
 
 def solutionCoefficients(equation):
     """
@@ -38,15 +43,13 @@ def solutionCoefficients(equation):
         equation: unbalanced chemical equation [string]
     Return:
         balanced_equation (dict) Solution information (term : coefficient)
+    Raises:
+        BalancingError: if the equation is invalid or beyond the complexity limits, does not have a unique
+            solution, or takes longer than the time limit to solve (see `setLimits`)
     """
-    # Find coefficients
-    coefficients = findBalancingCoefficients(equation)
-    # Construct system matrix
-    sides_terms = processEquation(equation)[0]
-    # Inefficiency to address: lines 21 and 23 both call `processEquation(equation)`
-    # Rewrite equation
-    bal_eq = getCoefficients(sides_terms, coefficients)
-    return bal_eq
+    result = BalanceResult(equation)
+    traceResult(result)
+    return result.solution
 
 
 def findBalancingCoefficients(equation):
@@ -59,22 +62,46 @@ def findBalancingCoefficients(equation):
         equation: unbalanced chemical equation [string]
     Return:
         coefficients: list of balancing coefficients [ndarray(int32)]
+    Raises:
+        BalancingError: if the equation is invalid or beyond the complexity limits, does not have a unique
+            solution, or takes longer than the time limit to solve (see `setLimits`)
+    """
+    result = BalanceResult(equation)
+    traceResult(result)
+    return result.coefficients
+
+def balanceNetwork(equations):
     """
-    # Catch illegal expressions
-    if not validateChemicalEquation(equation):
-        return 0
-    # Construct system matrix
-    equation_units = processEquation(equation)
-    mat = equationToMatrix(equation_units)
-    # Reduce system matrix
-    dr_mat = diophantineRowReduce(mat)
-    dr_mat = removeZeroRows(dr_mat)
-    # Validate result
-    if not validateDRMat(dr_mat):
-        return 1
-    # Extract solution
-    coefficients = extract_smallest_solution(dr_mat)
-    return coefficients
+    Balance every reaction of a reaction network.
+
+    The species of the network are indexed and parsed once, however many reactions they
+    appear in; see `ReactionNetwork`.
+
+    Arguments:
+        equations: unbalanced chemical equations [iterable(string)]
+    Return:
+        outcomes: one outcome per equation, in input order [list(BalanceOutcome)]
+    """
+    equations = list(equations)
+    outcomes = [None] * len(equations)
+    valid = []
+    for idx, equation in enumerate(equations):
+        error = equationError(equation)
+        if error is None:
+            valid.append(idx)
+        else:
+            failure = BalanceFailure(type(error).__name__, str(error))
+            outcomes[idx] = BalanceOutcome(idx, equation, None, None, failure)
+    network = ReactionNetwork([equations[idx] for idx in valid], validate=False)
+    for reaction, idx in enumerate(valid):
+        try:
+            coefficients = network.balance(reaction)
+            balanced = wrapSolvedEquation(network.sidesTerms(reaction), coefficients)
+            outcomes[idx] = BalanceOutcome(idx, equations[idx], coefficients, balanced, None)
+        except Exception as err:
+            failure = BalanceFailure(type(err).__name__, str(err))
+            outcomes[idx] = BalanceOutcome(idx, equations[idx], None, None, failure)
+    return outcomes
 
 def writeBCESteps(equation, wrap=True):
     """
@@ -87,34 +114,140 @@ def writeBCESteps(equation, wrap=True):
         wrap: a switch to include the balanced chemical equation, in addition to the coefficients [boolean]
     Return:
         text : address to text file [string]
+    Raises:
+        InvalidEquationError: if the equation is invalid or beyond the complexity limits
+        UnsolvableEquationError: if the equation does not have a unique solution
     """
+    result = BalanceResult(equation, memo=False)
     with open('BCESteps.txt', 'w') as f:
         # Catch illegal expressions
-        if not validateChemicalEquation(equation):
-            return 0
-        f.write(f"Equation\n{equation}\n")
-        # Construct system matrix
-        equation_units = processEquation(equation)
-        mat = equationToMatrix(equation_units)
-        f.write(f"Matrix\n{mat}\n")
-        # Reduce system matrix
-        dr_mat = diophantineRowReduce(mat)
-        f.write(f"Reduced Matrix\n{dr_mat}\n")
-        dr_mat = removeZeroRows(dr_mat)
-        # Validate result
-        if not validateDRMat(dr_mat):
-            raise "Invalid"
-            return 1
-        # Extract solution
-        coefficients = extract_smallest_solution(dr_mat)
-        f.write(f"Coefficients\n{coefficients}\n")
-        if wrap:
-            # Inefficiency to address: Lines 85 and 81 both call `processEquation(equation)`
-            bal_eq = wrapSolvedEquation(equation_units[0], coefficients)
-            f.write(f"Balanced Equation\n{bal_eq}\n")
+        result.scanned
+        step_trace = stepTrace(result)
+        TextSink(f, wrap=wrap).record(step_trace)
+        if step_trace.error is not None:
+            raise UnsolvableEquationError(step_trace.error)
         return f.name
 
 
+def balanceMany(equations, workers=None, chunksize=256, arrays=True):
+    """
+    Balance many chemical equations, spreading the work over a pool of processes.
+
+    Arguments:
+        equations: unbalanced chemical equations [iterable(string)]
+        workers: number of processes; None uses every core, 1 balances in this process [int]
+        chunksize: number of equations sent to a process at a time [int]
+        arrays: give coefficients as ndarrays rather than lists of ints, see `balanceChunk` [boolean]
+    Return:
+        outcomes: one outcome per equation, in input order [list(BalanceOutcome)]
+    """
+    return list(iterBalance(equations, workers=workers, chunksize=chunksize, arrays=arrays))
+
+def iterBalance(equations, workers=None, chunksize=256, ordered=True, arrays=True):
+    """
+    Lazily balance a stream of chemical equations over a pool of processes.
+
+    At most a few chunks per process are read ahead of the caller, so arbitrarily long
+    streams are balanced in bounded memory. An equation that cannot be balanced yields an
+    outcome whose `error` describes the failure instead of stopping the stream.
+
+    Arguments:
+        equations: unbalanced chemical equations [iterable(string)]
+        workers: number of processes; None uses every core, 1 balances in this process [int]
+        chunksize: number of equations sent to a process at a time [int]
+        ordered: yield outcomes in input order, rather than as soon as they are ready [boolean]
+        arrays: give coefficients as ndarrays rather than lists of ints, see `balanceChunk` [boolean]
+    Return:
+        outcomes: one outcome per equation, each carrying its input `index` [iterator(BalanceOutcome)]
+    """
+    chunks = chunkEquations(equations, chunksize)
+    if workers == 1:
+        for start, chunk in chunks:
+            yield from balanceChunk(start, chunk, arrays)
+        return
+    # Imported here: concurrent.futures takes a while to import, and is not needed with one worker
+    from concurrent.futures import ProcessPoolExecutor
+    window = 4 * (workers or os.cpu_count() or 1)
+    # Workers look terms up in the same species table and persistent cache, opened from the same files, under the same limits
+    initargs = (getSpeciesTable(), getLimits(), getPersistentCache())
+    with ProcessPoolExecutor(max_workers=workers, initializer=initWorker, initargs=initargs) as pool:
+        pending = deque()
+        for start, chunk in chunks:
+            pending.append(pool.submit(balanceChunk, start, chunk, arrays))
+            if len(pending) >= window:
+                yield from collectChunks(pending, ordered)
+        while pending:
+            yield from collectChunks(pending, ordered)
+
+def initWorker(table, limits, cache=None):
+    """Set the species table, complexity limits and persistent cache of a worker process to those of the process that started it."""
+    setSpeciesTable(table)
+    setLimits(limits)
+    setPersistentCache(cache)
+
+def collectChunks(pending, ordered):
+    """
+    Wait for submitted chunks and remove them from `pending`.
+
+    Arguments:
+        pending: futures of submitted chunks, oldest first [deque(Future)]
+        ordered: collect the oldest chunk, rather than any finished ones [boolean]
+    Return:
+        outcomes: outcomes of the collected chunks [list(BalanceOutcome)]
+    """
+    if ordered:
+        return pending.popleft().result()
+    from concurrent.futures import wait, FIRST_COMPLETED
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    outcomes = []
+    for future in done:
+        pending.remove(future)
+        outcomes += future.result()
+    return outcomes
+
+def chunkEquations(equations, chunksize):
+    """Group a stream of equations into (index of first equation, list of equations) pairs."""
+    if chunksize < 1:
+        raise ValueError("chunksize must be positive")
+    chunk, start = [], 0
+    for equation in equations:
+        chunk.append(equation)
+        if len(chunk) == chunksize:
+            yield start, chunk
+            start += chunksize
+            chunk = []
+    if chunk:
+        yield start, chunk
+
+def balanceChunk(start, equations, arrays=True):
+    """
+    Balance a list of equations, recording failures instead of raising them.
+
+    With `arrays` False, coefficients are lists of ints, and a few small equations are
+    balanced without importing NumPy (see `BalanceResult`).
+
+    Arguments:
+        start: index of the first equation in the whole batch [int]
+        equations: unbalanced chemical equations [list(string)]
+        arrays: give coefficients as ndarrays rather than lists of ints [boolean]
+    Return:
+        outcomes: one outcome per equation [list(BalanceOutcome)]
+    """
+    outcomes = []
+    for idx, result in enumerate(balanceResults(equations), start):
+        traceResult(result)
+        try:
+            coefficients = result.coefficients if arrays else result.values
+            outcomes.append(BalanceOutcome(idx, result.equation, coefficients, result.balanced, None))
+        except Exception as err:
+            failure = BalanceFailure(type(err).__name__, str(err))
+            outcomes.append(BalanceOutcome(idx, result.equation, None, None, failure))
+    # Solutions held back for the persistent cache are written once per chunk, see `PersistentCache`
+    cache = getPersistentCache()
+    if cache is not None:
+        cache.flush()
+    return outcomes
+
 if __name__ =="__main__":
 
     
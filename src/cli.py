@@ -0,0 +1,178 @@
+"""
+Command line balancer
+
+Balance chemical equations read one per line from files or stdin, writing each result as it
+is ready. Memory use does not grow with the input, so arbitrarily large dumps can be piped
+through it.
+
+    python -m src.cli reactions.txt --format jsonl --errors annotate --workers 0 > balanced.jsonl
+
+Functions:
+    main(list[string]) -> int
+    balanceFiles(Namespace, list[file], file) -> int
+    openFiles(ArgumentParser, list[string], string, ExitStack) -> tuple[list[file], file]
+    readEquations(iterable[file], dict) -> iterator[string]
+    writeOutcome(BalanceOutcome, string, StringIO, csv.writer) -> None
+
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import sys
+from . import BCE
+
+FORMATS = ["text", "csv", "jsonl"]
+ERROR_MODES = ["skip", "annotate", "fail"]
+CSV_HEADER = ["index", "equation", "balanced", "coefficients", "error_kind", "error_message"]
+
+def main(argv=None):
+    """
+    Run the command line balancer.
+
+    Arguments:
+        argv: command line arguments, without the program name; defaults to sys.argv[1:] [list(string)]
+    Return:
+        status: 0 on success, 1 if an equation failed with `--errors fail` [int]
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Balance chemical equations, one per line.")
+    parser.add_argument("files", nargs="*", default=["-"], help="files of equations; reads stdin if omitted or '-'")
+    parser.add_argument("-o", "--output", default="-", help="file to write to; defaults to stdout")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="text",
+                        help="text: balanced equations; csv or jsonl: one record per equation")
+    parser.add_argument("-e", "--errors", choices=ERROR_MODES, default="annotate",
+                        help="skip: omit equations that cannot be balanced; annotate: write the error in their place; "
+                             "fail: stop at the first one")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of processes; 0 uses every core (default 1)")
+    parser.add_argument("--chunksize", type=int, default=256, help="equations sent to a process at a time")
+    parser.add_argument("--unordered", action="store_true",
+                        help="write results as they finish rather than in input order (with --workers)")
+    parser.add_argument("--buffer", type=int, default=1024, help="records written to the output at a time")
+    parser.add_argument("--cache", metavar="PATH", help="keep solved equations in a SQLite file shared by every run and worker")
+    args = parser.parse_args(argv)
+    with contextlib.ExitStack() as stack:
+        files, out = openFiles(parser, args.files, args.output, stack)
+        if args.cache:
+            BCE.setPersistentCache(BCE.PersistentCache(args.cache))
+        return balanceFiles(args, files, out)
+
+def balanceFiles(args, files, out):
+    """
+    Balance the equations in open files and write the results, see `main`.
+
+    Arguments:
+        args: parsed command line arguments [argparse.Namespace]
+        files: open files of equations [list(file)]
+        out: open file to write to [file]
+    Return:
+        status: 0 on success, 1 if an equation failed with `--errors fail` [int]
+    """
+    # Records are rendered into `pending` and written to `out` in bulk
+    pending = io.StringIO()
+    csv_writer = csv.writer(pending, lineterminator="\n")
+    if args.format == "csv":
+        csv_writer.writerow(CSV_HEADER)
+    buffered = 0
+
+    # File and line of each equation sent and not yet written (index : (name, line number))
+    locations = {}
+    outcomes = BCE.iterBalance(readEquations(files, locations), workers=args.workers or None,
+                               chunksize=args.chunksize, ordered=not args.unordered, arrays=False)
+    status = 0
+    for outcome in outcomes:
+        name, lineno = locations.pop(outcome.index)
+        if outcome.error is not None:
+            if args.errors == "skip":
+                continue
+            if args.errors == "fail":
+                print(f"{name}, line {lineno} '{outcome.equation}': {outcome.error.message}", file=sys.stderr)
+                status = 1
+                break
+        writeOutcome(outcome, args.format, pending, csv_writer)
+        buffered += 1
+        if buffered >= args.buffer:
+            out.write(pending.getvalue())
+            pending.seek(0)
+            pending.truncate()
+            buffered = 0
+    out.write(pending.getvalue())
+    out.flush()
+    return status
+
+def openFiles(parser, paths, output, stack):
+    """
+    Open the input files and the output file, closing them when `stack` is closed.
+
+    '-' stands for stdin or stdout, which are left open. A file that cannot be opened is reported as
+    a usage error, as argparse does.
+
+    Arguments:
+        parser: the command line parser [ArgumentParser]
+        paths: paths of the files of equations [list(string)]
+        output: path of the file to write to [string]
+        stack: context of the command [ExitStack]
+    Return:
+        files: the files of equations, and the file to write to [tuple(list(file), file)]
+    """
+    files = []
+    try:
+        for path in paths:
+            files.append(sys.stdin if path == "-" else stack.enter_context(open(path)))
+        out = sys.stdout if output == "-" else stack.enter_context(open(output, "w"))
+    except OSError as err:
+        parser.error(f"can't open '{err.filename}': {err.strerror}")
+    return files, out
+
+def readEquations(files, locations=None):
+    """
+    Yield the equations in a sequence of open files, one per non-blank line.
+
+    Arguments:
+        files: open text files [iterable(file)]
+        locations: if given, where the file name and line number of each equation are recorded,
+            under its index (index : (name, line number)) [dict]
+    Return:
+        equations: stripped equation strings [iterator(string)]
+    """
+    index = 0
+    for f in files:
+        name = getattr(f, "name", "<stdin>")
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if line:
+                if locations is not None:
+                    locations[index] = (name, lineno)
+                index += 1
+                yield line
+
+def writeOutcome(outcome, fmt, buffer, csv_writer):
+    """
+    Render one outcome as a line of output.
+
+    Arguments:
+        outcome: result of balancing an equation [BalanceOutcome]
+        fmt: one of FORMATS [string]
+        buffer: where the line is written [StringIO]
+        csv_writer: csv writer over `buffer` [csv.writer]
+    """
+    error = outcome.error
+    coefficients = None if outcome.coefficients is None else [int(c) for c in outcome.coefficients]
+    if fmt == "text":
+        if error is None:
+            buffer.write(outcome.balanced + "\n")
+        else:
+            buffer.write(f"{outcome.equation}\t{error.kind}: {error.message}\n")
+    elif fmt == "jsonl":
+        record = {"index": outcome.index, "equation": outcome.equation, "balanced": outcome.balanced,
+                  "coefficients": coefficients, "error": None if error is None else error._asdict()}
+        buffer.write(json.dumps(record) + "\n")
+    else:
+        csv_writer.writerow([
+            outcome.index, outcome.equation, outcome.balanced or "",
+            "" if coefficients is None else " ".join(map(str, coefficients)),
+            "" if error is None else error.kind, "" if error is None else error.message])
+
+if __name__ == "__main__":
+    sys.exit(main())
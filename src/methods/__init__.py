@@ -1,6 +1,25 @@
+from .cache import *
+from .persistentCache import *
+from .canonicalEquation import *
+from .scanEquation import *
+from .errors import *
+from .limits import *
+from .precision import *
+from .species import *
+from .speciesTable import *
 from .constructSystemMatrix import *
 from .extractSolution import *
 from .rowReduceEchelonDiophantine import *
 from .validateChemEq import *
 from .validateRREDMatrix import *
-from .wrapSolution import *
\ No newline at end of file
+from .verifyBalanced import *
+from .smallSolver import *
+from .modularSolver import *
+from .solveSystem import *
+from .batchedSolver import *
+from .balanceResult import *
+from .balanceSession import *
+from .trace import *
+from .instrument import *
+from .reactionNetwork import *
+from .wrapSolution import *
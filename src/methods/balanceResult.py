@@ -0,0 +1,321 @@
+"""
+Balance a chemical equation in stages, computing each stage once.
+
+Classes:
+    BalanceResult(string) -> BalanceResult
+
+Functions:
+    balanceResults(list[string]) -> list[BalanceResult]
+    setPersistentCache(PersistentCache) -> None
+    getPersistentCache() -> PersistentCache | None
+
+"""
+from functools import cached_property
+from .cache import LRUCache
+from .canonicalEquation import canonicalizeEquation, toCanonicalOrder, fromCanonicalOrder
+from .constructSystemMatrix import speciesToMatrix
+from .batchedSolver import solveSystemMatrices
+from .errors import BalancingCancelledError, BalancingTimeoutError, ComplexityError, InvalidEquationError, UnsolvableEquationError
+from .extractSolution import extract_smallest_solution, removeZeroRows
+from .instrument import timedStage, countFailure
+from .lazyImport import numpy
+from .limits import budgeted, getLimits, solveBudget
+from .modularSolver import MODULAR_SYSTEM_LIMIT, solveModular
+from .precision import coefficientArray, precisionTier
+from .rowReduceEchelonDiophantine import diophantineRowReduce
+from .scanEquation import scanEquation, withinLimits
+from .smallSolver import SMALL_SYSTEM_LIMIT, smallSystemSolution, speciesRows
+from .validateRREDMatrix import validateDRMat
+from .wrapSolution import wrapSolvedEquation, getCoefficients
+
+# Memo of solved equations (canonical key : (coefficients in canonical term order, exact))
+result_cache = LRUCache(maxsize=65536)
+# Solved equations kept on disk behind `result_cache`, set through `setPersistentCache`
+_persistent_cache = None
+# Fewest equations `balanceResults` solves together if that means importing NumPy
+BATCH_IMPORT_MIN = 64
+
+class BalanceResult:
+    """
+    The stages of balancing one chemical equation.
+
+    Each stage is computed on first access and kept, so asking for several of them (e.g. the
+    balanced string and the term : coefficient dictionary) parses and solves the equation once.
+    Stages that fail raise `BalancingError` when accessed. Each stage is timed by `instrument`.
+    Equations of at most `SMALL_SYSTEM_LIMIT` terms are solved by `smallSystemSolution`, which
+    finds the same coefficients without building the NumPy matrices, and equations of at least
+    `MODULAR_SYSTEM_LIMIT` terms by `solveModular`.
+
+    Coefficients of equations with the same terms on each side are shared through
+    `result_cache`, and the persistent cache if one is set; when they are found there,
+    validation, reduction and extraction are skipped (the matrices are still available,
+    computed on access).
+
+    Coefficients are kept as Python ints (`values`) and only made into an array when
+    `coefficients` is asked for, so balancing a small equation into a string (`balanced`) does
+    not import NumPy.
+
+    Equations beyond the complexity limits (see `setLimits`) fail at `scanned`, with a
+    `ComplexityError`, whether or not their solution is cached. The solving stages share one `Budget`, started by the first of them:
+    they raise `BalancingTimeoutError` once they have run longer than the `seconds` limit, and
+    `BalancingCancelledError` once `token` is cancelled.
+
+    Stages:
+        sides_terms : terms on each side of the equation [tuple(list[str], list[str])]
+        atoms : alphabetically ordered atoms of the equation [list(str)]
+        system_matrix : the matrix of the equation, see `equationToMatrix` [ndarray]
+        reduced_matrix : the system matrix after `diophantineRowReduce` [ndarray]
+        values : balancing coefficients, one per term [list(int)]
+        coefficients : balancing coefficients, one per term [ndarray]
+        balanced : the balanced chemical equation [str]
+        solution : balancing coefficient of each term (term : coefficient) [dict]
+        tier : precision tier of the coefficients, see `precisionTier` [str]
+    """
+
+    def __init__(self, equation, memo=True, token=None):
+        """
+        Arguments:
+            equation: unbalanced chemical equation [string]
+            memo: read and write solutions in `result_cache` [boolean]
+            token: stops the solve at its next checkpoint once cancelled [CancelToken]
+        """
+        self.equation = equation
+        self.memo = memo
+        self.token = token
+
+    def __repr__(self):
+        return f"BalanceResult({self.equation!r})"
+
+    @cached_property
+    def scanned(self):
+        """The equation validated and split into counted terms, see `scanEquation`."""
+        # A failed scan is kept and raised again, rather than repeated, on later accesses
+        error = self.__dict__.get("scan_error")
+        if error is None:
+            try:
+                return timedStage("scan", scanEquation, self.equation)
+            except InvalidEquationError as err:
+                countFailure("limit" if isinstance(err, ComplexityError) else "invalid")
+                error = self.__dict__["scan_error"] = err
+        raise error.with_traceback(None)
+
+    @cached_property
+    def canonical(self):
+        """The equation's terms, canonical key and term order, see `canonicalizeEquation`."""
+        return canonicalizeEquation(self.equation) if self.memo else None
+
+    @cached_property
+    def cached_solution(self):
+        """Coefficients found in `result_cache` or the persistent cache, in the equation's term order, and their `exact` flag, or None."""
+        if self.canonical is None:
+            return None
+        sides_terms, key, order = self.canonical
+        cached = result_cache.get(key)
+        if cached is None:
+            if _persistent_cache is None:
+                return None
+            cached = _persistent_cache.get(key)
+            if cached is None:
+                return None
+            result_cache.put(key, cached)
+        if not withinLimits(sides_terms, getLimits()):
+            # Raises the ComplexityError the equation raises when it is not cached
+            self.scanned
+        values, exact = cached
+        return fromCanonicalOrder(values, order), exact
+
+    @cached_property
+    def sides_terms(self):
+        if self.cached_solution is not None:
+            return self.canonical[0]
+        return self.scanned.sides_terms
+
+    @cached_property
+    def atoms(self):
+        return self.scanned.atoms
+
+    @cached_property
+    def system_matrix(self):
+        return timedStage("matrix", speciesToMatrix, self.scanned.atoms, self.scanned.sides_species)
+
+    @cached_property
+    def reduced_matrix(self):
+        return self.solveStage("reduce", diophantineRowReduce, self.system_matrix)
+
+    @cached_property
+    def small_solution(self):
+        """Coefficients found on lists by `smallSystemSolution` and their `exact` flag, or None if the equation is solved with NumPy."""
+        # Small systems are solved on lists, unless the reduced matrix was asked for already
+        scanned = self.scanned
+        if "reduced_matrix" in self.__dict__ or sum(map(len, scanned.sides_terms)) > SMALL_SYSTEM_LIMIT:
+            return None
+        rows = speciesRows(scanned.atoms, scanned.sides_species)
+        try:
+            solution = self.solveStage("small", smallSystemSolution, rows)
+        except UnsolvableEquationError:
+            countFailure("unsolvable")
+            raise
+        self.rememberValues(*solution)
+        return solution
+
+    @cached_property
+    def solved(self):
+        """Balancing coefficients as Python ints, and whether their array holds Python ints (object dtype)."""
+        if "coefficients" not in self.__dict__:
+            solution = self.cached_solution or self.small_solution
+            if solution is not None:
+                return solution
+        coefficients = self.coefficients
+        return coefficients.tolist(), coefficients.dtype == object
+
+    @cached_property
+    def values(self):
+        return self.solved[0]
+
+    @cached_property
+    def coefficients(self):
+        solution = self.cached_solution or self.small_solution
+        if solution is not None:
+            return coefficientArray(*solution)
+        # Large systems have a faster solver, unless the reduced matrix was asked for already
+        if "reduced_matrix" not in self.__dict__ and sum(map(len, self.scanned.sides_terms)) >= MODULAR_SYSTEM_LIMIT:
+            try:
+                coefficients = self.solveStage("modular", solveModular, self.system_matrix)
+            except UnsolvableEquationError:
+                countFailure("unsolvable")
+                raise
+            if coefficients is not None:
+                return self.remember(coefficients)
+        dr_mat = removeZeroRows(self.reduced_matrix)
+        # Validate result
+        if not timedStage("validate", validateDRMat, dr_mat):
+            countFailure("unsolvable")
+            raise UnsolvableEquationError("Unsolvable: the equation does not have a unique solution")
+        # Extract solution
+        return self.remember(timedStage("extract", extract_smallest_solution, dr_mat))
+
+    @cached_property
+    def balanced(self):
+        return timedStage("wrap", wrapSolvedEquation, self.sides_terms, self.values)
+
+    @cached_property
+    def solution(self):
+        return timedStage("wrap", getCoefficients, self.sides_terms, self.coefficients)
+
+    @cached_property
+    def tier(self):
+        return precisionTier(self.coefficients)
+
+    @cached_property
+    def budget(self):
+        """Time limit and cancel token of the solving stages, started on first use, or None, see `solveBudget`."""
+        return solveBudget(self.token)
+
+    def solveStage(self, stage, func, *args):
+        """
+        Run a solving stage under the equation's budget, timed as `stage`; see `timedStage`.
+
+        Arguments:
+            stage: name the stage is timed under [string]
+            func: the solver, which calls `checkpoint` as it goes [callable]
+        Return:
+            the result of `func(*args)`
+        Raises:
+            BalancingCancelledError: if the budget is spent or the token cancelled
+        """
+        budget = self.budget
+        if budget is None:
+            return timedStage(stage, func, *args)
+        try:
+            with budgeted(budget):
+                return timedStage(stage, func, *args)
+        except BalancingCancelledError as err:
+            countFailure("timeout" if isinstance(err, BalancingTimeoutError) else "cancelled")
+            raise
+
+    def remember(self, coefficients):
+        """
+        Store coefficients solved outside of this object as its `coefficients` stage, and in `result_cache`.
+
+        Arguments:
+            coefficients: balancing coefficients, one per term [ndarray]
+        Return:
+            coefficients [ndarray]
+        """
+        self.__dict__["coefficients"] = coefficients
+        self.rememberValues(coefficients.tolist(), coefficients.dtype == object)
+        return coefficients
+
+    def rememberValues(self, values, exact):
+        """
+        Store coefficients held as Python ints in `result_cache`, and the persistent cache if one is set.
+
+        Arguments:
+            values: balancing coefficients, one per term [list(int)]
+            exact: their array holds Python ints (object dtype) [boolean]
+        """
+        if self.canonical is not None:
+            sides_terms, key, order = self.canonical
+            values = toCanonicalOrder(values, order)
+            result_cache.put(key, (values, exact))
+            if _persistent_cache is not None:
+                _persistent_cache.put(key, values, exact)
+
+def balanceResults(equations):
+    """
+    Create the BalanceResult of each of many equations, solving them together where possible.
+
+    Equations missing from `result_cache` are solved by `solveSystemMatrices`, which vectorizes
+    over equations whose system matrices have the same shape. The rest, including those that
+    cannot be balanced, are left to be solved (or to raise) when their stages are accessed, as
+    are all of them if there are fewer than `BATCH_IMPORT_MIN` and NumPy is not imported yet.
+    The batch runs under the `seconds` limit of one equation; past it, every equation is left
+    to be solved under its own budget.
+
+    Arguments:
+        equations: unbalanced chemical equations [list(string)]
+    Return:
+        results: one BalanceResult per equation [list(BalanceResult)]
+    """
+    results = [BalanceResult(equation) for equation in equations]
+    pending = []
+    for result in results:
+        try:
+            if result.cached_solution is None:
+                result.scanned
+                pending.append(result)
+        except Exception:
+            # Raised again when the result's stages are accessed
+            continue
+    # Importing NumPy for a few equations costs more than solving them together saves
+    if len(pending) < BATCH_IMPORT_MIN and not numpy.loaded:
+        return results
+    try:
+        with budgeted(solveBudget()):
+            solutions, _ = timedStage("batch", solveSystemMatrices, [result.system_matrix for result in pending])
+    except BalancingCancelledError:
+        # The batch took longer than one equation may; each is solved, or times out, under its own budget
+        return results
+    for result, coefficients in zip(pending, solutions):
+        if coefficients is not None:
+            result.remember(coefficients)
+    return results
+
+def setPersistentCache(cache):
+    """
+    Keep solved equations in a persistent cache behind `result_cache`, or stop if `cache` is None.
+
+    The cache applies to the process it is set in; `balanceMany` and the other pooled functions
+    set it in their worker processes too. A cache that is replaced is flushed.
+
+        Parameters:
+            cache (PersistentCache) : cache opened with `PersistentCache`, or None
+    """
+    global _persistent_cache
+    if _persistent_cache is not None and _persistent_cache is not cache:
+        _persistent_cache.flush()
+    _persistent_cache = cache
+
+def getPersistentCache():
+    """Return the persistent cache set with `setPersistentCache`, or None."""
+    return _persistent_cache
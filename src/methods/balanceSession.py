@@ -0,0 +1,303 @@
+"""
+Balance an equation that is edited one term at a time.
+
+A `BalanceSession` keeps the system matrix of its equation in reduced row echelon form
+between edits, together with the transform that produced it from the system matrix: every
+reduced row is an integer combination of the element rows, recorded as a row of the transform.
+
+    adding a term : its column is computed from the transform, one product per element of the
+        term and row; if it is independent of the other columns it becomes a pivot and is
+        eliminated from the rows that have it
+    removing a term : its column is dropped; if it was a pivot, another entry of its row takes over
+    a new element : adds a zero row (and an identity row of the transform)
+    an element no longer in any term : its row, zero by then, is dropped from the transform
+
+The work of an edit is proportional to the number of elements times the number of terms and
+elements, rather than to a full reduction, and the coefficients are read from the reduced rows
+without further elimination. All entries are Python integers, so nothing overflows.
+
+Classes:
+    BalanceSession(string) -> BalanceSession
+
+"""
+from math import gcd, lcm
+from .constructSystemMatrix import compositionsToMatrix
+from .errors import UnsolvableEquationError
+from .lazyImport import numpy as np
+from .precision import coefficientArray, fitsInt64
+from .scanEquation import scanEquation, scanTerm
+from .wrapSolution import wrapSolvedEquation, getCoefficients
+
+REACTANTS, PRODUCTS = 0, 1
+
+class BalanceSession:
+    """
+    An equation kept balanced across edits of its terms.
+
+    Coefficients are the ones `balanceChemicalEquation` finds for the current equation. They are
+    computed when first accessed after an edit; an edit that makes the equation invalid raises
+    `InvalidEquationError` and leaves the session unchanged.
+
+    Attributes:
+        sides_terms (tuple(list[str], list[str])) : terms on each side of the equation
+        sides_compositions (tuple(list[dict], list[dict])) : atom counts of each term (atom : count)
+        edits (int) : number of terms added or removed so far
+    """
+
+    def __init__(self, equation=None):
+        """
+        Arguments:
+            equation: unbalanced chemical equation to start from; by default the session is empty [string]
+        Raises:
+            InvalidEquationError: if the equation does not satisfy the equation criteria
+        """
+        self.sides_terms, self.sides_compositions = ([], []), ([], [])
+        self.edits = 0
+        # Rows of the system matrix, one per element, in order of first appearance
+        self._atoms, self._atom_rows, self._atom_terms = [], {}, {}
+        # Reduced rows (one column per term), transform rows (one column per element) and the
+        # pivot column of each reduced row, or None for rows that are zero
+        self._reduced, self._transform, self._pivots = [], [], []
+        self._coefficients = None
+        if equation is not None:
+            self.update(equation)
+
+    def __repr__(self):
+        return f"BalanceSession({self.equation!r})"
+
+    @property
+    def equation(self):
+        """The current, unbalanced, equation."""
+        return " + ".join(self.sides_terms[0]) + " : " + " + ".join(self.sides_terms[1])
+
+    @property
+    def atoms(self):
+        """Alphabetically ordered atoms of the equation."""
+        return sorted(self._atoms)
+
+    @property
+    def system_matrix(self):
+        """The matrix of the current equation, see `equationToMatrix`."""
+        return compositionsToMatrix(self.atoms, self.sides_compositions)
+
+    @property
+    def reduced_matrix(self):
+        """The reduced rows kept by the session, pivot rows in order of pivot column."""
+        rows = sorted((pivot, row) for pivot, row in zip(self._pivots, self._reduced) if pivot is not None)
+        return np.array([row for _, row in rows], dtype=object).reshape(len(rows), self._termCount())
+
+    @property
+    def coefficients(self):
+        """
+        Balancing coefficients of the current equation, one per term.
+
+        Raises:
+            UnsolvableEquationError: if the equation does not have a unique solution
+        """
+        if self._coefficients is None:
+            self._coefficients = self._solve()
+        return self._coefficients
+
+    @property
+    def balanced(self):
+        """The balanced chemical equation."""
+        return wrapSolvedEquation(self.sides_terms, self.coefficients)
+
+    @property
+    def solution(self):
+        """Balancing coefficient of each term (term : coefficient)."""
+        return getCoefficients(self.sides_terms, self.coefficients)
+
+    def update(self, equation):
+        """
+        Change the equation, editing only the terms that differ from the current ones.
+
+        On each side, the terms shared by the start and end of the old and new equation are kept;
+        the ones between are removed and the new ones added in their place.
+
+        Arguments:
+            equation: unbalanced chemical equation [string]
+        Return:
+            edits: number of terms added or removed [int]
+        Raises:
+            InvalidEquationError: if the equation does not satisfy the equation criteria
+        """
+        scanned = scanEquation(equation)
+        edits = self.edits
+        for side in (REACTANTS, PRODUCTS):
+            old, new = self.sides_terms[side], scanned.sides_terms[side]
+            start = 0
+            while start < min(len(old), len(new)) and old[start] == new[start]:
+                start += 1
+            end = 0
+            while end < min(len(old), len(new)) - start and old[-1 - end] == new[-1 - end]:
+                end += 1
+            for idx in reversed(range(start, len(old) - end)):
+                self._removeTerm(side, idx)
+            for idx in range(start, len(new) - end):
+                self._addTerm(side, idx, new[idx], scanned.sides_compositions[side][idx])
+        return self.edits - edits
+
+    def addTerm(self, term, side, index=None):
+        """
+        Add a term to one side of the equation.
+
+        Arguments:
+            term: the term [string]
+            side: 0 for the reactants, 1 for the products [int]
+            index: position of the term on its side; by default it is added last [int]
+        Raises:
+            InvalidEquationError: if the term is not a single valid term
+        """
+        composition = scanTerm(term)
+        if index is None:
+            index = len(self.sides_terms[side])
+        if not 0 <= index <= len(self.sides_terms[side]):
+            raise IndexError(f"Cannot add a term at {index} on side {side}")
+        self._addTerm(side, index, term.strip(), composition)
+
+    def removeTerm(self, side, index):
+        """
+        Remove a term from one side of the equation.
+
+        Arguments:
+            side: 0 for the reactants, 1 for the products [int]
+            index: position of the term on its side [int]
+        """
+        if not -len(self.sides_terms[side]) <= index < len(self.sides_terms[side]):
+            raise IndexError(f"There is no term {index} on side {side}")
+        self._removeTerm(side, index % len(self.sides_terms[side]))
+
+    def replaceTerm(self, term, side, index):
+        """
+        Replace a term of the equation by another.
+
+        Arguments:
+            term: the new term [string]
+            side: 0 for the reactants, 1 for the products [int]
+            index: position of the term on its side [int]
+        Raises:
+            InvalidEquationError: if the term is not a single valid term
+        """
+        composition = scanTerm(term)
+        self.removeTerm(side, index)
+        self._addTerm(side, index % (len(self.sides_terms[side]) + 1), term.strip(), composition)
+
+    def _termCount(self):
+        return len(self.sides_terms[0]) + len(self.sides_terms[1])
+
+    def _column(self, side, index):
+        return index if side == REACTANTS else len(self.sides_terms[0]) + index
+
+    def _addTerm(self, side, index, term, composition):
+        for atom in composition:
+            if atom not in self._atom_rows:
+                self._addAtom(atom)
+            self._atom_terms[atom] += 1
+        col = self._column(side, index)
+        self.sides_terms[side].insert(index, term)
+        self.sides_compositions[side].insert(index, composition)
+        # Column of the term in the reduced rows: the transform applied to its counts
+        sign = 1 if side == REACTANTS else -1
+        counts = [(self._atom_rows[atom], sign * ct) for atom, ct in composition.items()]
+        for t, row in zip(self._transform, self._reduced):
+            row.insert(col, sum(t[k] * ct for k, ct in counts))
+        self._pivots = [p + 1 if p is not None and p >= col else p for p in self._pivots]
+        # The term is independent of the others if a zero row now has an entry in its column
+        free = [i for i, p in enumerate(self._pivots) if p is None and self._reduced[i][col]]
+        if free:
+            pivot_row = min(free, key=lambda i: abs(self._reduced[i][col]))
+            self._pivots[pivot_row] = col
+            self._eliminate(pivot_row, col)
+        self._edited()
+
+    def _removeTerm(self, side, index):
+        col = self._column(side, index)
+        self.sides_terms[side].pop(index)
+        composition = self.sides_compositions[side].pop(index)
+        pivot_row = self._pivots.index(col) if col in self._pivots else None
+        for row in self._reduced:
+            del row[col]
+        self._pivots = [p - 1 if p is not None and p > col else p for p in self._pivots]
+        if pivot_row is not None:
+            # Another column of the row takes over as pivot; the row is zero if there is none
+            row = self._reduced[pivot_row]
+            entries = [c for c, value in enumerate(row) if value]
+            self._pivots[pivot_row] = None
+            if entries:
+                col = min(entries, key=lambda c: abs(row[c]))
+                self._pivots[pivot_row] = col
+                self._eliminate(pivot_row, col)
+        for atom in composition:
+            self._atom_terms[atom] -= 1
+            if self._atom_terms[atom] == 0:
+                self._removeAtom(atom)
+        self._edited()
+
+    def _addAtom(self, atom):
+        self._atom_rows[atom] = len(self._atoms)
+        self._atom_terms[atom] = 0
+        self._atoms.append(atom)
+        for t in self._transform:
+            t.append(0)
+        self._reduced.append([0] * self._termCount())
+        self._transform.append([0] * (len(self._atoms) - 1) + [1])
+        self._pivots.append(None)
+
+    def _removeAtom(self, atom):
+        # The atom's row of the system matrix is zero, and some zero reduced row has a non zero
+        # transform entry for it; clear the other entries of that transform column with it, then
+        # drop the row and column, so that the transform stays invertible
+        k = self._atom_rows.pop(atom)
+        del self._atom_terms[atom]
+        self._atoms.pop(k)
+        pivot_row = next(i for i, p in enumerate(self._pivots) if p is None and self._transform[i][k])
+        self._eliminate(pivot_row, k, transform=True)
+        del self._reduced[pivot_row], self._transform[pivot_row], self._pivots[pivot_row]
+        for t in self._transform:
+            del t[k]
+        self._atom_rows = {atom: idx for idx, atom in enumerate(self._atoms)}
+
+    def _eliminate(self, pivot_row, col, transform=False):
+        """Clear column `col` of the reduced rows (or of the transform) in every row but `pivot_row`."""
+        source = self._transform if transform else self._reduced
+        pivot = source[pivot_row][col]
+        reduced_pivot, transform_pivot = self._reduced[pivot_row], self._transform[pivot_row]
+        for i in range(len(source)):
+            entry = source[i][col]
+            if entry and i != pivot_row:
+                g = gcd(pivot, entry)
+                a, b = pivot // g, entry // g
+                reduced = [a * x - b * y for x, y in zip(self._reduced[i], reduced_pivot)]
+                t = [a * x - b * y for x, y in zip(self._transform[i], transform_pivot)]
+                content = gcd(*reduced, *t)
+                if content > 1:
+                    reduced = [x // content for x in reduced]
+                    t = [x // content for x in t]
+                self._reduced[i], self._transform[i] = reduced, t
+
+    def _edited(self):
+        self.edits += 1
+        self._coefficients = None
+
+    def _solve(self):
+        m = self._termCount()
+        pivots = {p: i for i, p in enumerate(self._pivots) if p is not None}
+        if m == 0 or len(pivots) != m - 1:
+            raise UnsolvableEquationError("Unsolvable: the equation does not have a unique solution")
+        # Kernel vector: one free column, each pivot column solved from its row
+        free = next(col for col in range(m) if col not in pivots)
+        rows = [(col, self._reduced[i][col], self._reduced[i][free]) for col, i in pivots.items()]
+        denominator = lcm(*(pivot // gcd(pivot, entry) for _, pivot, entry in rows))
+        solution = [0] * m
+        solution[free] = denominator
+        for col, pivot, entry in rows:
+            solution[col] = -entry * denominator // pivot
+        content = gcd(*solution)
+        solution = [x // content for x in solution]
+        if solution[-1] < 0:
+            solution = [-x for x in solution]
+        if 0 in solution:
+            raise UnsolvableEquationError("Unsolvable: the equation does not have a unique solution")
+        exact = not all(fitsInt64(x) for x in solution)
+        return coefficientArray(solution, exact)
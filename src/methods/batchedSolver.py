@@ -0,0 +1,172 @@
+"""
+Solve many system matrices of the same shape at once.
+
+Matrices of equal shape are stacked into a (batch x atoms x terms) int64 array, and pivot
+selection, elimination, gcd normalization and lcm extraction run on the whole batch with
+array operations. A matrix whose reduction is not in the form `validateDRMat` accepts, or
+whose arithmetic could overflow int64, is flagged for the scalar path (`solveSystemMatrix`),
+which handles it exactly. The batch calls `checkpoint` once per pivot column, as the scalar
+solvers do, so it is stopped as a whole.
+
+Functions:
+    solveSystemMatrices(list[ndarray]) -> tuple[list[ndarray | None], ndarray]
+    batchRowReduce(ndarray) -> tuple[ndarray, ndarray]
+    batchExtractSolutions(ndarray, ndarray) -> tuple[ndarray, ndarray]
+    checkedLcm(ndarray, ndarray) -> ndarray
+
+"""
+from collections import defaultdict
+from .lazyImport import numpy as np
+from .limits import checkpoint
+from .precision import INT64_MAX
+
+# Row updates whose float64 bound exceeds this are treated as overflowing int64
+OVERFLOW_BOUND = 2.0**62
+
+def solveSystemMatrices(matrices, min_group=2):
+    """
+    Find the smallest positive integer solutions of many system matrices.
+
+        Parameters:
+            matrices (list[ndarray]) : system matrices, as produced by `equationToMatrix`
+            min_group (int) : smallest number of same-shape matrices worth solving as a batch
+        Returns:
+            solutions (list[ndarray | None]) : coefficients of each matrix, None if it needs the scalar path
+            needs_scalar (ndarray(bool)) : True where the solution is None
+        Raises:
+            BalancingCancelledError : if the solve is stopped at a checkpoint, see `limits`
+    """
+    solutions = [None] * len(matrices)
+    needs_scalar = np.ones(len(matrices), dtype=bool)
+    groups = defaultdict(list)
+    for idx, matrix in enumerate(matrices):
+        if matrix.dtype != object:
+            groups[np.shape(matrix)].append(idx)
+    for idxs in groups.values():
+        if len(idxs) < min_group:
+            continue
+        reduced, flagged = batchRowReduce(np.stack([matrices[idx] for idx in idxs]))
+        coefficients, flagged = batchExtractSolutions(reduced, flagged)
+        for pos, idx in enumerate(idxs):
+            if not flagged[pos]:
+                solutions[idx] = coefficients[pos]
+                needs_scalar[idx] = False
+    return solutions, needs_scalar
+
+def batchRowReduce(stack):
+    """
+    Reduce a stack of system matrices, as `diophantineRowReduce` reduces each one.
+
+        Parameters:
+            stack (ndarray) : (batch x n x m) integer array
+        Returns:
+            reduced (ndarray) : the reduced matrices, with positive pivots
+            flagged (ndarray(bool)) : matrices whose reduction could overflow int64
+        Raises:
+            BalancingCancelledError : if the solve is stopped at a checkpoint, see `limits`
+    """
+    matrices = np.array(stack, dtype=np.int64)
+    batch, n, m = matrices.shape
+    rows = np.zeros(batch, dtype=np.intp)
+    flagged = np.zeros(batch, dtype=bool)
+    row_ids = np.arange(n)
+    for col in range(m):
+        checkpoint()
+        # Pick the smallest non zero pivot at or below each matrix's current row
+        column = matrices[:, :, col]
+        candidates = (column != 0) & (row_ids >= rows[:, None]) & ~flagged[:, None]
+        has = np.flatnonzero(candidates.any(axis=1))
+        if len(has) == 0:
+            continue
+        pivots = np.where(candidates[has], np.abs(column[has]), INT64_MAX).argmin(axis=1)
+        row = rows[has]
+        pivot_rows = matrices[has, pivots]
+        matrices[has, pivots] = matrices[has, row]
+        matrices[has, row] = pivot_rows
+        # Cancel the column in every other row: a * row - c * pivot_row
+        sub = matrices[has]
+        entries = sub[:, :, col]
+        pivot_values = pivot_rows[:, col][:, None]
+        g = np.gcd(pivot_values, entries)
+        g[g == 0] = 1
+        a, c = pivot_values // g, entries // g
+        update = (entries != 0) & (row_ids != row[:, None])
+        bound = (np.abs(a).astype(float) * np.abs(sub).max(axis=2) +
+                 np.abs(c).astype(float) * np.abs(pivot_rows).max(axis=1)[:, None])
+        overflow = (update & (bound > OVERFLOW_BOUND)).any(axis=1)
+        sub = np.where(update[:, :, None], a[:, :, None] * sub - c[:, :, None] * pivot_rows[:, None, :], sub)
+        # Divide rows by gcd
+        content = np.gcd.reduce(sub, axis=2)
+        content[content == 0] = 1
+        sub //= content[:, :, None]
+        ok = ~overflow
+        matrices[has[ok]] = sub[ok]
+        rows[has[ok]] += 1
+        flagged[has[overflow]] = True
+    # Ensure positive pivots
+    leading = np.take_along_axis(matrices, (matrices != 0).argmax(axis=2)[:, :, None], axis=2)
+    matrices *= np.where(leading < 0, -1, 1)
+    return matrices, flagged
+
+def batchExtractSolutions(reduced, flagged):
+    """
+    Extract the smallest positive solution of each reduced matrix, as `extract_smallest_solution` does.
+
+    A matrix is solved only if it has a positive pivot in each of its first m-1 columns, a
+    non zero last column in those rows, and zeros elsewhere; otherwise it is flagged.
+
+        Parameters:
+            reduced (ndarray) : (batch x n x m) reduced matrices, from `batchRowReduce`
+            flagged (ndarray(bool)) : matrices already known to need the scalar path
+        Returns:
+            coefficients (ndarray) : (batch x m) solutions; rows of flagged matrices are meaningless
+            flagged (ndarray(bool)) : matrices that need the scalar path
+        Raises:
+            BalancingCancelledError : if the solve is stopped at a checkpoint, see `limits`
+    """
+    batch, n, m = reduced.shape
+    k = m - 1
+    flagged = flagged.copy()
+    if k < 1 or n < k:
+        return np.zeros((batch, m), dtype=np.int64), np.ones(batch, dtype=bool)
+    top = reduced[:, :k, :k]
+    pivots = np.diagonal(top, axis1=1, axis2=2)
+    last = reduced[:, :k, k]
+    flagged |= ~((pivots > 0).all(axis=1) &
+                 (np.count_nonzero(top, axis=(1, 2)) == k) &
+                 (last != 0).all(axis=1) &
+                 ~reduced[:, k:, :].any(axis=(1, 2)))
+    last = np.where(flagged[:, None], -1, last)
+    pivots = np.where(flagged[:, None], 1, pivots)
+    # Scale all pairs such that coefficients on last variable are equal
+    lcmOfLastVarCoefs = checkedLcm(-last, flagged)
+    scaler = lcmOfLastVarCoefs[:, None] // -last
+    flagged |= (pivots > INT64_MAX // np.maximum(np.abs(scaler), 1)).any(axis=1)
+    coefs = np.concatenate((np.where(flagged[:, None], 1, pivots * scaler), lcmOfLastVarCoefs[:, None]), axis=1)
+    # Find variable values by finding lcm of their coefficients
+    lcm = checkedLcm(coefs, flagged)
+    return lcm[:, None] // coefs, flagged
+
+def checkedLcm(values, flagged):
+    """
+    Compute the lcm of each row of an int64 array, flagging rows where it overflows.
+
+        Parameters:
+            values (ndarray) : (batch x k) integer array
+            flagged (ndarray(bool)) : updated in place with the rows that overflow
+        Returns:
+            lcm (ndarray) : lcm of each row; 1 for flagged rows
+        Raises:
+            BalancingCancelledError : if the solve is stopped at a checkpoint, see `limits`
+    """
+    lcm = np.ones(len(values), dtype=np.int64)
+    for col in range(values.shape[1]):
+        checkpoint()
+        x = np.abs(values[:, col])
+        g = np.gcd(lcm, x)
+        g[g == 0] = 1
+        q = lcm // g
+        overflow = q > INT64_MAX // np.maximum(x, 1)
+        flagged |= overflow
+        lcm = np.where(flagged, 1, q * x)
+    return lcm
@@ -0,0 +1,99 @@
+"""
+Bounded least-recently-used caches shared across balancing calls.
+
+Classes:
+    LRUCache(int) -> LRUCache
+    CacheInfo(int, int, int, int, int) -> namedtuple
+
+"""
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"])
+
+class LRUCache:
+    """
+    A mapping with a size limit that evicts the least recently used entry when full.
+
+    Lookups and insertions are guarded by a lock, so one cache can be shared by threads.
+
+    Attributes:
+        maxsize (int) : the largest number of entries held at once
+        hits (int) : number of lookups that found an entry
+        misses (int) : number of lookups that did not find an entry
+        evictions (int) : number of entries dropped to respect `maxsize`
+    """
+
+    def __init__(self, maxsize=4096):
+        if maxsize < 0:
+            raise ValueError("maxsize must be non-negative")
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Return the entry for `key` and mark it as recently used, or `default` if absent."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store `value` under `key`, evicting the least recently used entries if full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._trim()
+
+    def getOrCompute(self, key, compute):
+        """
+        Return the entry for `key`, computing and storing it with `compute(key)` on a miss.
+
+            Parameters:
+                key (hashable) : cache key
+                compute (callable) : function of `key` producing the value
+            Returns:
+                value : the cached or freshly computed value
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute(key)
+            self.put(key, value)
+        return value
+
+    def resize(self, maxsize):
+        """Change the size limit, evicting entries if the cache is now over it."""
+        if maxsize < 0:
+            raise ValueError("maxsize must be non-negative")
+        with self._lock:
+            self.maxsize = maxsize
+            self._trim()
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """Return a snapshot of the counters as a `CacheInfo`."""
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._data))
+
+    def _trim(self):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+_MISSING = object()
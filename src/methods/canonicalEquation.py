@@ -0,0 +1,60 @@
+"""
+Canonical forms of chemical equations, used to recognize the same reaction written differently.
+
+Two equations have the same canonical key when they have the same terms on each side,
+regardless of term order and whitespace. Ex:
+'O2 + H2 : H2O' and 'H2  +  O2 : H2O' -> (('H2', 'O2'), ('H2O',))
+
+Functions:
+    canonicalizeEquation(string) -> tuple[tuple[list[str], list[str]], tuple, list[int]] | None
+    toCanonicalOrder(list[int], list[int]) -> list[int]
+    fromCanonicalOrder(list[int], list[int]) -> list[int]
+
+"""
+import re
+from .constructSystemMatrix import separateSides, getTerms
+
+# Any character `scanEquation` rejects; `separateSides` and `getTerms` would strip tabs and newlines
+REJECTED = re.compile(r"[^A-Za-z\d() +:]")
+
+def canonicalizeEquation(raw_equation):
+    """
+    Find the canonical key of an equation and the permutation relating its terms to the key.
+
+    Equations that do not split into two sides of well-formed terms, or that contain a character
+    the scanner rejects, have no canonical key; so a cached solution never stands in for validation.
+
+        Parameters:
+            raw_equation (string) : chemical equation
+        Returns:
+            sides_terms (tuple) : the terms on each side, in the caller's order
+            key (tuple) : the terms on each side, sorted
+            order (list[int]) : for each position in the key, the index of that term in the equation
+            None : if the equation has no canonical key
+    """
+    if REJECTED.search(raw_equation):
+        return None
+    sides = separateSides(raw_equation)
+    if len(sides) != 2:
+        return None
+    sides_terms = getTerms(sides[0]), getTerms(sides[1])
+    order = []
+    offset = 0
+    for terms in sides_terms:
+        if not terms or any(" " in term for term in terms):
+            return None
+        order += [offset + idx for idx in sorted(range(len(terms)), key=terms.__getitem__)]
+        offset += len(terms)
+    key = tuple(sorted(sides_terms[0])), tuple(sorted(sides_terms[1]))
+    return sides_terms, key, order
+
+def toCanonicalOrder(coefficients, order):
+    """Rearrange coefficients given in equation order into canonical order."""
+    return [coefficients[idx] for idx in order]
+
+def fromCanonicalOrder(canonical_coefficients, order):
+    """Rearrange coefficients given in canonical order into equation order."""
+    coefficients = [None] * len(order)
+    for idx, coef in zip(order, canonical_coefficients):
+        coefficients[idx] = coef
+    return coefficients
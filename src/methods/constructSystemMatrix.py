@@ -3,17 +3,33 @@ Methods to construct a matrix corresponding to a chemical equation.
 
 
 Functions:
-    process_equation(string) -> tuple[tuple[list[str], list[str]], ndarray]
+    equationToMatrix(tuple[tuple[list[str], list[str]], list[str]]) -> ndarray
+    processEquation(string) -> tuple[tuple[list[str], list[str]], list[str]]
     findAtoms(string) -> list[string]
     separateSides(string) -> list[string]
     getTerms(string) -> list[string]
     half_matrix(string, string) -> ndarray
+    compositionMatrix(list[string], list[dict]) -> ndarray
+    compositionsToMatrix(list[string], tuple[list[dict], list[dict]]) -> ndarray
+    speciesToMatrix(list[string], tuple[list[Species], list[Species]]) -> ndarray
+    speciesMatrix(list[string], list[Species]) -> ndarray
+    termSpecies(string) -> Species
+    cachedSpecies(string) -> Species | None
+    compileSpecies(string) -> Species
+    setSpeciesTable(SpeciesTable) -> None
+    getSpeciesTable() -> SpeciesTable | None
     count(string, tuple[string, int]) -> int
-    split(string) -> tuple[tuple[string, int], tuple[string, int], tuple[string, int]]
 
 """
-import numpy as np
-import re
+from .cache import LRUCache
+from .lazyImport import numpy as np
+from .precision import fitsInt64, toExact
+from .species import RECORD, RECORD_FIELDS, element_table
+
+# Process-wide cache of parsed terms (term : Species); see `termSpecies`
+species_cache = LRUCache(maxsize=4096)
+# Set through `setSpeciesTable`
+_species_table = None
 
 def equationToMatrix(equation_units):
     '''
@@ -29,11 +45,41 @@ def equationToMatrix(equation_units):
     # unpack
     rect, prodt = equation_units[0]
     atoms = equation_units[1]
-    # count instances of atoms into matrix
+    # compile each term once, then scatter counts into matrix
     m1, m2 = half_matrix(atoms, rect), -half_matrix(atoms, prodt)
     # combine: this is the diophantine matrix
     system = np.concatenate((m1, m2), axis=1)
-    return system.astype(int)
+    return system
+
+def compositionsToMatrix(atoms, sides_compositions):
+    '''
+    Produce the matrix of a chemical equation from the atom counts of its terms, e.g. from `scanEquation`.
+
+    Arguments:
+        atoms: A list of the atoms in the equation [list(str)]
+        sides_compositions: atom counts of each term on each side [tuple(list[dict], list[dict])]
+
+    Returns:
+        processed_equation: A matrix corresponding to the chemical equation [ndarray]
+    '''
+    m1, m2 = compositionMatrix(atoms, sides_compositions[0]), -compositionMatrix(atoms, sides_compositions[1])
+    return np.concatenate((m1, m2), axis=1)
+
+def speciesToMatrix(atoms, sides_species):
+    '''
+    Produce the matrix of a chemical equation from the Species of its terms, e.g. from `scanEquation`.
+
+    Arguments:
+        atoms: A list of the atoms in the equation [list(str)]
+        sides_species: the terms on each side [tuple(list[Species], list[Species])]
+
+    Returns:
+        processed_equation: A matrix corresponding to the chemical equation [ndarray]
+    '''
+    reactants, products = sides_species
+    system = speciesMatrix(atoms, reactants + products)
+    system[:, len(reactants):] *= -1
+    return system
 
 def processEquation(raw_equation):
     '''
@@ -103,14 +149,118 @@ def half_matrix(atoms, side_terms):
         atoms: A list of the atoms in the equation [list(str)]
         side_terms: terms on the side of the chemical equation [list(str)]
     Return:
-        half_m: the matrix representing half of a chemical equation [array(float64)]
+        half_m: the matrix representing half of a chemical equation [array(int)]
+    '''
+    return speciesMatrix(atoms, [termSpecies(term) for term in side_terms])
+
+def compositionMatrix(atoms, compositions):
     '''
-    half_m = np.zeros((len(atoms), len(side_terms)))
-    for atom_idx in range(len(atoms)):
-        for term_idx in range(len(side_terms)):
-            half_m[atom_idx][term_idx] = count(atoms[atom_idx], (side_terms[term_idx], 1))
+    Scatter term compositions into a matrix with a row per atom and a column per term
+
+    Argument:
+        atoms: A list of the atoms in the equation [list(str)]
+        compositions: atom counts of each term (atom : count) [list(dict(str, int))]
+    Return:
+        half_m: the matrix representing half of a chemical equation [array(int64), or array(object) if counts overflow int64]
+    '''
+    atom_idxs = {atom: idx for idx, atom in enumerate(atoms)}
+    half_m = np.zeros((len(atoms), len(compositions)), dtype=int)
+    for term_idx, composition in enumerate(compositions):
+        for atom, ct in composition.items():
+            if not fitsInt64(ct) and half_m.dtype != object:
+                half_m = toExact(half_m)
+            half_m[atom_idxs[atom]][term_idx] = ct
     return half_m
 
+def speciesMatrix(atoms, species):
+    '''
+    Scatter the counts of species into a matrix with a row per atom and a column per term
+
+    Argument:
+        atoms: A list of the atoms in the equation, including every atom of the species [list(str)]
+        species: the terms, as produced by `termSpecies` [list(Species)]
+    Return:
+        half_m: the matrix representing half of a chemical equation [array(int64), or array(object) if counts overflow int64]
+    '''
+    # row of each element id, and column of each record
+    atom_rows = np.zeros(len(element_table), dtype=np.intp)
+    atom_rows[[element_table.intern(atom) for atom in atoms]] = np.arange(len(atoms))
+    data = [sp.data for sp in species]
+    if any(isinstance(records, tuple) for records in data):
+        # counts beyond int64 are read species by species, as object arrays
+        term_idxs = np.repeat(np.arange(len(species)), [len(sp) for sp in species])
+        element_ids = np.concatenate([sp.elementIds() for sp in species])
+        counts = np.concatenate([sp.counts() for sp in species])
+    else:
+        term_idxs = np.repeat(np.arange(len(species)), np.array([len(records) for records in data]) // RECORD.size)
+        records = np.frombuffer(b"".join(data), dtype=RECORD_FIELDS)
+        element_ids, counts = records["id"], records["count"]
+    half_m = np.zeros((len(atoms), len(species)), dtype=object if counts.dtype == object else int)
+    half_m[atom_rows[element_ids], term_idxs] = counts
+    return half_m
+
+def termSpecies(term):
+    """
+    Return a term as a Species, compiling it only if it is not in `species_cache`.
+
+    Parameters:
+        term (string) : term in a chemical equation
+    Returns:
+        species (Species) : element ids and counts of the term
+    Raises:
+        InvalidEquationError : if the term is not a single valid term
+    """
+    return species_cache.getOrCompute(term, compileSpecies)
+
+def cachedSpecies(term):
+    """
+    Return a term from `species_cache`, or from the species table if one is set, without parsing it.
+
+    Parameters:
+        term (string) : term in a chemical equation
+    Returns:
+        species (Species) : element ids and counts of the term, or None if it is in neither
+    """
+    species = species_cache.get(term)
+    if species is None and _species_table is not None:
+        species = _species_table.get(term)
+        if species is not None:
+            species_cache.put(term, species)
+    return species
+
+def compileSpecies(term):
+    """
+    Look a term up in the species table, if one is set, or check and count it with `scanSpecies`.
+
+    Only valid terms are compiled, since the scanner takes the terms it finds in `species_cache` as they are.
+    """
+    # Imported here: the scanner looks terms up in `species_cache`, so it imports this module
+    from .scanEquation import scanSpecies
+    if _species_table is not None:
+        species = _species_table.get(term)
+        if species is not None:
+            return species
+    return scanSpecies(term, cache=False)
+
+def setSpeciesTable(table):
+    """
+    Look terms up in a precompiled species table before parsing them, or stop if `table` is None.
+
+    The scanner, `termSpecies` and `verifyBalanced` look up each term missing from `species_cache` in the table.
+
+    The table applies to the process it is set in; `balanceMany` and the other pooled functions
+    set it in their worker processes too.
+
+        Parameters:
+            table (SpeciesTable) : table opened with `SpeciesTable`, or None
+    """
+    global _species_table
+    _species_table = table
+
+def getSpeciesTable():
+    """Return the species table set with `setSpeciesTable`, or None."""
+    return _species_table
+
 def count(atom, term_tuple):
     """
     Count the occurences of an atom in a term (input as `term tuple`.)
@@ -126,79 +276,4 @@ def count(atom, term_tuple):
     """
     # unpack
     term, mult = term_tuple
-    # establish running total
-    ct = 0
-    # proceed if atom in term
-    idx = getInstanceIdx(term, atom)
-    if idx != -1:
-        # base case: no parenthetical groups
-        if term.find(')') == -1:
-            # add numbers immediately after atom to total, or 1 if no number present
-            while idx != -1:
-                if idx + len(atom) < len(term) and term[idx+len(atom)].isnumeric():
-                    ct += int(re.findall("[0-9]+", term[idx:])[0])
-                else:
-                    ct += 1
-                idx = getInstanceIdx(term, atom, idx+1)
-        # recursive step: look at each group
-        else:
-            for term_tuple in split(term):
-                ct += count(atom, term_tuple)
-    return ct*mult
-
-def split(term):
-    """
-    Split a term containing parenthetical group into three: group before, within, and after parentheses.
-    
-    Store multiplier with each parenthetical group. Ex:
-    split('A3(BE)3C') = (('A3', 1), ('BE', 3), ('C',1))
-    
-    Parameters:
-        term (string): term in a chemical equation
-    Return:
-        tuple(term tuple, term tuple, term tuple) : groups defined by parenthesis
-    
-    """
-    # first break is first instance of '('
-    idx1 = term.find('(')
-    # parenthesis group is closed when ct is zero
-    ct = 1
-    for idx2 in range(idx1+1, len(term)):
-        if term[idx2] == ')':
-            ct -= 1
-        if term[idx2] == '(':
-            ct += 1
-        # extract term tuples
-        if ct == 0:
-            try:
-                tmp = int(re.findall('[0-9]+', term[idx2+1:])[0])
-            except IndexError:
-                tmp = 1
-            try:
-                crt = list(filter(lambda d: not d[1].isnumeric(), enumerate(term[idx2+1:])))[0][0]
-            except IndexError:
-                crt = 1
-            return (term[:idx1], 1), (term[idx1+1:idx2], tmp), (term[idx2+1+crt:], 1)
-    print(f"Invalid String: Unbalanced parentheses in {term}")
-    return []
-
-
-def getInstanceIdx(term, atom, idx=0):
-    """
-    Wrap the term.find(atom, idx) to include checks against accidental matches (e.g. "Ca" for "C")
-
-    Arguments: 
-        term (string) The chemical expression to search
-        atom (string) The atom to search for
-        idx (int) The index from which to search from. Defaults to zero.
-    Return:
-        idx (int) The index of the first match of `atom` in `term` beyond `idx`
-    
-    Returns -1 if no matches are found
-    """
-    idx = term.find(atom,idx)
-    if idx == -1: return -1
-    if idx+len(atom) < len(term):
-        while term[idx+len(atom)].islower() :
-            idx = getInstanceIdx(term, atom, idx+1)
-    return idx
+    return termSpecies(term).composition().get(atom, 0) * mult
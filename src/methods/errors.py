@@ -0,0 +1,57 @@
+"""
+Exceptions raised when an equation cannot be balanced.
+
+Classes:
+    BalancingError(string) -> ValueError
+    InvalidEquationError(string, int) -> BalancingError
+    UnsolvableEquationError(string) -> BalancingError
+    ComplexityError(string, int, string, int) -> InvalidEquationError
+    BalancingCancelledError(string) -> BalancingError
+    BalancingTimeoutError(string) -> BalancingCancelledError
+
+"""
+
+class BalancingError(ValueError):
+    """Base class for equations that cannot be balanced."""
+
+class InvalidEquationError(BalancingError):
+    """
+    The equation string does not satisfy the equation criteria.
+
+    Attributes:
+        position (int | None) : index in the equation string where the problem was found, if known
+    """
+
+    def __init__(self, message, position=None):
+        super().__init__(message)
+        self.position = position
+
+    def __reduce__(self):
+        return type(self), (str(self), self.position)
+
+class UnsolvableEquationError(BalancingError):
+    """The equation does not have exactly one balancing reaction."""
+
+class ComplexityError(InvalidEquationError):
+    """
+    The equation exceeds one of the complexity limits set with `setLimits`.
+
+    Attributes:
+        position (int | None) : index in the equation string where the limit was exceeded, if known
+        limit (string) : the limit exceeded, a field of `ComplexityLimits`
+        value (int) : the equation's value of it, as far as it was read
+    """
+
+    def __init__(self, message, position=None, limit=None, value=None):
+        super().__init__(message, position)
+        self.limit = limit
+        self.value = value
+
+    def __reduce__(self):
+        return type(self), (str(self), self.position, self.limit, self.value)
+
+class BalancingCancelledError(BalancingError):
+    """Balancing was stopped at a checkpoint because its `CancelToken` was cancelled."""
+
+class BalancingTimeoutError(BalancingCancelledError):
+    """Balancing was stopped at a checkpoint because it took longer than the `seconds` limit."""
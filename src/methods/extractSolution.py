@@ -7,11 +7,15 @@ Functions:
     processor_matrix(int) -> ndarray
 
 """
-import numpy as np
+from .lazyImport import numpy as np
+from .precision import fitsInt64, maxAbs, exactLcm, toExact
 
 def extract_smallest_solution(reduced_diophantine_matrix):
     """
     Return array with smallest positive solution to the diophantine system represented by input
+
+    Least common multiples are computed exactly; if the solution does not fit in int64, it is
+    computed with Python integers (object dtype) instead; see `precision`.
     
         Parameters:
             reduced_diophantine_matrix (ndarray) : a reduced diophantine matrix
@@ -23,23 +27,22 @@ def extract_smallest_solution(reduced_diophantine_matrix):
     n, m = np.shape(reduced_diophantine_matrix)
     rd_mat = np.matmul(reduced_diophantine_matrix, processor_matrix(m)).transpose()
     # Scale all pairs such that coefficients on last variable are equal
-    lcmOfLastVarCoefs = np.lcm.reduce(-rd_mat[-1])
-    scaler = (lcmOfLastVarCoefs / -rd_mat[-1]).astype(int)
+    lcmOfLastVarCoefs = exactLcm(-rd_mat[-1])
+    if not fitsInt64(lcmOfLastVarCoefs * maxAbs(rd_mat[0])):
+        rd_mat = toExact(rd_mat)
+    scaler = lcmOfLastVarCoefs // -rd_mat[-1]
     rd_mat = scaler * rd_mat
     # Find variable values by finding lcm of their coefficients
-    coefs = np.append(rd_mat[0], lcmOfLastVarCoefs)
-    lcm = np.lcm.reduce(coefs)
-    return (lcm / coefs).astype(int)
+    coefs = np.append(rd_mat[0], np.array([lcmOfLastVarCoefs], dtype=rd_mat.dtype))
+    lcm = exactLcm(coefs)
+    if not fitsInt64(lcm):
+        coefs = toExact(coefs)
+    return lcm // coefs
 
 def removeZeroRows(r_matrix):
-    """Remove zero rows in a matrix"""
-    top = len(r_matrix)
-    for n in range(1, top):
-        if n >= len(r_matrix):
-            return r_matrix
-        if r_matrix[-1][-1] == 0:
-            r_matrix = np.delete(r_matrix, -1, 0)
-    return r_matrix
+    """Remove zero rows in a matrix, wherever they are, keeping the order of the others"""
+    nonzero_rows = (r_matrix != 0).any(axis=1)
+    return r_matrix if nonzero_rows.all() else r_matrix[nonzero_rows]
 
 def processor_matrix(m):
     """Return auxiliary matrix to be used in (n x m) -> (n x 2) conversion"""
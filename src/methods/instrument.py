@@ -0,0 +1,173 @@
+"""
+Time the stages of balancing and count the ways it fails.
+
+Every stage of a `BalanceResult` (and the batched solve of `balanceResults`) is timed by an
+Instrumentation shared by the whole process. Each stage keeps its number of calls, cumulative
+and largest wall time, the shapes of the matrices it handled, and a window of its most recent
+times from which percentiles are read. Failures are counted by kind:
+
+    invalid : the equation string does not satisfy the equation criteria
+    unsolvable : the reduced matrix does not have a unique solution
+    overflow : int64 reduction overflowed and was redone on Python integers
+    limit : the equation exceeds a complexity limit, see `setLimits`
+    timeout : solving took longer than the `seconds` limit
+    cancelled : solving was stopped by a cancelled `CancelToken`
+
+Recording costs two clock reads and a few dictionary updates per stage; call
+`enableInstruments(False)` to skip it altogether. Batch workers in other processes keep their
+own instrumentation.
+
+Classes:
+    Instrumentation(int) -> Instrumentation
+    StageStats(int, float, float, float, float, float, float, dict) -> namedtuple
+    InstrumentSnapshot(dict, dict) -> namedtuple
+
+Functions:
+    timedStage(string, callable, *args) -> object
+    countFailure(string) -> None
+    instrumentSnapshot() -> InstrumentSnapshot
+    resetInstruments() -> None
+    enableInstruments(boolean) -> None
+    instrumented(int) -> contextmanager
+
+"""
+from collections import Counter, deque, namedtuple
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+
+# Summary of one stage; times are in seconds, percentiles are over the recent window
+StageStats = namedtuple("StageStats", ["calls", "total", "mean", "p50", "p90", "p99", "max", "shapes"])
+# Summary of every stage (stage : StageStats) and failure counts (kind : count)
+InstrumentSnapshot = namedtuple("InstrumentSnapshot", ["stages", "failures"])
+
+class Instrumentation:
+    """
+    Per-stage timings and failure counters.
+
+    Updates are guarded by a lock, so one instance can be shared by threads.
+
+    Attributes:
+        enabled (boolean) : record timings and failures
+        window (int) : number of recent times per stage kept for percentiles
+    """
+
+    def __init__(self, window=1024):
+        if window < 1:
+            raise ValueError("window must be positive")
+        self.enabled = True
+        self.window = window
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop every timing and counter."""
+        with self._lock:
+            self._calls = Counter()
+            self._totals = Counter()
+            self._maxima = {}
+            self._recent = {}
+            self._shapes = {}
+            self._failures = Counter()
+
+    def timed(self, stage, func, *args):
+        """
+        Call `func(*args)` and record its wall time under `stage`.
+
+        The time is recorded even if `func` raises. The shape of the first argument, or else of
+        the value returned, is recorded if it is a matrix.
+
+            Parameters:
+                stage (string) : name of the stage
+                func (callable) : the stage's function
+            Returns:
+                value : whatever `func` returns
+        """
+        if not self.enabled:
+            return func(*args)
+        value = None
+        start = perf_counter()
+        try:
+            value = func(*args)
+            return value
+        finally:
+            elapsed = perf_counter() - start
+            shape = getattr(args[0] if args else None, "shape", None) or getattr(value, "shape", None)
+            self.record(stage, elapsed, shape)
+
+    def record(self, stage, elapsed, shape=None):
+        """Record one call of `stage` that took `elapsed` seconds, on a matrix of `shape` if given."""
+        with self._lock:
+            self._calls[stage] += 1
+            self._totals[stage] += elapsed
+            if elapsed > self._maxima.get(stage, 0.0):
+                self._maxima[stage] = elapsed
+            recent = self._recent.get(stage)
+            if recent is None:
+                recent = self._recent[stage] = deque(maxlen=self.window)
+                self._shapes[stage] = Counter()
+            recent.append(elapsed)
+            if shape is not None:
+                self._shapes[stage][shape] += 1
+
+    def fail(self, kind):
+        """Count one failure of `kind`."""
+        if self.enabled:
+            with self._lock:
+                self._failures[kind] += 1
+
+    def snapshot(self):
+        """Return the current timings and counters as an `InstrumentSnapshot`."""
+        with self._lock:
+            stages = {}
+            for stage, calls in self._calls.items():
+                recent = sorted(self._recent[stage])
+                total = self._totals[stage]
+                stages[stage] = StageStats(
+                    calls, total, total / calls,
+                    percentile(recent, 0.50), percentile(recent, 0.90), percentile(recent, 0.99),
+                    self._maxima.get(stage, 0.0), dict(self._shapes[stage]),
+                )
+            return InstrumentSnapshot(stages, dict(self._failures))
+
+def percentile(ordered, q):
+    """Return the `q` quantile (nearest rank) of a sorted, non-empty list."""
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+# Instrumentation of this process; replaced for the duration of `instrumented`
+_instruments = Instrumentation()
+
+def timedStage(stage, func, *args):
+    """Call `func(*args)`, timing it as `stage` of the current instrumentation; see `Instrumentation.timed`."""
+    return _instruments.timed(stage, func, *args)
+
+def countFailure(kind):
+    """Count one failure of `kind` in the current instrumentation."""
+    _instruments.fail(kind)
+
+def instrumentSnapshot():
+    """Return the timings and counters recorded in this process as an `InstrumentSnapshot`."""
+    return _instruments.snapshot()
+
+def resetInstruments():
+    """Drop the timings and counters recorded in this process."""
+    _instruments.reset()
+
+def enableInstruments(enabled=True):
+    """Turn recording of timings and counters on or off for this process."""
+    _instruments.enabled = enabled
+
+@contextmanager
+def instrumented(window=1024):
+    """
+    Record the stages run within a `with` block separately from the rest of the process.
+
+    A fresh Instrumentation replaces the process-wide one for the block and is yielded; its
+    `snapshot()` describes only the work done inside the block.
+    """
+    global _instruments
+    previous, _instruments = _instruments, Instrumentation(window)
+    try:
+        yield _instruments
+    finally:
+        _instruments = previous
@@ -0,0 +1,43 @@
+"""
+Deferred import of NumPy.
+
+Importing NumPy takes far longer than balancing a small equation, which `smallSystemSolution`
+does on lists of ints. Modules refer to NumPy through `numpy`, a stand-in that imports it the
+first time one of its attributes is used, so a process that only balances small equations
+(and asks for balanced strings rather than coefficient arrays) never imports it.
+
+    from .lazyImport import numpy as np
+
+Classes:
+    LazyModule(string) -> LazyModule
+
+"""
+import importlib
+import sys
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Attributes read through the stand-in are kept on it, so later reads cost no more than
+    reading them from the module itself.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(importlib.import_module(self._name), attr)
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+    @property
+    def loaded(self):
+        """Whether the module has been imported, by this stand-in or otherwise."""
+        return self._name in sys.modules
+
+numpy = LazyModule("numpy")
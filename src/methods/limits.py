@@ -0,0 +1,156 @@
+"""
+Limits on the complexity of equations, and cooperative cancellation of their solves.
+
+The work of balancing grows with the length and nesting of terms, the number of terms and
+elements, and the size of the atom counts, so one pathological equation could hold a worker
+for as long as it takes. The fields of `ComplexityLimits` bound what `scanEquation` accepts;
+an equation beyond one of them is rejected while it is read, before anything is solved, with
+a `ComplexityError` naming the limit. No limits are set by default; `setLimits` sets them for
+the process (and `balanceMany` passes them on to its workers), `limited` for a `with` block.
+
+    term_length : most characters in a term
+    depth : most parentheses open at once in a term
+    species : most terms in an equation
+    elements : most distinct elements in an equation
+    count_bits : largest bit length of an atom count of a term, groups multiplied out
+    seconds : longest wall time spent solving one equation
+
+Solving is stopped cooperatively: the solvers call `checkpoint` once per pivot column (or
+prime), which raises `BalancingTimeoutError` once the equation has been solved for longer than
+`seconds`, or `BalancingCancelledError` once the `CancelToken` it was given is cancelled, from
+any thread. A `BalanceResult` solves under its own `Budget`; with no time limit or token, a
+checkpoint is a single attribute read.
+
+Classes:
+    ComplexityLimits(int, int, int, int, int, float) -> namedtuple
+    CancelToken() -> CancelToken
+    Budget(float, CancelToken) -> Budget
+
+Functions:
+    setLimits(ComplexityLimits) -> None
+    getLimits() -> ComplexityLimits
+    limited(ComplexityLimits) -> contextmanager
+    solveBudget(CancelToken) -> Budget | None
+    budgeted(Budget) -> contextmanager
+    checkpoint() -> None
+
+"""
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from time import perf_counter
+from .errors import BalancingCancelledError, BalancingTimeoutError
+
+# Limits on the equations accepted and the time spent solving each; None is no limit
+ComplexityLimits = namedtuple("ComplexityLimits", ["term_length", "depth", "species", "elements", "count_bits", "seconds"],
+                              defaults=(None,) * 6)
+# No limits, the default
+UNLIMITED = ComplexityLimits()
+
+# Set through `setLimits`
+_limits = UNLIMITED
+# Budget of the solve running in each thread, set through `budgeted`
+_local = threading.local()
+
+class CancelToken:
+    """
+    Flag that stops the solves it is given to at their next checkpoint.
+
+    A token can be cancelled from any thread, e.g. by a request handler whose client went away.
+    """
+    __slots__ = ("cancelled",)
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop the solves using this token at their next checkpoint."""
+        self.cancelled = True
+
+class Budget:
+    """
+    Deadline and cancel token of one solve, checked by `checkpoint`.
+
+    Attributes:
+        seconds (float | None) : time allowed, from the creation of the budget
+        deadline (float | None) : `perf_counter` time past which the solve is stopped
+        token (CancelToken | None) : token that stops the solve once cancelled
+    """
+    __slots__ = ("seconds", "deadline", "token")
+
+    def __init__(self, seconds=None, token=None):
+        self.seconds = seconds
+        self.deadline = None if seconds is None else perf_counter() + seconds
+        self.token = token
+
+    def check(self):
+        """
+        Raise if the solve must stop.
+
+            Raises:
+                BalancingCancelledError : if the token was cancelled
+                BalancingTimeoutError : if the deadline has passed
+        """
+        if self.token is not None and self.token.cancelled:
+            raise BalancingCancelledError("Cancelled: balancing was cancelled")
+        if self.deadline is not None and perf_counter() > self.deadline:
+            raise BalancingTimeoutError(f"Timed out: balancing took longer than {self.seconds:g} s")
+
+def setLimits(limits):
+    """
+    Apply complexity limits to the equations balanced in this process; `UNLIMITED` (or None) lifts them.
+
+        Parameters:
+            limits (ComplexityLimits) : limits to apply; fields left None are not limited
+        Raises:
+            ValueError : if a limit is not positive
+    """
+    global _limits
+    limits = UNLIMITED if limits is None else limits
+    for field, bound in limits._asdict().items():
+        if bound is not None and not bound > 0:
+            raise ValueError(f"{field} limit must be positive")
+    _limits = limits
+
+def getLimits():
+    """Return the complexity limits of this process, see `setLimits`."""
+    return _limits
+
+@contextmanager
+def limited(limits):
+    """Apply complexity limits to the equations balanced within a `with` block, then restore the previous ones."""
+    previous = _limits
+    setLimits(limits)
+    try:
+        yield limits
+    finally:
+        setLimits(previous)
+
+def solveBudget(token=None):
+    """
+    Start the budget of one solve under the current `seconds` limit.
+
+        Parameters:
+            token (CancelToken) : token that stops the solve once cancelled, or None
+        Returns:
+            budget (Budget) : the budget, or None if there is neither a time limit nor a token
+    """
+    if _limits.seconds is None and token is None:
+        return None
+    return Budget(_limits.seconds, token)
+
+@contextmanager
+def budgeted(budget):
+    """Make `budget` the one checked by `checkpoint` in this thread within a `with` block."""
+    previous = getattr(_local, "budget", None)
+    _local.budget = budget
+    try:
+        yield budget
+    finally:
+        _local.budget = previous
+
+def checkpoint():
+    """Stop the solve running in this thread if its budget is spent or its token cancelled, see `Budget.check`."""
+    budget = getattr(_local, "budget", None)
+    if budget is not None:
+        budget.check()
@@ -0,0 +1,298 @@
+"""
+Persistent result cache in a local SQLite database, shared by processes.
+
+`result_cache` is lost when a process exits, and each worker of a pool fills its own. A
+`PersistentCache` keeps solved equations in a SQLite file instead, under the same canonical
+keys, so that a restarted process, or every worker of a pool, finds the equations any of them
+solved before. Set one with `setPersistentCache`; `BalanceResult` then looks up equations
+missing from `result_cache` in it, and stores every equation it solves in both.
+
+    results : one row per equation
+        equation : canonical key, as 'H2 + O2 : H2O' with the terms of each side sorted [TEXT]
+        coefficients : balancing coefficients in canonical term order, space separated [TEXT]
+        exact : 1 if the NumPy path gives the coefficients as Python integers (object dtype) [INTEGER]
+        balanced : the canonical equation balanced, e.g. '2 H2 + O2 : 2 H2O' [TEXT]
+        stored : time the row was written, in seconds since the epoch [REAL]
+
+The database is in WAL mode, so processes read it while another writes. Writes are held back
+and written in one transaction once `batch_size` solutions are waiting or `flush_interval`
+seconds have passed, at the end of each chunk of `balanceMany`, and when the process exits.
+Rows older than `max_age` are no longer read, and beyond `max_entries` the oldest are dropped.
+Both are deleted after a flush once the writes since the last eviction reach a sixteenth of
+`max_entries` (or `batch_size`), so the table may exceed `max_entries` by that much in between.
+
+    setPersistentCache(PersistentCache("results.db", max_entries=10**6, max_age=30 * 86400))
+
+Functions:
+    flushCaches() -> None
+    keyText(tuple[tuple[str], tuple[str]]) -> string
+    keyFromText(string) -> tuple[tuple[str], tuple[str]]
+    balancedText(string, list[int]) -> string
+
+Classes:
+    PersistentCache(string, int, float, int, float) -> PersistentCache
+
+"""
+import atexit
+import os
+import weakref
+from threading import Lock
+from time import time
+from .wrapSolution import wrapSolvedEquation
+
+# Version of the database layout, kept in its `user_version`
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    equation TEXT PRIMARY KEY,
+    coefficients TEXT NOT NULL,
+    exact INTEGER NOT NULL,
+    balanced TEXT NOT NULL,
+    stored REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_stored ON results (stored);
+"""
+# Caches open in this process, flushed when it exits; held weakly, so that they can be dropped
+_open_caches = weakref.WeakSet()
+
+class PersistentCache:
+    """
+    Solved equations kept in a SQLite database, read and written by any number of processes.
+
+    Each process opens its own connection, on first use; a cache inherited by a forked worker,
+    or unpickled in a spawned one, opens the same file again. Use by threads is guarded by a lock.
+
+    Attributes:
+        path (string) : database file
+        max_entries (int | None) : most rows kept, or None for no limit
+        max_age (float | None) : seconds a row is kept, or None for no limit
+        batch_size (int) : solutions held back before they are written
+        flush_interval (float) : longest time, in seconds, a solution is held back
+        hits (int) : lookups answered from the database or the write-behind buffer
+        misses (int) : lookups that found nothing
+    """
+
+    def __init__(self, path, max_entries=None, max_age=None, batch_size=256, flush_interval=1.0):
+        """
+        Arguments:
+            path: database file; it is created if needed [string]
+            max_entries: most rows kept, or None for no limit [int]
+            max_age: seconds a row is kept, or None for no limit [float]
+            batch_size: solutions held back before they are written [int]
+            flush_interval: longest time, in seconds, a solution is held back [float]
+        Raises:
+            ValueError: if a limit is not positive, or the database has another layout
+        """
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        if max_age is not None and max_age <= 0:
+            raise ValueError("max_age must be positive")
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.hits = self.misses = 0
+        self._lock = Lock()
+        # Solutions not written yet (key text : (values, exact)), and when the oldest was held back
+        self._pending = {}
+        self._pending_since = None
+        self._unevicted = 0
+        self._connection = self._pid = None
+        # Connections inherited from the parent process, see `_connect`
+        self._inherited = []
+        self._connect()
+        _open_caches.add(self)
+
+    def __repr__(self):
+        return f"PersistentCache({self.path!r})"
+
+    def __del__(self):
+        # A cache dropped before the process exits writes what it still holds back
+        if getattr(self, "_pending", None):
+            self.flush()
+
+    def __reduce__(self):
+        return PersistentCache, (self.path, self.max_entries, self.max_age, self.batch_size, self.flush_interval)
+
+    def __len__(self):
+        """Number of rows in the database, after writing the held back solutions."""
+        self.flush()
+        with self._lock:
+            return self._connect().execute("SELECT count(*) FROM results").fetchone()[0]
+
+    def get(self, key):
+        """
+        Look up the solution of a canonical key.
+
+        Arguments:
+            key: canonical key of an equation, see `canonicalizeEquation` [tuple]
+        Return:
+            solution: coefficients in canonical term order and their `exact` flag, or None [tuple(list(int), boolean)]
+        """
+        text = keyText(key)
+        with self._lock:
+            solution = self._pending.get(text)
+            if solution is None:
+                row = self._connect().execute("SELECT coefficients, exact FROM results WHERE equation = ? AND stored >= ?",
+                                              (text, self._oldest())).fetchone()
+                if row is not None:
+                    solution = [int(value) for value in row[0].split()], bool(row[1])
+            if solution is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return solution
+
+    def put(self, key, values, exact):
+        """
+        Hold back the solution of a canonical key, to be written with others, see `flush`.
+
+        Arguments:
+            key: canonical key of an equation, see `canonicalizeEquation` [tuple]
+            values: coefficients in canonical term order [list(int)]
+            exact: the NumPy path gives them as Python integers (object dtype) [boolean]
+        """
+        with self._lock:
+            self._pending[keyText(key)] = values, exact
+            if self._pending_since is None:
+                self._pending_since = time()
+            due = len(self._pending) >= self.batch_size or time() - self._pending_since >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the held back solutions in one transaction, then evict rows if it is time to.
+
+        Return:
+            written: number of solutions written [int]
+        """
+        with self._lock:
+            pending, self._pending, self._pending_since = self._pending, {}, None
+            if not pending:
+                return 0
+            now = time()
+            rows = [(text, " ".join(map(str, values)), int(exact), balancedText(text, values), now)
+                    for text, (values, exact) in pending.items()]
+            connection = self._connect()
+            with connection:
+                connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", rows)
+            self._unevicted += len(rows)
+            if self._unevicted >= (self.batch_size if self.max_entries is None else max(1, self.max_entries // 16)):
+                self._evict()
+            return len(rows)
+
+    def preload(self, cache, limit=None):
+        """
+        Copy the newest rows into an in-process cache, e.g. `result_cache` at start up.
+
+        Arguments:
+            cache: cache to fill, keyed like `result_cache` [LRUCache]
+            limit: most rows copied; defaults to the size of `cache` [int]
+        Return:
+            loaded: number of rows copied [int]
+        """
+        self.flush()
+        limit = cache.maxsize if limit is None else limit
+        with self._lock:
+            rows = self._connect().execute("SELECT equation, coefficients, exact FROM results WHERE stored >= ? "
+                                           "ORDER BY stored DESC LIMIT ?", (self._oldest(), limit)).fetchall()
+        # Oldest first, so that the newest end up the most recently used
+        for text, coefficients, exact in reversed(rows):
+            cache.put(keyFromText(text), ([int(value) for value in coefficients.split()], bool(exact)))
+        return len(rows)
+
+    def evict(self):
+        """
+        Drop the rows beyond `max_age` and `max_entries` now.
+
+        Return:
+            removed: number of rows dropped [int]
+        """
+        self.flush()
+        with self._lock:
+            return self._evict()
+
+    def clear(self):
+        """Drop every row and held back solution, and reset the counters."""
+        with self._lock:
+            self._pending, self._pending_since = {}, None
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM results")
+            self.hits = self.misses = self._unevicted = 0
+
+    def close(self):
+        """Write the held back solutions and close this process's connection."""
+        self.flush()
+        _open_caches.discard(self)
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = self._pid = None
+
+    def _connect(self):
+        """Return the connection of this process, opening it (and creating the database) if needed."""
+        if self._pid == os.getpid():
+            return self._connection
+        # Imported here: sqlite3 is only needed when a persistent cache is used
+        import sqlite3
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version == 0:
+            with connection:
+                connection.executescript(SCHEMA)
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        elif version != SCHEMA_VERSION:
+            connection.close()
+            raise ValueError(f"{self.path} is a version {version} result cache; expected version {SCHEMA_VERSION}")
+        # A connection inherited from the parent process is kept, unused and open: closing it
+        # would release the locks this process holds on the file through its own connection
+        if self._connection is not None:
+            self._inherited.append(self._connection)
+        self._connection, self._pid = connection, os.getpid()
+        return connection
+
+    def _oldest(self):
+        """Earliest `stored` time of the rows still read."""
+        return float("-inf") if self.max_age is None else time() - self.max_age
+
+    def _evict(self):
+        """Drop the rows beyond `max_age` and `max_entries`; the lock must be held."""
+        connection = self._connect()
+        with connection:
+            removed = 0
+            if self.max_age is not None:
+                removed += connection.execute("DELETE FROM results WHERE stored < ?", (self._oldest(),)).rowcount
+            if self.max_entries is not None:
+                removed += connection.execute("DELETE FROM results WHERE equation IN (SELECT equation FROM results "
+                                              "ORDER BY stored DESC LIMIT -1 OFFSET ?)", (self.max_entries,)).rowcount
+        self._unevicted = 0
+        return removed
+
+def flushCaches():
+    """Write the held back solutions of every cache open in this process; run when it exits."""
+    for cache in list(_open_caches):
+        cache.flush()
+
+atexit.register(flushCaches)
+
+def keyText(key):
+    """Write a canonical key as an equation string, e.g. (('H2', 'O2'), ('H2O',)) -> 'H2 + O2 : H2O'."""
+    reactants, products = key
+    return " + ".join(reactants) + " : " + " + ".join(products)
+
+def keyFromText(text):
+    """Read a canonical key written by `keyText`."""
+    reactants, products = text.split(" : ")
+    return tuple(reactants.split(" + ")), tuple(products.split(" + "))
+
+def balancedText(text, values):
+    """Balance the canonical equation `text` with coefficients in canonical term order."""
+    reactants, products = keyFromText(text)
+    return wrapSolvedEquation((list(reactants), list(products)), values)
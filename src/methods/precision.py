@@ -0,0 +1,54 @@
+"""
+Integer precision tiers used by the solve pipeline.
+
+Matrices start as int64 arrays. A step that could exceed int64 promotes its arrays to
+object arrays of Python integers, which are exact at any size; later steps keep that dtype,
+so the dtype of the coefficients tells which tier produced them.
+
+Functions:
+    fitsInt64(int) -> boolean
+    maxAbs(ndarray) -> int
+    exactLcm(ndarray) -> int
+    toExact(ndarray) -> ndarray
+    coefficientArray(list[int], boolean) -> ndarray
+    precisionTier(ndarray) -> string
+
+"""
+from math import lcm
+from .lazyImport import numpy as np
+
+# Largest int64, np.iinfo(np.int64).max, written out so that NumPy is not imported to read it
+INT64_MAX = 2**63 - 1
+
+def fitsInt64(value):
+    """Check that an integer can be stored in an int64 array, with room to negate it."""
+    return -INT64_MAX <= value <= INT64_MAX
+
+def maxAbs(array):
+    """Return the largest magnitude in an integer array as a Python int (0 if empty)."""
+    if len(array) == 0:
+        return 0
+    return max(abs(int(value)) for value in (array.max(), array.min()))
+
+def exactLcm(array):
+    """Return the least common multiple of the entries of an integer array, without overflow."""
+    return lcm(*array.tolist())
+
+def toExact(array):
+    """Return a copy of an integer array holding Python ints, which do not overflow."""
+    return np.array(array.tolist(), dtype=object).reshape(np.shape(array))
+
+def coefficientArray(values, exact):
+    """Return coefficients held as Python ints as an int64 array, or an object array if `exact`."""
+    return np.array(values, dtype=object if exact else np.int64)
+
+def precisionTier(array):
+    """
+    Name the precision tier of an integer array.
+
+        Parameters:
+            array (ndarray) : integer array, e.g. balancing coefficients
+        Returns:
+            tier (string) : "int64" for fixed-width integers, "exact" for Python integers
+    """
+    return "exact" if array.dtype == object else "int64"
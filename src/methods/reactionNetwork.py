@@ -0,0 +1,134 @@
+"""
+Sparse stoichiometry of a whole reaction network.
+
+A network of reactions shares one species index and one element index. The composition of
+every species is stored once, as a compressed sparse row (CSR) matrix of element counts,
+and each reaction's system matrix is assembled from the rows of its species.
+
+Classes:
+    ReactionNetwork(list[string]) -> ReactionNetwork
+
+"""
+from .constructSystemMatrix import separateSides, getTerms, termSpecies
+from .errors import InvalidEquationError
+from .lazyImport import numpy as np
+from .precision import fitsInt64
+from .solveSystem import solveSystemMatrix
+from .species import element_table
+from .validateChemEq import equationError
+
+class ReactionNetwork:
+    """
+    Reactions over a shared set of species, with compositions stored in CSR form.
+
+    Attributes:
+        species (list[str]) : species names, indexed by species id
+        elements (list[str]) : element symbols, indexed by element id
+        indptr (ndarray) : composition of species `s` is at indices/data[indptr[s]:indptr[s+1]]
+        indices (ndarray) : element ids of the nonzero counts
+        data (ndarray) : the nonzero counts
+        reaction_indptr (ndarray) : species of reaction `r` are at reaction_species[reaction_indptr[r]:reaction_indptr[r+1]]
+        reaction_species (ndarray) : species ids of each reaction's terms, reactants first
+        reactant_counts (ndarray) : number of reactants of each reaction
+    """
+
+    def __init__(self, equations, validate=True):
+        """
+        Index the species and elements of a list of equations, parsing each species once.
+
+            Parameters:
+                equations (iterable[str]) : unbalanced chemical equations
+                validate (boolean) : check the equations first; pass False if they are known to be valid
+            Raises:
+                InvalidEquationError : if an equation does not satisfy the equation criteria
+        """
+        self.species, self.elements = [], []
+        species_ids, element_ids = {}, {}  # element_ids maps interned ids (see `element_table`) to network ids
+        indptr, indices, data = [0], [], []
+        reaction_indptr, reaction_species, reactant_counts = [0], [], []
+        for reaction, equation in enumerate(equations):
+            error = equationError(equation) if validate else None
+            if error is not None:
+                raise InvalidEquationError(f"Reaction {reaction}: {error}", error.position)
+            reactants, products = (getTerms(side) for side in separateSides(equation))
+            for term in reactants + products:
+                if term not in species_ids:
+                    species_ids[term] = len(self.species)
+                    self.species.append(term)
+                    for element, ct in termSpecies(term).items():
+                        if element not in element_ids:
+                            element_ids[element] = len(self.elements)
+                            self.elements.append(element_table.symbol(element))
+                        indices.append(element_ids[element])
+                        data.append(ct)
+                    indptr.append(len(indices))
+                reaction_species.append(species_ids[term])
+            reaction_indptr.append(len(reaction_species))
+            reactant_counts.append(len(reactants))
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int32)
+        self.data = np.array(data, dtype=int if all(fitsInt64(ct) for ct in data) else object)
+        self.reaction_indptr = np.array(reaction_indptr, dtype=np.int64)
+        self.reaction_species = np.array(reaction_species, dtype=np.int32)
+        self.reactant_counts = np.array(reactant_counts, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.reactant_counts)
+
+    @property
+    def nnz(self):
+        """Number of nonzero element counts stored."""
+        return len(self.data)
+
+    def reactionSpecies(self, reaction):
+        """Return the species ids of a reaction's terms, reactants first."""
+        return self.reaction_species[self.reaction_indptr[reaction]:self.reaction_indptr[reaction+1]]
+
+    def sidesTerms(self, reaction):
+        """
+        Return the terms of a reaction, in the format of `processEquation`.
+
+            Parameters:
+                reaction (int) : reaction id
+            Returns:
+                sides_terms (tuple(list[str], list[str])) : reactant and product terms
+        """
+        terms = [self.species[s] for s in self.reactionSpecies(reaction)]
+        n = self.reactant_counts[reaction]
+        return terms[:n], terms[n:]
+
+    def systemMatrix(self, reaction):
+        """
+        Assemble the system matrix of a reaction from the composition rows of its species.
+
+        Rows correspond to the elements in the reaction, in order of element id, and columns
+        to the reaction's terms; products are counted negatively, as in `equationToMatrix`.
+
+            Parameters:
+                reaction (int) : reaction id
+            Returns:
+                matrix (ndarray) : the system matrix of the reaction
+        """
+        species = self.reactionSpecies(reaction)
+        starts, stops = self.indptr[species], self.indptr[species+1]
+        cols = np.repeat(np.arange(len(species)), stops - starts)
+        nonzeros = np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)] + [np.zeros(0, dtype=int)])
+        values = self.data[nonzeros]
+        sign = np.where(cols < self.reactant_counts[reaction], 1, -1)
+        elements, rows = np.unique(self.indices[nonzeros], return_inverse=True)
+        matrix = np.zeros((len(elements), len(species)), dtype=self.data.dtype)
+        matrix[rows, cols] = sign * values
+        return matrix
+
+    def balance(self, reaction):
+        """
+        Find the coefficients that balance a reaction of the network.
+
+            Parameters:
+                reaction (int) : reaction id
+            Returns:
+                coefficients (ndarray) : balancing coefficients, in the order of the reaction's terms
+            Raises:
+                UnsolvableEquationError : if the reaction does not have a unique solution
+        """
+        return solveSystemMatrix(self.systemMatrix(reaction))
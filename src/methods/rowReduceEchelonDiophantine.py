@@ -4,50 +4,104 @@ Row reduce matrices for homogenous linear diophantine systems.
 See module numpy for ndarray objects
 
 Functions:
-    row_reduce_diophantine(ndarray) -> ndarray
-    removeZeroRows(ndarray) -> ndarray
+    diophantineRowReduce(ndarray) -> ndarray
+    reduceInPlace(ndarray) -> ndarray
+    eliminateColumn(ndarray, int, int) -> None
+    primitiveRow(ndarray) -> ndarray
 '''
-import numpy as np
+from math import gcd
+from .instrument import countFailure
+from .lazyImport import numpy as np
+from .limits import checkpoint
+from .precision import INT64_MAX, maxAbs, toExact
+
 def diophantineRowReduce(i_matrix):
     """
     Reduce a homogenous linear diophantine system matrix.
 
+    Elimination is fraction-free: a row is cleared by cross-multiplying it with the pivot row
+    (each scaled by their gcd), then divided by the gcd of its entries. Every row is thus the
+    primitive integer multiple of the corresponding row of the rational elimination, i.e. the
+    smallest integer row it can be. This is not Bareiss elimination, which divides exactly by
+    the previous pivot instead of by the row content.
+
+    Reduction runs on int64 and restarts on Python integers (object dtype) if an entry
+    could overflow; see `precision`.
+
         Parameters:
             matrix (ndarray): A matrix representing a diophantine linear system
         
         Returns:
             matrix (ndarray): A matrix in row reduced echelon form with rows scaled such that all entries are integers 
     """
-    matrix=i_matrix
+    try:
+        return reduceInPlace(np.array(i_matrix))
+    except OverflowError:
+        countFailure("overflow")
+        return reduceInPlace(toExact(i_matrix))
+
+def reduceInPlace(matrix):
+    """
+    Reduce a homogenous linear diophantine system matrix in place; see `diophantineRowReduce`.
+
+        Parameters:
+            matrix (ndarray): A matrix representing a diophantine linear system
+        Returns:
+            matrix (ndarray): the reduced matrix
+        Raises:
+            OverflowError: if an int64 matrix cannot be reduced without overflow
+            BalancingCancelledError: if the solve is stopped at a checkpoint, see `limits`
+    """
     n, m = np.shape(matrix)
     # Row Reduce
-    for k in range(np.min([n,m])):
-        # If zero pivot, switch with earliest non zero in column
-        if matrix[k][k] == 0:
-            nonzeros = list(filter(lambda d: d[1] != 0, enumerate(matrix.transpose()[k])))
-            if len(nonzeros) == 0:
-                # potential error here....
-                # later functions divide by this element, so potential / 0 error
-                continue
-            else:
-                try:
-                    swp = list(filter(lambda d: d[0] > k, nonzeros))[0][0]
-                    matrix[[k, swp]] = matrix[[swp, k]]
-                except IndexError:
-                    # If there are no nonzero pivots below, do nothing
-                    continue
-        # Cancel columns
-        for i in range(n):
-            if matrix[i][k] != 0:
-                if i != k:
-                    alpha = np.lcm(matrix[k][k], matrix[i][k])
-                    matrix[i] = alpha / matrix[i][k] * matrix[i] -  alpha / matrix[k][k] * matrix[k]
+    row = 0
+    for col in range(m):
+        if row == n:
+            break
+        checkpoint()
+        # Pick the smallest non zero pivot at or below `row`, skip columns without one
+        nonzeros = row + np.flatnonzero(matrix[row:, col])
+        if len(nonzeros) == 0:
+            continue
+        swp = nonzeros[np.argmin(np.abs(matrix[nonzeros, col]))]
+        if swp != row:
+            matrix[[row, swp]] = matrix[[swp, row]]
+        eliminateColumn(matrix, row, col)
+        row += 1
     # Simplify
-    for k in range(np.min([n,m])):
-        # Divide row by gcd
-        if matrix[k][k] != 0:
-            matrix[k] = matrix[k] / np.gcd.reduce(matrix[k]) 
+    for k in range(row):
+        matrix[k] = primitiveRow(matrix[k])
         # Ensure positive pivots
-        if matrix[k][k] < 0:
+        if matrix[k][np.flatnonzero(matrix[k])[0]] < 0:
             matrix[k] *= -1
-    return matrix
\ No newline at end of file
+    return matrix
+
+def eliminateColumn(matrix, row, col):
+    """
+    Cancel column `col` of every row except `row`, in place, using matrix[row][col] as the pivot.
+
+        Parameters:
+            matrix (ndarray): integer matrix
+            row (int): index of the pivot row
+            col (int): index of the pivot column
+        Raises:
+            OverflowError: if an int64 matrix cannot be updated without overflow
+    """
+    pivot = int(matrix[row][col])
+    checked = matrix.dtype != object
+    if checked:
+        pivotRowMax = maxAbs(matrix[row])
+    for i in np.flatnonzero(matrix[:, col]):
+        if i != row:
+            entry = int(matrix[i][col])
+            g = gcd(pivot, entry)
+            if checked and abs(pivot // g) * maxAbs(matrix[i]) + abs(entry // g) * pivotRowMax > INT64_MAX:
+                raise OverflowError("int64 overflow in row reduction")
+            matrix[i] = primitiveRow((pivot // g) * matrix[i] - (entry // g) * matrix[row])
+
+def primitiveRow(row):
+    """Divide an integer row by the gcd of its entries."""
+    content = np.gcd.reduce(row)
+    if content > 1:
+        return row // content
+    return row
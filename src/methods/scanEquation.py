@@ -0,0 +1,313 @@
+"""
+Validate and tokenize a chemical equation in one left-to-right pass.
+
+The scanner applies the criteria of `validateChemicalEquation` while it reads the terms, so
+a valid equation comes out already split into sides and terms, with every term as a `Species`.
+An invalid equation raises `InvalidEquationError` carrying the
+index of the offending character. Terms already in `species_cache`, or in the species table,
+are taken from it rather than read again, and every term read is added to the cache; with `cache` False, the
+caches are neither read nor written, as for validation. Equations beyond the complexity limits
+set with `setLimits` raise `ComplexityError`, as soon as the scanner reads past a limit.
+
+Functions:
+    scanEquation(string, boolean) -> ScannedEquation
+    scanSpecies(string, boolean) -> Species
+    scanTerm(string, boolean) -> dict[string, int]
+    addTerm(string, int, tuple[list, list], tuple[list, list], dict[string, int], boolean) -> None
+    checkCachedTerm(string, int, ComplexityLimits) -> None
+    termDepth(string) -> int
+    withinLimits(tuple[list, list], ComplexityLimits) -> boolean
+    checkTerm(string, int, tuple[list, list], iterable[int], ComplexityLimits) -> None
+
+"""
+import re
+from collections import namedtuple
+from .constructSystemMatrix import cachedSpecies, species_cache, termSpecies
+from .errors import ComplexityError, InvalidEquationError
+from .limits import getLimits
+from .species import Species, speciesSymbols
+
+class ScannedEquation(namedtuple("ScannedEquation", ["sides_terms", "sides_species", "atoms"])):
+    """Result of `scanEquation`; sides hold lists in reactant, product order."""
+    __slots__ = ()
+
+    @property
+    def sides_compositions(self):
+        """Atom counts of each term on each side (atom : count), as new dictionaries."""
+        return tuple([species.composition() for species in side] for side in self.sides_species)
+
+# One alternative per token kind; the kind is read from the index of the last group matched
+TOKENS = re.compile(r"([A-Z][a-z]*)(\d*)|(\()|(\))(\d*)|(\d+)|([a-z]+)|(\+)|(:)|( +)|(.)", re.S)
+ELEMENT, OPEN, CLOSE, NUMBER, LOWER, PLUS, COLON, SPACE, OTHER = 2, 3, 5, 6, 7, 8, 9, 10, 11
+# End of the term being read
+SEPARATOR = re.compile(r"[+:]")
+
+def scanEquation(raw_equation, cache=True):
+    """
+    Check that an equation satisfies the equation criteria and split it into counted terms.
+
+        Parameters:
+            raw_equation (string) : unbalanced chemical equation
+            cache (boolean) : take terms from `species_cache` and the species table, and add those read to the cache
+        Returns:
+            scanned (ScannedEquation) : terms of each side, the Species of each term, and the
+                alphabetically ordered atoms of the equation
+        Raises:
+            InvalidEquationError : if the equation does not satisfy the criteria
+            ComplexityError : if the equation exceeds one of the complexity limits
+    """
+    limits = getLimits()
+    # No term is longer, or deeper, than the equation; so are the bounds of unset limits
+    max_length = limits.term_length or len(raw_equation)
+    max_depth = limits.depth or len(raw_equation)
+    check_terms = limits.species is not None or limits.count_bits is not None
+    check_cached = limits.term_length is not None or limits.depth is not None
+    sides_terms, sides_species = ([], []), ([], [])
+    atoms = set()
+    cached = []  # terms taken from the caches, whose atoms are added at the end
+    side = 0
+    stack = None  # group counts of the term being read; None between terms
+    term_start = term_end = 0
+    space_at = -1  # index of a space inside the term being read
+    idx, end = 0, len(raw_equation)
+    while idx < end:
+        token = TOKENS.match(raw_equation, idx)
+        kind, pos, idx = token.lastindex, token.start(), token.end()
+        if kind == SPACE:
+            if stack is not None and space_at < 0:
+                space_at = pos
+            continue
+        if kind == PLUS or kind == COLON:
+            if stack is not None:
+                if len(stack) != 1:
+                    raise unbalanced(raw_equation, term_start)
+                addTerm(raw_equation[term_start:term_end], side, sides_terms, sides_species, stack[0], cache)
+                if check_terms:
+                    checkTerm(raw_equation, term_start, sides_terms, stack[0].values(), limits)
+                stack = None
+            if kind == COLON:
+                side += 1
+                if side > 1:
+                    raise InvalidEquationError("Invalid String: There are not two sides of an equation separated by ':'", pos)
+            continue
+        if kind == OTHER:
+            raise InvalidEquationError(f"Invalid String: Contains illegal character '{token.group()}' at index {pos}", pos)
+        # Remaining tokens are part of a term
+        if stack is None:
+            if kind != ELEMENT and kind != OPEN:
+                term = segment(raw_equation, pos)
+                raise InvalidEquationError(f"Invalid String: Term '{term}' does not begin with an uppercase letter", pos)
+            # A term read before, or in the species table, is taken as it is; both only hold valid terms
+            stop = SEPARATOR.search(raw_equation, pos)
+            stop = end if stop is None else stop.start()
+            term = raw_equation[pos:stop].rstrip(" ")
+            species = cachedSpecies(term) if cache else None
+            if species is not None:
+                if check_cached:
+                    checkCachedTerm(term, pos, limits)
+                sides_terms[side].append(term)
+                sides_species[side].append(species)
+                cached.append(species)
+                if check_terms:
+                    checkTerm(raw_equation, pos, sides_terms, [ct for _, ct in species.items()], limits)
+                idx = stop
+                continue
+            stack, term_start, space_at = [{}], pos, -1
+        elif space_at >= 0:
+            raise InvalidEquationError(f"Invalid String: Terms '{segment(raw_equation, pos)}' are not properly joined", space_at)
+        if idx - term_start > max_length:
+            raise ComplexityError(f"Too complex: Term at index {term_start} is longer than {max_length} characters",
+                                  term_start, "term_length", idx - term_start)
+        if kind == ELEMENT:
+            atom, number = token.group(1, 2)
+            group = stack[-1]
+            group[atom] = group.get(atom, 0) + (int(number) if number else 1)
+            atoms.add(atom)
+        elif kind == OPEN:
+            stack.append({})
+            if len(stack) > max_depth + 1:
+                raise ComplexityError(f"Too complex: Term at index {term_start} nests parentheses deeper than {max_depth}",
+                                      pos, "depth", len(stack) - 1)
+        elif kind == CLOSE:
+            if len(stack) == 1:
+                raise unbalanced(raw_equation, pos)
+            number = token.group(5)
+            mult = int(number) if number else 1
+            group, outer = stack.pop(), stack[-1]
+            for atom, ct in group.items():
+                outer[atom] = outer.get(atom, 0) + ct * mult
+        elif kind == LOWER:
+            term = segment(raw_equation, pos)
+            sub = raw_equation[max(term_start, pos - 1):token.end()]
+            raise InvalidEquationError(f"Invalid String: Term '{term}' has invalid element in '{sub}'", pos)
+        else:
+            term = segment(raw_equation, pos)
+            raise InvalidEquationError(f"Invalid String: Term '{term}' has a number that does not follow an element or group", pos)
+        term_end = idx
+    if stack is not None:
+        if len(stack) != 1:
+            raise unbalanced(raw_equation, term_start)
+        addTerm(raw_equation[term_start:term_end], side, sides_terms, sides_species, stack[0], cache)
+        if check_terms:
+            checkTerm(raw_equation, term_start, sides_terms, stack[0].values(), limits)
+    if side != 1:
+        raise InvalidEquationError("Invalid String: There are not two sides of an equation separated by ':'", len(raw_equation))
+    if cached:
+        atoms.update(speciesSymbols(cached))
+    if limits.elements is not None and len(atoms) > limits.elements:
+        raise ComplexityError(f"Too complex: The equation has {len(atoms)} elements, more than {limits.elements}",
+                              None, "elements", len(atoms))
+    return ScannedEquation(sides_terms, sides_species, sorted(atoms))
+
+def scanSpecies(term, cache=True):
+    """
+    Check that a string is a single valid term and count its atoms, see `scanEquation`.
+
+        Parameters:
+            term (string) : term of a chemical equation
+            cache (boolean) : take the term from, and add it to, `species_cache`
+        Returns:
+            species (Species) : element ids and counts of the term
+        Raises:
+            InvalidEquationError : if the string is not a single valid term
+    """
+    scanned = scanEquation(term + " :", cache)
+    if scanned.sides_terms[0] != [term.strip()]:
+        raise InvalidEquationError(f"Invalid String: '{term}' is not a single term")
+    return scanned.sides_species[0][0]
+
+def scanTerm(term, cache=True):
+    """
+    Check that a string is a single valid term and count its atoms, see `scanSpecies`.
+
+        Parameters:
+            term (string) : term of a chemical equation
+            cache (boolean) : take the term from, and add it to, `species_cache`
+        Returns:
+            composition (dict) : number of each atom in the term (atom : count)
+        Raises:
+            InvalidEquationError : if the string is not a single valid term
+    """
+    return scanSpecies(term, cache).composition()
+
+def addTerm(term, side, sides_terms, sides_species, composition, cache=True):
+    """Record a term read by the scanner as a Species, and keep it in `species_cache` for the next equation containing it if `cache`."""
+    species = Species(term, composition)
+    sides_terms[side].append(term)
+    sides_species[side].append(species)
+    if cache:
+        species_cache.put(term, species)
+
+def checkCachedTerm(term, term_start, limits):
+    """
+    Check the `term_length` and `depth` limits of a term taken from `species_cache` rather than read.
+
+    A term beyond a limit is read token by token, to raise the error the scanner would have
+    raised reading it, with the same position and value.
+
+        Parameters:
+            term (string) : the term
+            term_start (int) : index where the term begins
+            limits (ComplexityLimits) : limits to check
+        Raises:
+            ComplexityError : if either limit is exceeded
+    """
+    max_length = limits.term_length or len(term)
+    max_depth = limits.depth or len(term)
+    if len(term) <= max_length and ("(" not in term or termDepth(term) <= max_depth):
+        return
+    idx = depth = 0
+    while idx < len(term):
+        token = TOKENS.match(term, idx)
+        kind, pos, idx = token.lastindex, token.start(), token.end()
+        if idx > max_length:
+            raise ComplexityError(f"Too complex: Term at index {term_start} is longer than {max_length} characters",
+                                  term_start, "term_length", idx)
+        if kind == OPEN:
+            depth += 1
+            if depth > max_depth:
+                raise ComplexityError(f"Too complex: Term at index {term_start} nests parentheses deeper than {max_depth}",
+                                      term_start + pos, "depth", depth)
+        elif kind == CLOSE:
+            depth -= 1
+
+def termDepth(term):
+    """Return the most parentheses open at once in a valid term."""
+    depth = deepest = 0
+    for char in term:
+        if char == "(":
+            depth += 1
+            deepest = max(deepest, depth)
+        elif char == ")":
+            depth -= 1
+    return deepest
+
+def withinLimits(sides_terms, limits):
+    """
+    Check the complexity limits of an equation already split into valid terms, e.g. one whose solution is cached.
+
+    The terms are not read again: their atom counts, needed for the `elements` and `count_bits`
+    limits only, are taken from `termSpecies`. The answer is the scanner's, which raises
+    `ComplexityError` for exactly the equations this rejects.
+
+        Parameters:
+            sides_terms (tuple(list[str], list[str])) : terms on each side of the equation
+            limits (ComplexityLimits) : limits to check
+        Returns:
+            (boolean) : False if the equation exceeds one of the limits
+    """
+    if limits.term_length is None and limits.depth is None and limits.species is None and \
+            limits.elements is None and limits.count_bits is None:
+        return True
+    terms = sides_terms[0] + sides_terms[1]
+    if limits.species is not None and len(terms) > limits.species:
+        return False
+    counted = limits.elements is not None or limits.count_bits is not None
+    element_ids = set()
+    for term in terms:
+        if limits.term_length is not None and len(term) > limits.term_length:
+            return False
+        if limits.depth is not None and "(" in term and termDepth(term) > limits.depth:
+            return False
+        if counted:
+            try:
+                items = termSpecies(term).items()
+            except InvalidEquationError:
+                return False
+            for element_id, ct in items:
+                if limits.count_bits is not None and abs(ct).bit_length() > limits.count_bits:
+                    return False
+                element_ids.add(element_id)
+    return limits.elements is None or len(element_ids) <= limits.elements
+
+def checkTerm(raw_equation, term_start, sides_terms, counts, limits):
+    """
+    Check the `species` and `count_bits` limits once a term has been read.
+
+        Parameters:
+            raw_equation (string) : the equation being scanned
+            term_start (int) : index where the term begins
+            sides_terms (tuple(list[str], list[str])) : terms read so far, including this one
+            counts (iterable(int)) : atom counts of the term
+            limits (ComplexityLimits) : limits to check
+        Raises:
+            ComplexityError : if either limit is exceeded
+    """
+    terms = len(sides_terms[0]) + len(sides_terms[1])
+    if limits.species is not None and terms > limits.species:
+        raise ComplexityError(f"Too complex: The equation has more than {limits.species} terms", term_start, "species", terms)
+    if limits.count_bits is not None:
+        bits = max((abs(ct).bit_length() for ct in counts), default=0)
+        if bits > limits.count_bits:
+            raise ComplexityError(f"Too complex: Term '{segment(raw_equation, term_start)}' has an atom count of "
+                                  f"{bits} bits, more than {limits.count_bits}", term_start, "count_bits", bits)
+
+def segment(raw_equation, pos):
+    """Return the text between the separators ('+' or ':') around `pos`, stripped."""
+    start = max(raw_equation.rfind("+", 0, pos), raw_equation.rfind(":", 0, pos)) + 1
+    ends = [end for end in (raw_equation.find("+", pos), raw_equation.find(":", pos)) if end != -1]
+    return raw_equation[start:min(ends, default=len(raw_equation))].strip()
+
+def unbalanced(raw_equation, pos):
+    """Build the error for a term with unbalanced parentheses."""
+    return InvalidEquationError(f"Invalid String: Term '{segment(raw_equation, pos)}' has unbalanced parentheses", pos)
@@ -0,0 +1,151 @@
+"""
+Solve small system matrices with Python integers.
+
+For equations of a few terms, the per-call overhead of NumPy (indexing single entries,
+reducing rows of three or four entries, `processor_matrix`) costs far more than the arithmetic.
+The functions here run the algorithm of `diophantineRowReduce`, `removeZeroRows`,
+`validateDRMat` and `extract_smallest_solution` on lists of ints, and find the same coefficients.
+
+Lists hold Python integers, so nothing overflows; where the NumPy path would have left int64
+for Python integers (object dtype), so does the result here, and its precision tier is the same.
+`smallSystemSolution` finds the coefficients without importing NumPy at all.
+
+Functions:
+    speciesRows(list[str], tuple(list[Species], list[Species])) -> list[list[int]]
+    solveSmallSystem(list[list[int]]) -> ndarray
+    smallSystemSolution(list[list[int]]) -> tuple[list[int], boolean]
+    reduceRows(list[list[int]]) -> tuple[list[list[int]], boolean]
+    primitiveList(list[int]) -> list[int]
+
+"""
+from math import gcd, lcm
+from .errors import UnsolvableEquationError
+from .limits import checkpoint
+from .precision import INT64_MAX, coefficientArray, fitsInt64
+from .species import element_table
+
+# Largest number of terms solved by `solveSmallSystem`; larger systems use the NumPy path.
+# Chosen by benchmark: lists are 3-4x faster than NumPy on the sparse systems of equations up
+# to at least 48 terms, but NumPy catches up on dense systems of about 32 terms.
+SMALL_SYSTEM_LIMIT = 16
+
+def speciesRows(atoms, sides_species):
+    """
+    Produce the system matrix of an equation as lists, see `speciesToMatrix`.
+
+    Arguments:
+        atoms: A list of the atoms in the equation, including every atom of the species [list(str)]
+        sides_species: the terms on each side [tuple(list[Species], list[Species])]
+    Returns:
+        rows: one row per atom, one column per term [list(list(int))]
+    """
+    reactants, products = sides_species
+    atom_rows = {element_table.intern(atom): [0] * (len(reactants) + len(products)) for atom in atoms}
+    for col, species in enumerate(reactants):
+        for element_id, ct in species.items():
+            atom_rows[element_id][col] = ct
+    for col, species in enumerate(products, len(reactants)):
+        for element_id, ct in species.items():
+            atom_rows[element_id][col] = -ct
+    return list(atom_rows.values())
+
+def solveSmallSystem(rows):
+    """
+    Find the smallest positive integer solution of a system matrix given as lists, see `solveSystemMatrix`.
+
+        Parameters:
+            rows (list(list(int))) : system matrix, one list per row
+        Returns:
+            coefficients (ndarray) : balancing coefficients, one per column
+        Raises:
+            UnsolvableEquationError : if the system does not have a unique solution
+    """
+    return coefficientArray(*smallSystemSolution(rows))
+
+def smallSystemSolution(rows):
+    """
+    Find the coefficients of `solveSmallSystem` as a list of Python ints.
+
+        Parameters:
+            rows (list(list(int))) : system matrix, one list per row
+        Returns:
+            values (list(int)) : balancing coefficients, one per column
+            exact (boolean) : the NumPy path would have found them as Python integers (object dtype)
+        Raises:
+            UnsolvableEquationError : if the system does not have a unique solution
+    """
+    m = len(rows[0])
+    rows, exact = reduceRows([list(row) for row in rows])
+    # Remove zero rows, as `removeZeroRows` does
+    rows = [row for row in rows if any(row)]
+    # Validate result, as `validateDRMat` does
+    pivots = [next(idx for idx, value in enumerate(row) if value) for row in rows]
+    if (any(sum(1 for value in row if value) != 2 or not row[-1] for row in rows) or
+            any(sum(1 for row in rows if row[col]) != 1 for col in range(m - 1)) or
+            any(pivots[n] <= pivots[n - 1] for n in range(1, len(rows))) or
+            any(row[pivot] < 0 for row, pivot in zip(rows, pivots))):
+        raise UnsolvableEquationError("Unsolvable: the equation does not have a unique solution")
+    # Extract solution, as `extract_smallest_solution` does
+    last = [row[-1] for row in rows]
+    leading = [sum(row[:-1]) for row in rows]
+    lcmOfLastVarCoefs = lcm(*last)
+    exact = exact or not fitsInt64(lcmOfLastVarCoefs * max(abs(value) for value in leading))
+    coefs = [(lcmOfLastVarCoefs // -end) * value for end, value in zip(last, leading)] + [lcmOfLastVarCoefs]
+    total = lcm(*coefs)
+    exact = exact or not fitsInt64(total)
+    return [total // coef for coef in coefs], exact
+
+def reduceRows(rows):
+    """
+    Reduce a system matrix given as lists in place, as `reduceInPlace` does.
+
+        Parameters:
+            rows (list(list(int))) : system matrix, one list per row
+        Returns:
+            rows (list(list(int))) : the reduced matrix
+            exact (boolean) : the NumPy path would have reduced with Python integers, see `diophantineRowReduce`
+        Raises:
+            BalancingCancelledError : if the solve is stopped at a checkpoint, see `limits`
+    """
+    n, m = len(rows), len(rows[0])
+    exact = not all(fitsInt64(value) for row in rows for value in row)
+    row = 0
+    for col in range(m):
+        if row == n:
+            break
+        checkpoint()
+        # Pick the smallest non zero pivot at or below `row`, skip columns without one
+        swp = -1
+        for i in range(row, n):
+            value = rows[i][col]
+            if value and (swp < 0 or abs(value) < abs(rows[swp][col])):
+                swp = i
+        if swp < 0:
+            continue
+        rows[row], rows[swp] = rows[swp], rows[row]
+        pivotRow = rows[row]
+        pivot = pivotRow[col]
+        pivotRowMax = max(map(abs, pivotRow))
+        for i in range(n):
+            entry = rows[i][col]
+            if entry and i != row:
+                g = gcd(pivot, entry)
+                # Python integers do not overflow; this only sets the precision tier of the result
+                if not exact and abs(pivot // g) * max(map(abs, rows[i])) + abs(entry // g) * pivotRowMax > INT64_MAX:
+                    exact = True
+                rows[i] = primitiveList([(pivot // g) * x - (entry // g) * y for x, y in zip(rows[i], pivotRow)])
+        row += 1
+    # Simplify
+    for k in range(row):
+        rows[k] = primitiveList(rows[k])
+        # Ensure positive pivots
+        if next(value for value in rows[k] if value) < 0:
+            rows[k] = [-value for value in rows[k]]
+    return rows, exact
+
+def primitiveList(row):
+    """Divide a list of integers by the gcd of its entries."""
+    content = gcd(*row)
+    if content > 1:
+        return [value // content for value in row]
+    return row
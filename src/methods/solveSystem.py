@@ -0,0 +1,41 @@
+"""
+Solve the system matrix of a chemical equation.
+
+Functions:
+    solveSystemMatrix(ndarray) -> ndarray
+
+"""
+from .errors import UnsolvableEquationError
+from .extractSolution import extract_smallest_solution, removeZeroRows
+from .modularSolver import MODULAR_SYSTEM_LIMIT, solveModular
+from .rowReduceEchelonDiophantine import diophantineRowReduce
+from .smallSolver import SMALL_SYSTEM_LIMIT, solveSmallSystem
+from .validateRREDMatrix import validateDRMat
+
+def solveSystemMatrix(matrix):
+    """
+    Find the smallest positive integer solution of a chemical equation's system matrix.
+
+        Parameters:
+            matrix (ndarray) : system matrix, as produced by `equationToMatrix`
+        Returns:
+            coefficients (ndarray) : balancing coefficients, one per column
+        Raises:
+            UnsolvableEquationError : if the system does not have a unique solution
+    """
+    # Small systems are faster on lists and large ones modulo primes; see `solveSmallSystem`, `solveModular`
+    coefficients = None
+    if matrix.shape[1] <= SMALL_SYSTEM_LIMIT and matrix.dtype != object:
+        coefficients = solveSmallSystem(matrix.tolist())
+    elif matrix.shape[1] >= MODULAR_SYSTEM_LIMIT:
+        coefficients = solveModular(matrix)
+    if coefficients is not None:
+        return coefficients
+    # Reduce system matrix
+    dr_mat = diophantineRowReduce(matrix)
+    dr_mat = removeZeroRows(dr_mat)
+    # Validate result
+    if not validateDRMat(dr_mat):
+        raise UnsolvableEquationError("Unsolvable: the equation does not have a unique solution")
+    # Extract solution
+    return extract_smallest_solution(dr_mat)
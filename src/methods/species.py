@@ -0,0 +1,175 @@
+"""
+Compact, interned representation of species.
+
+Element symbols are interned in a process-wide `ElementTable`, which maps each symbol to a
+small integer id. The elements of the periodic table are preloaded in order of atomic number,
+so their ids are the same in every process (H is 0, He is 1, ...); any other symbol is given
+the next free id the first time it is seen.
+
+A `Species` keeps its atom counts as one packed buffer of (uint16 element id, int64 count)
+records, read back as arrays without copying, so that matrices are filled by scattering counts
+to the rows of their ids. A cached species takes about half the memory of a dictionary
+of symbols and counts.
+
+Classes:
+    ElementTable(iterable[string]) -> ElementTable
+    Species(string, dict[string, int]) -> Species
+
+Functions:
+    speciesSymbols(list[Species]) -> set[string]
+
+"""
+import struct
+from threading import Lock
+from .lazyImport import numpy as np
+from .precision import INT64_MAX
+
+# Element symbols in order of atomic number; their index is their id in `element_table`
+PERIODIC_TABLE = (
+    "H He Li Be B C N O F Ne Na Mg Al Si P S Cl Ar K Ca Sc Ti V Cr Mn Fe Co Ni Cu Zn Ga Ge As Se "
+    "Br Kr Rb Sr Y Zr Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I Xe Cs Ba La Ce Pr Nd Pm Sm Eu Gd Tb "
+    "Dy Ho Er Tm Yb Lu Hf Ta W Re Os Ir Pt Au Hg Tl Pb Bi Po At Rn Fr Ra Ac Th Pa U Np Pu Am Cm "
+    "Bk Cf Es Fm Md No Lr Rf Db Sg Bh Hs Mt Ds Rg Cn Nh Fl Mc Lv Ts Og"
+).split()
+# Ids are stored as uint16
+MAX_ELEMENTS = 2**16
+# Layout of one (element id, count) record of a packed Species, as a struct and a NumPy dtype
+RECORD = struct.Struct("=Hq")
+RECORD_FIELDS = [("id", "=u2"), ("count", "=i8")]
+
+class ElementTable:
+    """
+    Interned element symbols, each with a small integer id.
+
+    Ids are never reassigned. Interning is guarded by a lock, so one table can be shared by threads.
+    """
+
+    def __init__(self, symbols=PERIODIC_TABLE):
+        self._ids = {}
+        self._symbols = []
+        self._lock = Lock()
+        for symbol in symbols:
+            self.intern(symbol)
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._ids
+
+    def intern(self, symbol):
+        """
+        Return the id of an element symbol, giving it the next free id if it is new.
+
+            Parameters:
+                symbol (string) : element symbol
+            Returns:
+                id (int) : id of the symbol
+            Raises:
+                ValueError : if the table already holds `MAX_ELEMENTS` symbols
+        """
+        element_id = self._ids.get(symbol)
+        if element_id is None:
+            with self._lock:
+                element_id = self._ids.get(symbol)
+                if element_id is None:
+                    if len(self._symbols) == MAX_ELEMENTS:
+                        raise ValueError(f"The element table is full ({MAX_ELEMENTS} symbols)")
+                    element_id = self._ids[symbol] = len(self._symbols)
+                    self._symbols.append(symbol)
+        return element_id
+
+    def symbol(self, element_id):
+        """Return the symbol of an element id."""
+        return self._symbols[element_id]
+
+# Element table of this process
+element_table = ElementTable()
+
+class Species:
+    """
+    Atom counts of one term, as element ids and counts.
+
+    Counts that do not fit int64 are kept as a tuple of (id, count) pairs instead of a packed
+    buffer, and read back as an object array.
+
+    Attributes:
+        formula (string) : the term
+        data (bytes | tuple) : `RECORD`s of the elements, in the order they appear in the term
+    """
+    __slots__ = ("formula", "data")
+
+    def __init__(self, formula, composition):
+        """
+        Intern the elements of a composition and pack its counts.
+
+            Parameters:
+                formula (string) : term in a chemical equation
+                composition (dict) : number of each atom in the term (atom : count), see `scanTerm`
+        """
+        self.formula = formula
+        # The scanner packs every term it reads, so known symbols skip the call to `intern`
+        ids = element_table._ids
+        items = []
+        for atom, ct in composition.items():
+            element_id = ids.get(atom)
+            items.append((element_table.intern(atom) if element_id is None else element_id, ct))
+        if all(-INT64_MAX <= ct <= INT64_MAX for ct in composition.values()):
+            self.data = b"".join([RECORD.pack(*item) for item in items])
+        else:
+            self.data = tuple(items)
+
+    @classmethod
+    def fromRecords(cls, formula, data):
+        """Make a Species from `RECORD`s already packed with the ids of `element_table`, e.g. read from a `SpeciesTable`."""
+        species = cls.__new__(cls)
+        species.formula, species.data = formula, data
+        return species
+
+    def __len__(self):
+        if isinstance(self.data, tuple):
+            return len(self.data)
+        return len(self.data) // RECORD.size
+
+    def __repr__(self):
+        return f"Species({self.formula!r}, {self.composition()})"
+
+    def items(self):
+        """Return an iterable of the (element id, count) pairs of the species."""
+        if isinstance(self.data, tuple):
+            return self.data
+        return RECORD.iter_unpack(self.data)
+
+    def elementIds(self):
+        """Return the element ids of the species as a read-only uint16 array."""
+        if isinstance(self.data, tuple):
+            return np.array([element_id for element_id, _ in self.data], dtype=np.uint16)
+        return np.frombuffer(self.data, dtype=RECORD_FIELDS)["id"]
+
+    def counts(self):
+        """Return the atom counts of the species as a read-only int64 array, or an object array if they overflow."""
+        if isinstance(self.data, tuple):
+            return np.array([ct for _, ct in self.data], dtype=object)
+        return np.frombuffer(self.data, dtype=RECORD_FIELDS)["count"]
+
+    def composition(self):
+        """Return the atom counts of the species as a new dictionary (atom : count)."""
+        symbols = element_table._symbols
+        return {symbols[element_id]: ct for element_id, ct in self.items()}
+
+def speciesSymbols(species):
+    """
+    Return the symbols of the elements of several species, reading their records in one pass.
+
+        Parameters:
+            species (list[Species]) : the species
+        Returns:
+            symbols (set[string]) : symbols of every element in any of them
+    """
+    packed = b"".join([sp.data for sp in species if not isinstance(sp.data, tuple)])
+    element_ids = {element_id for element_id, _ in RECORD.iter_unpack(packed)}
+    for sp in species:
+        if isinstance(sp.data, tuple):
+            element_ids.update([element_id for element_id, _ in sp.data])
+    symbols = element_table._symbols
+    return {symbols[element_id] for element_id in element_ids}
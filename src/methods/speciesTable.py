@@ -0,0 +1,216 @@
+"""
+Precompiled species tables, read through memory maps.
+
+`compileSpeciesTable` parses a list of formulas once and writes their compositions to a
+directory of flat binary files:
+
+    table.json : format version, byte order, number of species, and the element symbols
+        (the periodic table first, then any other symbol in order of first appearance)
+    names.bin : the formulas, UTF-8 encoded, one after another
+    name_offsets.npy : start of each formula in names.bin, then the end of the last [int64]
+    indptr.npy : start of each species in records.bin, in records, then the end of the last;
+        with records.bin, the CSR rows of the species by element matrix [int64]
+    records.bin : (element index, count) records of every species, packed as `Species.data`
+    index.npy : open addressing hash index (CRC-32 of the formula, linear probing) of species
+        numbers, -1 for empty slots [int64]
+
+`SpeciesTable` maps these files instead of reading them, so opening a table parses nothing,
+pages are only read when a species is looked up, and processes that open the same table share
+one copy of it in the OS page cache. A species is found with one hash and a probe or two, and
+its records are copied out as they are; when the element indices of the table are the ids
+of `element_table` (as they are in any process that interns the table's elements before other
+symbols) they are not even unpacked.
+
+    compileSpeciesTable(formulas, "species.table")
+    setSpeciesTable(SpeciesTable("species.table"))
+
+Functions:
+    compileSpeciesTable(iterable[string], string) -> int
+    mapFile(string) -> mmap | bytes
+    replaceFile(string, callable) -> None
+
+Classes:
+    SpeciesTable(string) -> SpeciesTable
+
+"""
+import json
+import mmap
+import os
+import sys
+import zlib
+from .errors import InvalidEquationError
+from .lazyImport import numpy as np
+from .precision import fitsInt64
+from .scanEquation import scanTerm
+from .species import MAX_ELEMENTS, PERIODIC_TABLE, RECORD, RECORD_FIELDS, Species, element_table
+
+# Version of the files written by `compileSpeciesTable`
+TABLE_VERSION = 1
+
+class SpeciesTable:
+    """
+    A compiled species table, opened read-only through memory maps.
+
+    Tables can be pickled, e.g. to pass them to worker processes, which open the same files.
+
+    Attributes:
+        path (string) : directory of the table
+        elements (list[str]) : element symbols, by element index in the table
+        name_offsets, indptr, index (ndarray) : read-only maps of the table's index arrays
+        records (ndarray) : read-only map of records.bin, with fields `id` and `count`
+    """
+
+    def __init__(self, path):
+        """
+        Arguments:
+            path: directory written by `compileSpeciesTable` [string]
+        Raises:
+            ValueError: if the table was written in another format or byte order
+        """
+        self.path = path
+        with open(os.path.join(path, "table.json")) as f:
+            header = json.load(f)
+        if header["version"] != TABLE_VERSION or header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} is a version {header['version']}, {header['byteorder']} endian species table; "
+                             f"expected version {TABLE_VERSION}, {sys.byteorder} endian")
+        self.elements = header["elements"]
+        self._size = header["species"]
+        self.name_offsets = np.load(os.path.join(path, "name_offsets.npy"), mmap_mode="r")
+        self.indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode="r")
+        self.index = np.load(os.path.join(path, "index.npy"), mmap_mode="r")
+        self._names = mapFile(os.path.join(path, "names.bin"))
+        self._records = mapFile(os.path.join(path, "records.bin"))
+        self.records = np.frombuffer(self._records, dtype=RECORD_FIELDS)
+        # Scalar reads through memoryviews give Python ints, several times faster than through arrays
+        self._name_offsets, self._indptr, self._index = map(memoryview, (self.name_offsets, self.indptr, self.index))
+        # Interned id of each element of the table, or None if every element's id is its index
+        ids = [element_table.intern(symbol) for symbol in self.elements]
+        self._ids = None if ids == list(range(len(ids))) else ids
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, formula):
+        return self._find(formula.encode()) >= 0
+
+    def __repr__(self):
+        return f"SpeciesTable({self.path!r})"
+
+    def __reduce__(self):
+        return SpeciesTable, (self.path,)
+
+    def get(self, formula, default=None):
+        """
+        Look a formula up in the table.
+
+        Arguments:
+            formula: term of a chemical equation, exactly as compiled [string]
+            default: returned if the formula is not in the table
+        Return:
+            species: element ids and counts of the formula [Species]
+        """
+        # Lone surrogates, which no compiled formula contains, are encoded rather than raised on
+        number = self._find(formula.encode("utf-8", "surrogatepass"))
+        if number < 0:
+            return default
+        data = self._records[self._indptr[number] * RECORD.size:self._indptr[number + 1] * RECORD.size]
+        if self._ids is not None:
+            data = b"".join(RECORD.pack(self._ids[idx], ct) for idx, ct in RECORD.iter_unpack(data))
+        return Species.fromRecords(formula, data)
+
+    def _find(self, key):
+        """Return the number of the species named `key` (UTF-8), or -1."""
+        slots = self._index
+        mask = len(slots) - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            number = slots[slot]
+            if number < 0 or self._names[self._name_offsets[number]:self._name_offsets[number + 1]] == key:
+                return number
+            slot = (slot + 1) & mask
+
+def mapFile(path):
+    """Map a file read-only; an empty file, which cannot be mapped, gives empty bytes."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def compileSpeciesTable(formulas, path):
+    """
+    Parse formulas and write them as a species table that `SpeciesTable` can open.
+
+    Formulas are parsed without `species_cache`, which they would otherwise fill. Repeated
+    formulas are written once. Formulas with a count that does not fit int64 are left
+    out, and are parsed when they are used.
+
+    Arguments:
+        formulas: terms of chemical equations, e.g. the lines of a species library [iterable(string)]
+        path: directory to write the table to; it is created if needed [string]
+    Return:
+        size: number of species in the table [int]
+    Raises:
+        InvalidEquationError: if a formula is not a single valid term
+        ValueError: if the formulas have more than `MAX_ELEMENTS` elements
+    """
+    element_idxs = {symbol: idx for idx, symbol in enumerate(PERIODIC_TABLE)}
+    elements = list(PERIODIC_TABLE)
+    names, records = bytearray(), bytearray()
+    name_offsets, indptr = [0], [0]
+    seen = set()
+    for formula in formulas:
+        formula = formula.strip()
+        if not formula or formula in seen:
+            continue
+        try:
+            composition = scanTerm(formula, cache=False)
+        except InvalidEquationError as err:
+            raise InvalidEquationError(f"Invalid species '{formula}': {err}", err.position) from None
+        if not all(fitsInt64(ct) for ct in composition.values()):
+            continue
+        seen.add(formula)
+        for atom, ct in composition.items():
+            if atom not in element_idxs:
+                if len(elements) == MAX_ELEMENTS:
+                    raise ValueError(f"The species have more than {MAX_ELEMENTS} elements")
+                element_idxs[atom] = len(elements)
+                elements.append(atom)
+            records += RECORD.pack(element_idxs[atom], ct)
+        names += formula.encode()
+        name_offsets.append(len(names))
+        indptr.append(len(records) // RECORD.size)
+
+    # Hash index at most half full, so that probes are short
+    size = len(name_offsets) - 1
+    slots = [-1] * max(8, 1 << (2 * size).bit_length())
+    mask = len(slots) - 1
+    for number in range(size):
+        slot = zlib.crc32(names[name_offsets[number]:name_offsets[number + 1]]) & mask
+        while slots[slot] >= 0:
+            slot = (slot + 1) & mask
+        slots[slot] = number
+
+    os.makedirs(path, exist_ok=True)
+    replaceFile(os.path.join(path, "names.bin"), lambda f: f.write(names))
+    replaceFile(os.path.join(path, "records.bin"), lambda f: f.write(records))
+    for name, values in (("name_offsets", name_offsets), ("indptr", indptr), ("index", slots)):
+        replaceFile(os.path.join(path, name + ".npy"), lambda f: np.save(f, np.array(values, dtype=np.int64)))
+    header = {"version": TABLE_VERSION, "byteorder": sys.byteorder, "species": size, "elements": elements}
+    replaceFile(os.path.join(path, "table.json"), lambda f: f.write(json.dumps(header).encode()))
+    return size
+
+def replaceFile(path, write):
+    """
+    Write a file under a temporary name, then move it to `path`.
+
+    A process that has the file it replaces mapped keeps reading the old file, rather than
+    one that changes, or shrinks, under it.
+
+    Arguments:
+        path: file to write [string]
+        write: called with the new file, opened for writing bytes [callable]
+    """
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        write(f)
+    os.replace(temporary, path)
@@ -0,0 +1,210 @@
+"""
+Record the steps taken to balance equations.
+
+Tracing is off unless a sink is set with `setTraceSink` or `tracing`. The public balancing
+functions then pass a `StepTrace` of each equation (or a sampled fraction of them) to the
+sink. With no sink set, the only cost is one comparison per equation.
+
+A sink is any object with a `record(step_trace)` method and a `close()` method. The sinks
+here guard their file with a lock, so one sink can be shared by threads, e.g. the executor
+threads of the service.
+
+Classes:
+    StepTrace(string, ndarray, ndarray, ndarray, string, string) -> namedtuple
+    ListSink() -> ListSink
+    TextSink(file) -> TextSink
+    JSONLSink(string | file) -> JSONLSink
+    NpzSink(string) -> NpzSink
+
+Functions:
+    setTraceSink(sink, float) -> None
+    tracing(sink, float) -> contextmanager
+    traceResult(BalanceResult) -> None
+    stepTrace(BalanceResult) -> StepTrace
+
+"""
+import json
+import random
+from collections import namedtuple
+from contextlib import contextmanager
+from threading import Lock
+from .errors import BalancingError
+from .lazyImport import numpy as np
+
+# Steps of balancing one equation; coefficients and balanced are None, and error is set, on failure
+StepTrace = namedtuple("StepTrace", ["equation", "matrix", "reduced_matrix", "coefficients", "balanced", "error"])
+
+# Set through `setTraceSink`
+_active_sink = None
+_sample_rate = 1.0
+
+def setTraceSink(sink, rate=1.0):
+    """
+    Send the steps of balanced equations to `sink`, or stop tracing if `sink` is None.
+
+    Tracing applies to the process it is set in; batch workers in other processes are not traced.
+
+        Parameters:
+            sink : object with a `record(step_trace)` method, or None
+            rate (float) : fraction of equations traced, chosen at random
+    """
+    global _active_sink, _sample_rate
+    _active_sink, _sample_rate = sink, rate
+
+@contextmanager
+def tracing(sink, rate=1.0):
+    """Trace equations balanced within a `with` block to `sink`, then restore the previous sink."""
+    previous = _active_sink, _sample_rate
+    setTraceSink(sink, rate)
+    try:
+        yield sink
+    finally:
+        setTraceSink(*previous)
+
+def traceResult(result):
+    """Pass the steps of a BalanceResult to the active sink, if tracing is on and the result is sampled."""
+    if _active_sink is None:
+        return
+    if _sample_rate < 1.0 and random.random() >= _sample_rate:
+        return
+    _active_sink.record(stepTrace(result))
+
+def stepTrace(result):
+    """
+    Collect the steps of a BalanceResult, computing those it has not computed yet.
+
+    The reduced matrix is computed after the coefficients, since a BalanceResult asked for it
+    first solves by row reduction instead of `smallSystemSolution` or `solveModular`; tracing
+    an equation thus costs a reduction, but finds its coefficients with the same solver.
+
+        Parameters:
+            result (BalanceResult) : the equation to trace
+        Returns:
+            step_trace (StepTrace) : its steps; steps after a failure are None
+    """
+    steps = [result.equation, None, None, None, None]
+    error = None
+    try:
+        steps[1] = result.system_matrix
+        steps[3] = result.coefficients
+        steps[4] = result.balanced
+    except BalancingError as err:
+        error = str(err)
+    if steps[1] is not None:
+        try:
+            steps[2] = result.reduced_matrix
+        except BalancingError as err:
+            error = error or str(err)
+    return StepTrace(*steps, error)
+
+class ListSink:
+    """Keep step traces in memory, in the list `traces`."""
+
+    def __init__(self):
+        self.traces = []
+
+    def record(self, step_trace):
+        self.traces.append(step_trace)
+
+    def close(self):
+        pass
+
+class TextSink:
+    """
+    Write step traces to an open text file, in the format of `writeBCESteps`.
+
+    Attributes:
+        wrap (boolean) : include the balanced chemical equation, in addition to the coefficients
+    """
+
+    def __init__(self, f, wrap=True):
+        self.f = f
+        self.wrap = wrap
+        self._lock = Lock()
+
+    def record(self, step_trace):
+        text = [f"Equation\n{step_trace.equation}\n"]
+        if step_trace.matrix is not None:
+            text.append(f"Matrix\n{step_trace.matrix}\n")
+        if step_trace.reduced_matrix is not None:
+            text.append(f"Reduced Matrix\n{step_trace.reduced_matrix}\n")
+        if step_trace.coefficients is not None:
+            text.append(f"Coefficients\n{step_trace.coefficients}\n")
+        if self.wrap and step_trace.balanced is not None:
+            text.append(f"Balanced Equation\n{step_trace.balanced}\n")
+        if step_trace.error is not None:
+            text.append(f"Error\n{step_trace.error}\n")
+        with self._lock:
+            self.f.write("".join(text))
+
+    def close(self):
+        with self._lock:
+            self.f.flush()
+
+class JSONLSink:
+    """
+    Append step traces to a JSON lines file, one object per equation.
+
+    Matrices and coefficients are written as (nested) lists of integers.
+    """
+
+    def __init__(self, target):
+        """
+        Arguments:
+            target: path of the file, opened for appending, or an open text file [string | file]
+        """
+        self.owned = isinstance(target, str)
+        self.f = open(target, "a") if self.owned else target
+        self._lock = Lock()
+
+    def record(self, step_trace):
+        record = step_trace._asdict()
+        for step in ("matrix", "reduced_matrix", "coefficients"):
+            if record[step] is not None:
+                record[step] = np.asarray(record[step]).tolist()
+        line = json.dumps(record, default=int) + "\n"
+        with self._lock:
+            self.f.write(line)
+
+    def close(self):
+        with self._lock:
+            if self.owned:
+                self.f.close()
+            else:
+                self.f.flush()
+
+class NpzSink:
+    """
+    Append step traces to a NumPy .npz archive.
+
+    The steps of the n-th equation in the archive are stored as arrays named '{n}/{step}',
+    e.g. np.load(path)['0/matrix']. Steps that were not reached are omitted. Reopening an
+    existing archive continues its numbering.
+    """
+
+    def __init__(self, path):
+        import zipfile
+        self.zf = zipfile.ZipFile(path, "a")
+        self.count = len({name.split("/")[0] for name in self.zf.namelist()})
+        self._lock = Lock()
+
+    def record(self, step_trace):
+        arrays = {}
+        for step, value in step_trace._asdict().items():
+            if value is None:
+                continue
+            array = np.asarray(value)
+            if array.dtype == object:
+                # Python integers beyond int64 are kept as decimal strings
+                array = array.astype(str)
+            arrays[step] = array
+        # One equation's arrays are written, and numbered, together
+        with self._lock:
+            for step, array in arrays.items():
+                with self.zf.open(f"{self.count}/{step}.npy", "w", force_zip64=True) as f:
+                    np.lib.format.write_array(f, array)
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self.zf.close()
@@ -5,7 +5,17 @@ Functions:
     validateChemicalEquation(raw_input) -> boolean
     validateSide(raw_input) -> boolean
     validateTerm(raw_input) -> boolean
+    equationError(raw_input) -> InvalidEquationError | None
+    sideError(raw_input) -> InvalidEquationError | None
+    termError(raw_input) -> InvalidEquationError | None
+
+The `validate` functions tell whether an input is accepted; the `Error` functions return the
+`InvalidEquationError` rejecting it, which carries the index of the offending character.
+Equations, sides and terms are all checked in a single pass by `scanEquation`, without reading
+or filling `species_cache`.
 """
+from .errors import InvalidEquationError
+from .scanEquation import scanEquation, scanTerm
 
 def validateChemicalEquation(raw_input):
     """
@@ -27,25 +37,23 @@ def validateChemicalEquation(raw_input):
         True [boolean]: if raw_input meets conditions
         False [boolean]: if raw_input doesn't meet conditions
     """
-    # Checks for illegal characters
-    legal_characters = ([32, 40, 41, 43, 58] + [i for i in range(97, 122)] + 
-                        [i for i in range(65, 91)] + [i for i in range(48, 58)])
-    for idx in range(len(raw_input)):
-        char = raw_input[idx]
-        if not ord(char) in legal_characters:
-            print(f"Invalid String: Contains illegal character '{char}' at index {idx}")
-            return False
-    # Checks there are two sides of an equation separated by ":"
-    sides = raw_input.split(":")
-    if len(sides) != 2:
-        print(f"Invalid String: There are not two sides of an equation separated by ':'")
-        return False
-    sides = [i.strip() for i in sides]
-    # Side-level validation
-    for side_idx in range(2):
-        if not validateSide(sides[side_idx]):
-            return False
-    return True
+    return equationError(raw_input) is None
+
+def equationError(raw_input):
+    """
+    Find why the input string does not satisfy the criteria of `validateChemicalEquation`.
+
+    Arguments:
+        raw_input: [str]
+    Returns: 
+        error [InvalidEquationError]: the first criterion raw_input fails, with its message and position
+        None: if raw_input meets conditions
+    """
+    try:
+        scanEquation(raw_input, cache=False)
+    except InvalidEquationError as err:
+        return err
+    return None
 
 def validateSide(raw_input):
     """
@@ -63,22 +71,26 @@ def validateSide(raw_input):
         True [boolean]: if raw_input meets conditions
         False [boolean]: if raw_input doesn't meet conditions
     """
-    # Checks if "+" between all terms on side
-    term = raw_input.split("+")
-    term = [i.strip() for i in raw_input.split("+") if i] # ignore possibly empty
-    for term_idx in range(len(term)):
-        tmp = term[term_idx]   
-        # Checks if a term contains a space
-        if " " in tmp:
-            print(f"Invalid String: Terms '{tmp}' are not properly joined")
-            return False
-        #Term-level validation
-        if not validateTerm(tmp):
-            return False
-    return True
-        
+    return sideError(raw_input) is None
+
+def sideError(raw_input):
+    """
+    Find why the input side does not satisfy the criteria of `validateSide`.
+
+    Arguments:
+        raw_input: side of equation [str]
+    Returns: 
+        error [InvalidEquationError]: the first criterion raw_input fails, with its message and position
+        None: if raw_input meets conditions
+    """
+    # a side is checked as the reactants of an equation without products
+    try:
+        scanEquation(raw_input + " :", cache=False)
+    except InvalidEquationError as err:
+        return err
+    return None
+
 def validateTerm(raw_string_term):
-    term = raw_string_term
     """
     Check that input satisfies specific criteria.
     
@@ -93,28 +105,20 @@ def validateTerm(raw_string_term):
         True [boolean]: if raw_input meets conditions
         False [boolean]: if raw_input doesn't meet conditions
     """
-    term.strip()
-    # Check that term begins with uppercase-letter or opening parenthesis
-    if not (term[0].isupper() or term[0]=="("):
-        print(f"Invalid String: Term '{term}'does not begin with an uppercase letter")
-        return False
-    # Checks that term contains balanced parentheses
-    if term.count('(') != term.count(')'):
-        print(f"Invalid String: Term '{term}' has unbalanced parentheses")
-        return False
-    # Check that substrings from lowercase to nearest uppercase  (right->left) contain only alphabetic characters
-    upper_idxs = [idx for idx, chr in enumerate(term) if chr.isupper()]
-    char_idx = len(term)-1
-    while char_idx >= 0:
-        if term[char_idx].islower():
-            try:
-                nearest_idx = list(filter(lambda a : a < char_idx, upper_idxs))[-1]
-            except IndexError:
-                nearest_idx = 0
-            sub = term[nearest_idx:char_idx+1]
-            if not sub.isalpha():
-                print(f"Invalid String: Term '{term}' has invalid element in '{sub}'")
-                return False
-            char_idx = nearest_idx
-        char_idx -= 1
-    return True
\ No newline at end of file
+    return termError(raw_string_term) is None
+
+def termError(raw_string_term):
+    """
+    Find why the input term does not satisfy the criteria of `validateTerm`.
+
+    Arguments:
+        raw_input: term in equation [str]
+    Returns: 
+        error [InvalidEquationError]: the first criterion raw_input fails, with its message and position
+        None: if raw_input meets conditions
+    """
+    try:
+        scanTerm(raw_string_term, cache=False)
+    except InvalidEquationError as err:
+        return err
+    return None
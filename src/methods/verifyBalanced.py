@@ -0,0 +1,171 @@
+"""
+Check balanced equations in bulk.
+
+`verifyBalanced` takes (equation, coefficients) pairs, e.g. the records of an archive of
+balanced equations, and checks every pair of a chunk with array operations. The terms of a
+chunk are looked up once each in `species_cache` (or the species table), and their packed
+records are read as one array of (element id, count) entries. Multiplying each entry by the
+coefficient of its term and summing by equation and element is the product A.c of every
+system matrix with its coefficients at once, as one sparse, block diagonal product; an
+equation is balanced if all its sums are zero.
+
+Equations whose sums could overflow int64 (by a float64 bound) are checked with Python ints.
+
+Functions:
+    verifyBalanced(iterable[tuple[string, list[int]]], int) -> VerificationReport
+    verifyChunk(list[tuple[string, list[int]]]) -> VerificationReport
+    verifiedSpecies(string) -> Species
+    splitTerms(string) -> list[tuple[string, int]]
+
+Classes:
+    VerificationReport(ndarray, ndarray, ndarray, dict) -> namedtuple
+
+"""
+from collections import namedtuple
+from itertools import islice
+from math import gcd
+from operator import index
+from .batchedSolver import OVERFLOW_BOUND
+from .constructSystemMatrix import cachedSpecies, getTerms, separateSides
+from .errors import InvalidEquationError
+from .lazyImport import numpy as np
+from .precision import fitsInt64
+from .scanEquation import scanSpecies
+from .species import RECORD_FIELDS
+
+# Result of `verifyBalanced`, one entry per pair: whether its coefficients balance the
+# equation, have no common factor, and are all positive; pairs that could not be checked are
+# False in all three and have their error in `errors` (index : exception)
+VerificationReport = namedtuple("VerificationReport", ["balanced", "minimal", "positive", "errors"])
+
+def verifyBalanced(pairs, chunksize=65536):
+    """
+    Check many balanced equations.
+
+    Arguments:
+        pairs: unbalanced equation and balancing coefficients, one per term, of each
+            equation [iterable(tuple(string, list(int)))]
+        chunksize: pairs checked together; memory use is proportional to it [int]
+    Return:
+        report: the checks of every pair, in input order [VerificationReport]
+    """
+    pairs = iter(pairs)
+    reports = []
+    while chunk := list(islice(pairs, chunksize)):
+        reports.append(verifyChunk(chunk))
+    if not reports:
+        return VerificationReport(np.zeros(0, dtype=bool), np.zeros(0, dtype=bool), np.zeros(0, dtype=bool), {})
+    errors, start = {}, 0
+    for report in reports:
+        errors.update((start + idx, err) for idx, err in report.errors.items())
+        start += len(report.balanced)
+    return VerificationReport(*(np.concatenate([getattr(report, field) for report in reports])
+                                for field in ("balanced", "minimal", "positive")), errors)
+
+def verifyChunk(pairs):
+    """Check a list of (equation, coefficients) pairs together, see `verifyBalanced`."""
+    n = len(pairs)
+    balanced, minimal, positive = np.zeros(n, dtype=bool), np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+    errors = {}
+    # Terms of the chunk, each looked up once (term : Species), and the packed records and
+    # record count of those that have them (term : (bytes, int))
+    species, packed = {}, {}
+    # Pairs checked with arrays, and with Python ints: (index, signed terms, coefficients)
+    checked, exact = [], []
+    for idx, (equation, coefs) in enumerate(pairs):
+        try:
+            signed = splitTerms(equation)
+            coefs = [index(coef) for coef in coefs]
+            if not signed:
+                raise InvalidEquationError(f"Invalid String: '{equation}' has no terms")
+            if len(coefs) != len(signed):
+                raise ValueError(f"{len(coefs)} coefficients for the {len(signed)} terms of '{equation}'")
+            for term, _ in signed:
+                if term not in species:
+                    sp = species[term] = verifiedSpecies(term)
+                    if not isinstance(sp.data, tuple):
+                        packed[term] = sp.data, len(sp)
+        except (ValueError, TypeError) as err:
+            errors[idx] = err
+            continue
+        if fitsInt64(max(coefs, key=abs)) and all(term in packed for term, _ in signed):
+            checked.append((idx, signed, coefs))
+        else:
+            exact.append((idx, signed, coefs))
+
+    if checked:
+        rows = np.array([idx for idx, _, _ in checked])
+        terms = [signed_term for _, signed, _ in checked for signed_term in signed]
+        coefficients = np.array([coef for _, _, coefs in checked for coef in coefs], dtype=np.int64)
+        term_counts = np.array([len(signed) for _, signed, _ in checked])
+        starts = np.concatenate(([0], np.cumsum(term_counts)[:-1]))
+        # Minimal and positive, from the coefficients alone
+        minimal[rows] = np.gcd.reduceat(coefficients, starts) == 1
+        positive[rows] = np.minimum.reduceat(coefficients, starts) > 0
+        # Entries of the block diagonal system matrix: element id and count, with the equation
+        # and signed coefficient of their term
+        data, lengths = zip(*[packed[term] for term, _ in terms])
+        records = np.frombuffer(b"".join(data), dtype=RECORD_FIELDS)
+        lengths = np.array(lengths)
+        signed_coefficients = coefficients * np.array([sign for _, sign in terms])
+        counts = records["count"]
+        coefs = np.repeat(signed_coefficients, lengths)
+        equations = np.repeat(np.repeat(np.arange(len(rows)), term_counts), lengths)
+        # Equations whose sums could overflow are checked exactly instead
+        bound = np.bincount(equations, weights=np.abs(counts.astype(float) * coefs.astype(float)), minlength=len(rows))
+        safe = bound < OVERFLOW_BOUND
+        # Sum of each (equation, element): its row of A.c
+        keys = equations * (int(records["id"].max(initial=0)) + 1) + records["id"]
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        first = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        sums = np.add.reduceat(np.where(safe[equations], counts * coefs, 0)[order], first)
+        unbalanced = np.zeros(len(rows), dtype=bool)
+        unbalanced[equations[order][first][sums != 0]] = True
+        balanced[rows] = ~unbalanced & safe
+        exact += [checked[pos] for pos in np.flatnonzero(~safe)]
+
+    for idx, signed, coefs in exact:
+        sums = {}
+        for (term, sign), coef in zip(signed, coefs):
+            for element_id, ct in species[term].items():
+                sums[element_id] = sums.get(element_id, 0) + sign * coef * ct
+        balanced[idx] = not any(sums.values())
+        minimal[idx] = gcd(*coefs) == 1
+        positive[idx] = min(coefs) > 0
+    return VerificationReport(balanced, minimal, positive, errors)
+
+def verifiedSpecies(term):
+    """
+    Return a term as a Species, checking that it is a valid term.
+
+    Terms already in `species_cache`, or in the species table, are taken as they are; others are
+    checked and counted by `scanSpecies`, which adds them to the cache.
+
+        Parameters:
+            term (string) : term in a chemical equation
+        Returns:
+            species (Species) : element ids and counts of the term
+        Raises:
+            InvalidEquationError : if the term is not a single valid term
+    """
+    species = cachedSpecies(term)
+    if species is None:
+        species = scanSpecies(term)
+    return species
+
+def splitTerms(equation):
+    """
+    Split an equation into its terms, each with 1 if it is a reactant or -1 if it is a product.
+
+        Parameters:
+            equation (string) : unbalanced chemical equation
+        Returns:
+            signed_terms (list(tuple(string, int))) : terms and their signs, in order
+        Raises:
+            InvalidEquationError : if the equation does not have two sides separated by ':'
+    """
+    sides = separateSides(equation)
+    if len(sides) != 2:
+        raise InvalidEquationError("Invalid String: There are not two sides of an equation separated by ':'")
+    return [(term, 1) for term in getTerms(sides[0])] + [(term, -1) for term in getTerms(sides[1])]
@@ -0,0 +1,329 @@
+"""
+Local balancing service
+
+Serve the balancer over a local TCP or Unix socket. The protocol is line-delimited JSON: a
+client sends one JSON object per line and receives one per line in reply, carrying the `id`
+of its request. Replies are sent as soon as they are ready, so a client may send many
+requests without waiting and match the replies by id.
+
+    python -m src.server --port 8765
+    python -m src.server --unix /tmp/bce.sock --workers 0
+
+    request : {"id": 1, "equation": "H2 + O2 : H2O"}
+    reply   : {"id": 1, "equation": "H2 + O2 : H2O", "balanced": "2 H2 + O2 : 2 H2O", "coefficients": [2, 1, 2], "error": null}
+
+Requests for an equation that is already being solved wait for that solve rather than
+starting another (coalescing). Other equations are gathered into batches of at most
+`batch_size`, and a batch is sent as soon as it is full or `batch_latency` seconds after its
+first equation arrived. Batches are solved by `balanceChunk` in an executor, so the event
+loop only reads, writes and dispatches. If a batch fails as a whole, e.g. because a worker
+process died, each of its requests is answered with the error.
+
+The service balances under `SERVICE_LIMITS` (see `setLimits`), so that no single request
+holds a worker for long: an equation beyond them is answered with a `ComplexityError`, and
+one that takes longer than a second to solve with a `BalancingTimeoutError`.
+
+Functions:
+    main(list[string]) -> int
+    startServer(BalanceService, string, int, string) -> asyncio.Server
+    handleConnection(BalanceService, StreamReader, StreamWriter) -> None
+    respond(BalanceService, bytes) -> dict
+    outcomeRecord(object, BalanceOutcome) -> dict
+
+Classes:
+    BalanceService(int, int, float) -> BalanceService
+    ServiceInfo(int, int, int, int) -> namedtuple
+
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from . import BCE
+
+# Longest request line accepted, in bytes
+MAX_LINE = 2**20
+# Complexity limits of the service, unless changed on the command line
+SERVICE_LIMITS = BCE.ComplexityLimits(term_length=256, depth=16, species=128, elements=128, count_bits=64, seconds=1.0)
+
+# Counts of a service's work: requests received, requests answered by an equation already in
+# flight, batches solved, and equations solved in them
+ServiceInfo = namedtuple("ServiceInfo", ["requests", "coalesced", "batches", "equations"])
+
+class BalanceService:
+    """
+    Balance equations for concurrent clients, coalescing duplicates and batching the rest.
+
+    Attributes:
+        batch_size (int) : largest number of equations solved together
+        batch_latency (float) : longest time, in seconds, an equation waits for its batch to fill
+    """
+
+    def __init__(self, workers=1, batch_size=64, batch_latency=0.002):
+        """
+        Arguments:
+            workers: processes solving batches; None uses every core, 1 solves in a thread of this process [int]
+            batch_size: largest number of equations solved together [int]
+            batch_latency: longest time, in seconds, an equation waits for its batch to fill [float]
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+        if batch_latency < 0:
+            raise ValueError("batch_latency must be non-negative")
+        self.batch_size = batch_size
+        self.batch_latency = batch_latency
+        if workers == 1:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            self._executor = ProcessPoolExecutor(max_workers=workers, initializer=BCE.initWorker,
+                                                 initargs=(BCE.getSpeciesTable(), BCE.getLimits(), BCE.getPersistentCache()))
+        # Equations queued or being solved (equation : Future of its BalanceOutcome)
+        self._inflight = {}
+        self._queue = []
+        self._timer = None
+        self._requests = self._coalesced = self._batches = self._equations = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def info(self):
+        """Return the counts of the service's work as a `ServiceInfo`."""
+        return ServiceInfo(self._requests, self._coalesced, self._batches, self._equations)
+
+    async def balance(self, equation):
+        """
+        Balance one equation, sharing the work with identical requests in flight.
+
+        Arguments:
+            equation: unbalanced chemical equation [string]
+        Return:
+            outcome: result of balancing the equation; failures are in its `error` [BalanceOutcome]
+        """
+        self._requests += 1
+        future = self._inflight.get(equation)
+        if future is not None:
+            self._coalesced += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = self._inflight[equation] = loop.create_future()
+            self._queue.append(equation)
+            if len(self._queue) >= self.batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.batch_latency, self._flush)
+        # A cancelled request must not cancel the solve shared with others
+        return await asyncio.shield(future)
+
+    async def close(self):
+        """Solve the queued equations, wait for every batch in flight, then stop the executor."""
+        self._flush()
+        if self._inflight:
+            await asyncio.wait(list(self._inflight.values()))
+        self._executor.shutdown(wait=False)
+
+    def _flush(self):
+        """Send the queued equations to the executor as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queue = self._queue, []
+        if not batch:
+            return
+        self._batches += 1
+        self._equations += len(batch)
+        loop = asyncio.get_running_loop()
+        try:
+            solve = loop.run_in_executor(self._executor, BCE.balanceChunk, 0, batch, False)
+        except Exception as err:
+            # The executor is shut down or broken; the batch fails as a whole
+            solve = loop.create_future()
+            solve.set_exception(err)
+        solve.add_done_callback(partial(self._settle, batch))
+
+    def _settle(self, batch, solve):
+        """Pass the outcomes of a solved batch, or the error that stopped it, to the requests waiting for them."""
+        if solve.cancelled():
+            error = BCE.BalancingCancelledError("Cancelled: the batch was cancelled before it was solved")
+        else:
+            error = solve.exception()
+        outcomes = None if error is not None else solve.result()
+        for idx, equation in enumerate(batch):
+            future = self._inflight.pop(equation)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(outcomes[idx])
+
+def main(argv=None):
+    """
+    Run the balancing service until interrupted.
+
+    Arguments:
+        argv: command line arguments, without the program name; defaults to sys.argv[1:] [list(string)]
+    Return:
+        status: 0 [int]
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.server", description="Serve the chemical equation balancer locally.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on (default: 8765)")
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket at PATH instead of TCP")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="processes solving batches; 0 uses every core, 1 solves in a thread (default 1)")
+    parser.add_argument("--batch-size", type=int, default=64, help="largest number of equations solved together (default 64)")
+    parser.add_argument("--batch-latency", type=float, default=2.0,
+                        help="longest wait, in milliseconds, for a batch to fill (default 2)")
+    parser.add_argument("--max-seconds", type=float, default=SERVICE_LIMITS.seconds,
+                        help="longest time spent solving one equation; 0 for no limit (default 1)")
+    parser.add_argument("--unlimited", action="store_true", help="lift every complexity limit, including --max-seconds")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="keep solved equations in a SQLite file shared by every run and worker, preloaded at start")
+    args = parser.parse_args(argv)
+    BCE.setLimits(BCE.UNLIMITED if args.unlimited else SERVICE_LIMITS._replace(seconds=args.max_seconds or None))
+    if args.cache:
+        cache = BCE.PersistentCache(args.cache)
+        cache.preload(BCE.result_cache)
+        BCE.setPersistentCache(cache)
+
+    async def run():
+        async with BalanceService(args.workers or None, args.batch_size, args.batch_latency / 1000) as service:
+            server = await startServer(service, args.host, args.port, args.unix)
+            address = args.unix or "{}:{}".format(*server.sockets[0].getsockname()[:2])
+            print(f"Balancing on {address}", file=sys.stderr)
+            # Stop on SIGTERM as on Ctrl-C
+            serving = asyncio.current_task()
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, serving.cancel)
+            except NotImplementedError:
+                pass
+            try:
+                async with server:
+                    await server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+            finally:
+                if args.unix:
+                    os.remove(args.unix)
+                print(service.info(), file=sys.stderr)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+async def startServer(service, host="127.0.0.1", port=8765, path=None):
+    """
+    Start accepting connections for a service.
+
+    Arguments:
+        service: the service balancing the requests [BalanceService]
+        host: address to listen on [string]
+        port: TCP port to listen on; 0 picks a free one [int]
+        path: listen on a Unix socket at this path instead of TCP [string]
+    Return:
+        server: the listening server [asyncio.Server]
+    """
+    handler = partial(handleConnection, service)
+    if path is not None:
+        return await asyncio.start_unix_server(handler, path=path, limit=MAX_LINE)
+    return await asyncio.start_server(handler, host, port, limit=MAX_LINE)
+
+async def handleConnection(service, reader, writer):
+    """
+    Answer the requests of one connection until the client closes it.
+
+    Each request is answered by its own task, and a single task writes the replies in the
+    order they are ready.
+    """
+    replies = asyncio.Queue()
+
+    async def answer(line):
+        await replies.put(await respond(service, line))
+
+    async def send():
+        while True:
+            record = await replies.get()
+            if record is None:
+                return
+            writer.write(json.dumps(record).encode() + b"\n")
+            if replies.empty():
+                await writer.drain()
+
+    sender = asyncio.create_task(send())
+    pending = set()
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except (ValueError, ConnectionError):
+                # Line longer than MAX_LINE, or the client went away
+                break
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.create_task(answer(line))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(pending)
+        await replies.put(None)
+        await sender
+    except (ConnectionError, asyncio.CancelledError):
+        # The client went away, or the server is shutting down; the connection ends either way
+        pass
+    finally:
+        sender.cancel()
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+async def respond(service, line):
+    """
+    Build the reply to one request line.
+
+    Arguments:
+        service: the service balancing the requests [BalanceService]
+        line: a JSON object with an `equation` string and an optional `id` [bytes]
+    Return:
+        record: the reply, see `outcomeRecord`; every request is answered, even if its batch failed [dict]
+    """
+    request_id = None
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict) or not isinstance(request.get("equation"), str):
+            raise ValueError("a request is a JSON object with an 'equation' string")
+        request_id = request.get("id")
+    except ValueError as err:
+        failure = BCE.BalanceFailure("BadRequest", str(err))
+        return outcomeRecord(request_id, BCE.BalanceOutcome(None, None, None, None, failure))
+    equation = request["equation"].strip()
+    try:
+        outcome = await service.balance(equation)
+    except Exception as err:
+        # The batch failed as a whole, e.g. its executor broke or ran out of memory
+        outcome = BCE.BalanceOutcome(None, equation, None, None, BCE.BalanceFailure(type(err).__name__, str(err)))
+    return outcomeRecord(request_id, outcome)
+
+def outcomeRecord(request_id, outcome):
+    """Render an outcome as the reply to the request `request_id`, in the format of the `jsonl` output of `cli`."""
+    error = outcome.error
+    return {
+        "id": request_id,
+        "equation": outcome.equation,
+        "balanced": outcome.balanced,
+        "coefficients": None if outcome.coefficients is None else [int(c) for c in outcome.coefficients],
+        "error": None if error is None else error._asdict(),
+    }
+
+if __name__ == "__main__":
+    sys.exit(main())
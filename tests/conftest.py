@@ -0,0 +1,18 @@
+"""
+Shared fixtures of the test suite.
+
+The caches and limits are process-wide, so every test starts with them cleared.
+"""
+import pytest
+import src.BCE as BCE
+
+@pytest.fixture(autouse=True)
+def clearState():
+    """Start each test with empty caches and no limits, and leave none behind."""
+    BCE.result_cache.clear()
+    BCE.species_cache.clear()
+    BCE.setLimits(None)
+    yield
+    BCE.setLimits(None)
+    BCE.setPersistentCache(None)
+    BCE.setSpeciesTable(None)
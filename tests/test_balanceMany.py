@@ -0,0 +1,38 @@
+"""
+Tests of the batch API over a process pool.
+"""
+import pytest
+import src.BCE as BCE
+
+EQUATIONS = ["H2 + O2 : H2O", "H2 : O2", "Fe + O2 : Fe2O3", "H2 + O2 : H2z", "CH4 + O2 : CO2 + H2O"] * 3
+
+def expected(equation):
+    try:
+        return BCE.balanceChemicalEquation(equation)
+    except BCE.BalancingError as err:
+        return type(err).__name__
+
+def outcomeSummary(outcome):
+    return outcome.balanced if outcome.error is None else outcome.error.kind
+
+@pytest.mark.parametrize("workers, chunksize", [(1, 256), (1, 2), (2, 2)])
+def testOutcomesMatchSingleEquations(workers, chunksize):
+    outcomes = BCE.balanceMany(EQUATIONS, workers=workers, chunksize=chunksize)
+    assert [outcome.index for outcome in outcomes] == list(range(len(EQUATIONS)))
+    assert [outcome.equation for outcome in outcomes] == EQUATIONS
+    assert [outcomeSummary(outcome) for outcome in outcomes] == [expected(equation) for equation in EQUATIONS]
+
+def testUnorderedStreamCoversEveryEquation():
+    outcomes = list(BCE.iterBalance(iter(EQUATIONS), workers=2, chunksize=3, ordered=False))
+    assert sorted(outcome.index for outcome in outcomes) == list(range(len(EQUATIONS)))
+    for outcome in outcomes:
+        assert outcomeSummary(outcome) == expected(EQUATIONS[outcome.index])
+
+def testCoefficientsAsListsOrArrays():
+    as_arrays, = BCE.balanceMany(["Fe + O2 : Fe2O3"], workers=1)
+    as_lists, = BCE.balanceMany(["Fe + O2 : Fe2O3"], workers=1, arrays=False)
+    assert as_arrays.coefficients.tolist() == as_lists.coefficients == [4, 3, 2]
+
+def testChunksizeMustBePositive():
+    with pytest.raises(ValueError):
+        BCE.balanceMany(EQUATIONS, workers=1, chunksize=0)
@@ -0,0 +1,64 @@
+"""
+Tests that `BalanceResult` computes each stage once.
+"""
+import pytest
+import src.BCE as BCE
+from src.methods import balanceResult
+
+@pytest.fixture
+def scans(monkeypatch):
+    """Equations scanned by `BalanceResult`, in order."""
+    scanned = []
+
+    def countingScan(equation, *args, **kwargs):
+        scanned.append(equation)
+        return BCE.scanEquation(equation, *args, **kwargs)
+
+    monkeypatch.setattr(balanceResult, "scanEquation", countingScan)
+    return scanned
+
+EQUATION = "K4Fe(CN)6 + KMnO4 + H2SO4 : KHSO4 + Fe2(SO4)3 + MnSO4 + HNO3 + CO2 + H2O"
+
+# Asking for the reduced matrix first solves with NumPy rather than on lists
+@pytest.mark.parametrize("first", ["balanced", "reduced_matrix"])
+def testStagesAreComputedOnce(scans, first):
+    result = BCE.BalanceResult(EQUATION, memo=False)
+    getattr(result, first)
+    balanced, solution = result.balanced, result.solution
+    result.coefficients, result.system_matrix, result.reduced_matrix, result.tier
+    assert scans == [EQUATION]
+    assert result.balanced is balanced and result.solution is solution
+    assert balanced == BCE.balanceChemicalEquation(EQUATION)
+    assert list(solution.values()) == result.values == [10, 122, 299, 162, 5, 122, 60, 60, 188]
+
+def testFailedScanIsNotRepeated(scans):
+    result = BCE.BalanceResult("H2 + O2 : H2z", memo=False)
+    for _ in range(2):
+        with pytest.raises(BCE.InvalidEquationError):
+            result.balanced
+    assert scans == ["H2 + O2 : H2z"]
+
+def testUnsolvableRaisesOnEveryAccess():
+    result = BCE.BalanceResult("H2 : O2")
+    for _ in range(2):
+        with pytest.raises(BCE.UnsolvableEquationError):
+            result.coefficients
+
+def testCachedSolutionSkipsScan(scans):
+    BCE.BalanceResult("H2 + O2 : H2O").balanced
+    result = BCE.BalanceResult("O2 + H2 : H2O")
+    assert result.balanced == "O2 + 2 H2 : 2 H2O"
+    assert scans == ["H2 + O2 : H2O"]
+    assert result.system_matrix.tolist() == [[0, 2, -2], [2, 0, -1]]
+    assert scans == ["H2 + O2 : H2O", "O2 + H2 : H2O"]
+
+def testBalanceResultsMatchesSingleResults():
+    equations = ["H2 + O2 : H2O", "Fe + O2 : Fe2O3", "H2 : O2", "CH4 + O2 : CO2 + H2O"]
+    for result, equation in zip(BCE.balanceResults(equations), equations):
+        try:
+            expected = BCE.balanceChemicalEquation(equation)
+        except BCE.BalancingError as err:
+            with pytest.raises(type(err)):
+                result.balanced
+        else:
+            assert result.balanced == expected
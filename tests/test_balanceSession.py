@@ -0,0 +1,52 @@
+"""
+Tests that `BalanceSession` edits give the coefficients `balanceChemicalEquation` finds.
+"""
+import pytest
+import src.BCE as BCE
+
+def assertBalancedLikeBCE(session):
+    assert session.balanced == BCE.balanceChemicalEquation(session.equation)
+    assert session.system_matrix.tolist() == BCE.BalanceResult(session.equation).system_matrix.tolist()
+
+def testTermEdits():
+    session = BCE.BalanceSession("H2 + O2 : H2O")
+    assertBalancedLikeBCE(session)
+    session.addTerm("CH4", 0, 0)
+    session.addTerm("CO2", 1)
+    assert session.equation == "CH4 + H2 + O2 : H2O + CO2"
+    with pytest.raises(BCE.UnsolvableEquationError):
+        session.coefficients
+    session.removeTerm(0, 1)
+    assertBalancedLikeBCE(session)
+    session.replaceTerm("C2H6", 0, 0)
+    assertBalancedLikeBCE(session)
+    # Three terms to start with, then five edits
+    assert session.edits == 8
+
+def testUpdateEditsOnlyChangedTerms():
+    session = BCE.BalanceSession("CH4 + O2 : CO2 + H2O")
+    assert session.update("C3H8 + O2 : CO2 + H2O") == 2
+    assertBalancedLikeBCE(session)
+    assert session.update("C3H8 + O2 : CO2 + H2O") == 0
+    assert session.update("K4Fe(CN)6 + KMnO4 + H2SO4 : KHSO4 + Fe2(SO4)3 + MnSO4 + HNO3 + CO2 + H2O") == 9
+    assertBalancedLikeBCE(session)
+    assert session.update("Fe + O2 : Fe2O3") > 0
+    assertBalancedLikeBCE(session)
+    assert session.atoms == ["Fe", "O"]
+
+def testInvalidEditsLeaveSessionUnchanged():
+    session = BCE.BalanceSession("H2 + O2 : H2O")
+    for edit in (lambda: session.update("H2 + O2 : H2z"), lambda: session.addTerm("H2 + O", 0),
+                 lambda: session.replaceTerm("Zz(", 1, 0)):
+        with pytest.raises(BCE.InvalidEquationError):
+            edit()
+    with pytest.raises(IndexError):
+        session.removeTerm(1, 1)
+    assert session.equation == "H2 + O2 : H2O"
+    assert session.edits == 3
+    assertBalancedLikeBCE(session)
+
+def testLargeCountsStayExact():
+    session = BCE.BalanceSession(f"C{2**70}O2 : C + O2")
+    assert session.coefficients.tolist() == [1, 2**70, 1]
+    assert session.balanced == BCE.balanceChemicalEquation(session.equation)
@@ -0,0 +1,51 @@
+"""
+Tests of the LRU caches shared across balancing calls.
+"""
+import pytest
+import src.BCE as BCE
+
+def testEvictsLeastRecentlyUsed():
+    cache = BCE.LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.get("b", "absent") == "absent"
+    assert cache.info() == BCE.CacheInfo(hits=1, misses=1, evictions=1, maxsize=2, currsize=2)
+
+def testGetOrComputeComputesOnce():
+    cache = BCE.LRUCache(maxsize=4)
+    computed = []
+
+    def compute(key):
+        computed.append(key)
+        return key * 2
+
+    assert [cache.getOrCompute(key, compute) for key in (1, 2, 1, 1)] == [2, 4, 2, 2]
+    assert computed == [1, 2]
+    assert cache.info()[:3] == (2, 2, 0)
+
+def testResizeEvictsOldest():
+    cache = BCE.LRUCache(maxsize=4)
+    for key in "abcd":
+        cache.put(key, key)
+    cache.resize(1)
+    assert len(cache) == 1 and "d" in cache
+    assert cache.info().evictions == 3
+    cache.clear()
+    assert cache.info() == BCE.CacheInfo(0, 0, 0, 1, 0)
+    with pytest.raises(ValueError):
+        cache.resize(-1)
+
+def testZeroSizeCachesNothing():
+    cache = BCE.LRUCache(maxsize=0)
+    assert cache.getOrCompute("H2O", len) == 3
+    assert len(cache) == 0
+
+def testRepeatedTermsAreScannedOnce():
+    BCE.scanEquation("H2 + O2 : H2O")
+    assert BCE.species_cache.info()[:2] == (0, 3)
+    BCE.scanEquation("H2O + Na : NaOH + H2")
+    assert BCE.species_cache.info()[:2] == (2, 5)
+    assert len(BCE.species_cache) == 5
@@ -0,0 +1,36 @@
+"""
+Tests of canonical keys and of the memo of solved equations behind them.
+"""
+import pytest
+import src.BCE as BCE
+
+def testReorderedEquationsShareKey():
+    sides_terms, key, order = BCE.canonicalizeEquation("O2 + H2 : H2O")
+    assert sides_terms == (["O2", "H2"], ["H2O"])
+    assert key == (("H2", "O2"), ("H2O",))
+    assert order == [1, 0, 2]
+    assert BCE.canonicalizeEquation("H2  +  O2 : H2O")[1] == key
+
+def testOrdersAreInverse():
+    order = BCE.canonicalizeEquation("O2 + H2 : H2O + Na")[2]
+    coefficients = [1, 2, 2, 7]
+    canonical = BCE.toCanonicalOrder(coefficients, order)
+    assert canonical == [2, 1, 2, 7]
+    assert BCE.fromCanonicalOrder(canonical, order) == coefficients
+
+@pytest.mark.parametrize("equation", ["H2 + O2 : H2O : O", "H2 + O2", " + : H2O", "H 2 + O2 : H2O",
+                                      "H2\t+ O2 : H2O", "H2 + O2 :\nH2O", "H2 + O2 : H2O."])
+def testKeyRequiresScannerAlphabet(equation):
+    assert BCE.canonicalizeEquation(equation) is None
+
+def testReorderedEquationsHitResultCache():
+    assert BCE.balanceChemicalEquation("H2 + O2 : H2O") == "2 H2 + O2 : 2 H2O"
+    hits = BCE.result_cache.info().hits
+    assert BCE.balanceChemicalEquation("O2 + H2 : H2O") == "O2 + 2 H2 : 2 H2O"
+    assert BCE.result_cache.info().hits == hits + 1
+    assert len(BCE.result_cache) == 1
+
+def testInvalidEquationsAreNotServedFromCache():
+    BCE.balanceChemicalEquation("H2 + O2 : H2O")
+    with pytest.raises(BCE.InvalidEquationError):
+        BCE.balanceChemicalEquation("H2\t+ O2 : H2O")
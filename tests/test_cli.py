@@ -0,0 +1,62 @@
+"""
+Tests of the command line balancer in `src/cli.py`.
+"""
+import json
+import pytest
+from src import cli
+
+def writeLines(path, lines):
+    path.write_text("".join(line + "\n" for line in lines))
+    return str(path)
+
+def testBalancesEachLine(tmp_path):
+    src = writeLines(tmp_path / "in.txt", ["H2 + O2 : H2O", "", "  ", "CH4 + O2 : CO2 + H2O"])
+    out = tmp_path / "out.txt"
+    assert cli.main([src, "-o", str(out)]) == 0
+    assert out.read_text() == "2 H2 + O2 : 2 H2O\nCH4 + 2 O2 : CO2 + 2 H2O\n"
+
+@pytest.mark.parametrize("mode, lines", [
+    ("skip", ["2 H2 + O2 : 2 H2O"]),
+    ("annotate", ["2 H2 + O2 : 2 H2O", "H2 : O2\tUnsolvableEquationError: Unsolvable: the equation does not have a unique solution"]),
+])
+def testErrorModes(tmp_path, mode, lines):
+    src = writeLines(tmp_path / "in.txt", ["H2 + O2 : H2O", "H2 : O2"])
+    out = tmp_path / "out.txt"
+    assert cli.main([src, "-o", str(out), "--errors", mode]) == 0
+    assert out.read_text().splitlines() == lines
+
+def testFailReportsInputLine(tmp_path, capsys):
+    src = writeLines(tmp_path / "in.txt", ["H2 + O2 : H2O", "", "# H2", "H2 : O2", "C : C"])
+    out = tmp_path / "out.txt"
+    assert cli.main([src, "-o", str(out), "--errors", "fail"]) == 1
+    assert out.read_text() == "2 H2 + O2 : 2 H2O\n"
+    assert capsys.readouterr().err.startswith(f"{src}, line 3 '# H2': ")
+
+def testJsonlAcrossFiles(tmp_path):
+    first = writeLines(tmp_path / "a.txt", ["H2 + O2 : H2O"])
+    second = writeLines(tmp_path / "b.txt", ["Fe + O2 : Fe2O3", "H2 : O2"])
+    out = tmp_path / "out.jsonl"
+    assert cli.main([first, second, "-o", str(out), "--format", "jsonl"]) == 0
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [record["index"] for record in records] == [0, 1, 2]
+    assert records[1]["coefficients"] == [4, 3, 2]
+    assert records[2]["error"]["kind"] == "UnsolvableEquationError"
+
+def testFilesAreClosed(tmp_path, monkeypatch):
+    opened = []
+    real_open = open
+
+    def recordingOpen(*args, **kwargs):
+        f = real_open(*args, **kwargs)
+        opened.append(f)
+        return f
+
+    monkeypatch.setattr("builtins.open", recordingOpen)
+    src = writeLines(tmp_path / "in.txt", ["H2 + O2 : H2O"])
+    assert cli.main([src, "-o", str(tmp_path / "out.txt")]) == 0
+    assert len(opened) == 2 and all(f.closed for f in opened)
+
+def testMissingFileIsAUsageError(tmp_path):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main([str(tmp_path / "missing.txt")])
+    assert exit_info.value.code == 2
@@ -0,0 +1,58 @@
+"""
+Tests of the stage timings and failure counters.
+"""
+import numpy as np
+import pytest
+import src.BCE as BCE
+
+def testStagesAreTimed():
+    with BCE.instrumented() as instruments:
+        BCE.balanceChemicalEquation("H2 + O2 : H2O")
+        BCE.balanceChemicalEquation("CH4 + O2 : CO2 + H2O")
+        BCE.BalanceResult("Fe + O2 : Fe2O3", memo=False).reduced_matrix
+    stages = instruments.snapshot().stages
+    assert stages["scan"].calls == 3 and stages["small"].calls == 2
+    assert stages["matrix"].shapes == {(2, 3): 1}
+    stats = stages["scan"]
+    assert 0 <= stats.p50 <= stats.p90 <= stats.p99 <= stats.max <= stats.total
+
+@pytest.mark.parametrize("equation, kind", [
+    ("H2 + O2 : H2z", "invalid"),
+    ("H2 : O2", "unsolvable"),
+])
+def testFailuresAreCounted(equation, kind):
+    with BCE.instrumented() as instruments:
+        with pytest.raises(BCE.BalancingError):
+            BCE.balanceChemicalEquation(equation)
+    assert instruments.snapshot().failures == {kind: 1}
+
+def testLimitsAreCounted():
+    with BCE.instrumented() as instruments, BCE.limited(BCE.ComplexityLimits(species=2)):
+        with pytest.raises(BCE.ComplexityError):
+            BCE.balanceChemicalEquation("H2 + O2 : H2O")
+    assert instruments.snapshot().failures == {"limit": 1}
+
+def testOverflowCountsRedoneReductions():
+    matrix = np.array([[2**40, 3, -1], [3, 2**40, -1]])
+    with BCE.instrumented() as instruments:
+        BCE.diophantineRowReduce(matrix)
+    assert instruments.snapshot().failures == {"overflow": 1}
+
+def testNoOverflowOnPythonIntegers():
+    with BCE.instrumented() as instruments:
+        values, exact = BCE.BalanceResult(f"C{2**40}O3 + C3O{2**40} : CO").solved
+    assert exact and "small" in instruments.snapshot().stages
+    assert "overflow" not in instruments.snapshot().failures
+
+def testDisabledInstrumentsRecordNothing():
+    with BCE.instrumented() as instruments:
+        BCE.enableInstruments(False)
+        try:
+            BCE.balanceChemicalEquation("H2 + O2 : H2O")
+        finally:
+            BCE.enableInstruments(True)
+    assert instruments.snapshot() == BCE.InstrumentSnapshot({}, {})
+
+def testWindowMustBePositive():
+    with pytest.raises(ValueError):
+        BCE.Instrumentation(0)
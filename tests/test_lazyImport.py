@@ -0,0 +1,28 @@
+"""
+Tests that small equations are balanced without importing NumPy.
+"""
+import subprocess
+import sys
+from pathlib import Path
+from src.methods.lazyImport import LazyModule
+
+ROOT = Path(__file__).resolve().parents[1]
+
+def importsNumpy(code):
+    check = f"import sys\n{code}\nprint('numpy' in sys.modules)"
+    run = subprocess.run([sys.executable, "-c", check], cwd=ROOT, capture_output=True, text=True, check=True)
+    return run.stdout.split()[-1] == "True"
+
+def testSmallEquationsDoNotImportNumpy():
+    assert not importsNumpy("import src.BCE as BCE\n"
+                            "assert BCE.balanceChemicalEquation('H2 + O2 : H2O') == '2 H2 + O2 : 2 H2O'\n"
+                            "assert BCE.balanceMany(['Fe + O2 : Fe2O3'], arrays=False)[0].coefficients == [4, 3, 2]")
+
+def testArraysImportNumpy():
+    assert importsNumpy("import src.BCE as BCE\nBCE.balanceMany(['H2 + O2 : H2O'])")
+
+def testLazyModuleKeepsAttributes():
+    module = LazyModule("json")
+    assert "dumps" not in vars(module)
+    assert module.dumps([1]) == "[1]"
+    assert "dumps" in vars(module)
@@ -0,0 +1,64 @@
+"""
+Tests of the complexity limits, in particular that cached solutions and terms are held to them.
+"""
+import pytest
+import src.BCE as BCE
+
+EQUATION = "C6H12O6 + O2 : CO2 + H2O"
+# Limits the equation exceeds, one at a time
+EXCEEDED = [("term_length", 3), ("species", 3), ("elements", 2), ("count_bits", 3)]
+
+def complexityError(equation):
+    """Balance an equation, returning the ComplexityError it raises as (limit, value, position, message)."""
+    with pytest.raises(BCE.ComplexityError) as raised:
+        BCE.balanceChemicalEquation(equation)
+    err = raised.value
+    return err.limit, err.value, err.position, str(err)
+
+@pytest.mark.parametrize("limit, bound", EXCEEDED)
+def testLimitsApplyToResultCacheHits(limit, bound):
+    limits = BCE.ComplexityLimits(**{limit: bound})
+    with BCE.limited(limits):
+        cold = complexityError(EQUATION)
+    assert cold[0] == limit
+    assert BCE.balanceChemicalEquation(EQUATION) == "C6H12O6 + 6 O2 : 6 CO2 + 6 H2O"
+    with BCE.limited(limits):
+        assert complexityError(EQUATION) == cold
+        # Reordered terms share the cached solution
+        assert complexityError("O2 + C6H12O6 : H2O + CO2")[0] == limit
+        outcome, = BCE.balanceMany([EQUATION], workers=1)
+        assert outcome.error.kind == "ComplexityError"
+
+@pytest.mark.parametrize("limits, equation", [
+    (BCE.ComplexityLimits(term_length=5), "K4Fe(CN)6 + H2O : CO2"),
+    (BCE.ComplexityLimits(depth=1), "Ca((OH))2 + H2 : H2O"),
+    (BCE.ComplexityLimits(depth=2), "A(B(C(D)2)3)4 : A + B + C + D"),
+])
+def testLimitsApplyToCachedTerms(limits, equation):
+    with BCE.limited(limits):
+        with pytest.raises(BCE.ComplexityError) as cold:
+            BCE.scanEquation(equation)
+    BCE.scanEquation(equation)
+    assert len(BCE.species_cache) > 0
+    with BCE.limited(limits):
+        with pytest.raises(BCE.ComplexityError) as warm:
+            BCE.scanEquation(equation)
+    assert (warm.value.limit, warm.value.value, warm.value.position, str(warm.value)) == \
+           (cold.value.limit, cold.value.value, cold.value.position, str(cold.value))
+
+def testCacheHitsWithinLimitsBalance():
+    BCE.balanceChemicalEquation(EQUATION)
+    with BCE.limited(BCE.ComplexityLimits(term_length=7, depth=1, species=4, elements=3, count_bits=4, seconds=1)):
+        assert BCE.balanceChemicalEquation(EQUATION) == "C6H12O6 + 6 O2 : 6 CO2 + 6 H2O"
+        assert BCE.BalanceResult(EQUATION).cached_solution is not None
+
+def testLimitsMustBePositive():
+    with pytest.raises(ValueError):
+        BCE.setLimits(BCE.ComplexityLimits(depth=0))
+
+def testCancelledSolveRaises():
+    token = BCE.CancelToken()
+    token.cancel()
+    result = BCE.BalanceResult(" + ".join(f"C{n}H{2 * n + 2}" for n in range(1, 20)) + " : CO2 + H2O", memo=False, token=token)
+    with pytest.raises(BCE.BalancingCancelledError):
+        result.values
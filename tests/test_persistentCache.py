@@ -0,0 +1,94 @@
+"""
+Tests of persistent result caches.
+"""
+import gc
+import pickle
+import pytest
+import src.BCE as BCE
+from src.methods import persistentCache
+
+EQUATION = "C6H12O6 + O2 : CO2 + H2O"
+KEY = (("H2", "O2"), ("H2O",))
+# Limits the equation exceeds, one at a time
+EXCEEDED = [("term_length", 3), ("species", 3), ("elements", 2), ("count_bits", 3)]
+
+def complexityError(equation):
+    """Balance an equation, returning the ComplexityError it raises as (limit, value, position, message)."""
+    with pytest.raises(BCE.ComplexityError) as raised:
+        BCE.balanceChemicalEquation(equation)
+    err = raised.value
+    return err.limit, err.value, err.position, str(err)
+
+def testSolutionsOutliveResultCache(tmp_path):
+    path = str(tmp_path / "results.db")
+    cache = BCE.PersistentCache(path)
+    BCE.setPersistentCache(cache)
+    assert BCE.balanceChemicalEquation("O2 + H2 : H2O") == "O2 + 2 H2 : 2 H2O"
+    cache.close()
+    BCE.result_cache.clear()
+    reopened = BCE.PersistentCache(path)
+    BCE.setPersistentCache(reopened)
+    assert reopened.get(KEY) == ([2, 1, 2], False)
+    assert BCE.balanceChemicalEquation("H2 + O2 : H2O") == "2 H2 + O2 : 2 H2O"
+    assert reopened.hits == 2 and reopened.misses == 0
+    reopened.close()
+
+def testWritesAreHeldBack(tmp_path):
+    cache = BCE.PersistentCache(str(tmp_path / "results.db"), batch_size=3, flush_interval=100)
+    cache.put(KEY, [2, 1, 2], False)
+    cache.put((("Fe", "O2"), ("Fe2O3",)), [4, 3, 2], False)
+    assert cache.get(KEY) == ([2, 1, 2], False)
+    assert cache.flush() == 2
+    assert cache.flush() == 0
+    assert len(cache) == 2
+    cache.close()
+
+def testEvictionKeepsNewest(tmp_path):
+    cache = BCE.PersistentCache(str(tmp_path / "results.db"), max_entries=2, batch_size=100, flush_interval=100)
+    for n in range(1, 5):
+        cache.put(((f"C{n}",), ("C",)), [1, n], False)
+        cache.flush()
+    assert len(cache) == 2
+    assert cache.get((("C1",), ("C",))) is None
+    assert cache.get((("C4",), ("C",))) == ([1, 4], False)
+    cache.close()
+
+def testPreloadFillsResultCache(tmp_path):
+    cache = BCE.PersistentCache(str(tmp_path / "results.db"))
+    cache.put(KEY, [2, 1, 2], False)
+    assert cache.preload(BCE.result_cache) == 1
+    assert BCE.result_cache.get(KEY) == ([2, 1, 2], False)
+    cache.close()
+
+@pytest.mark.parametrize("limit, bound", EXCEEDED)
+def testLimitsApplyToPersistentCacheHits(limit, bound, tmp_path):
+    cache = BCE.PersistentCache(str(tmp_path / "results.db"))
+    BCE.setPersistentCache(cache)
+    BCE.balanceChemicalEquation(EQUATION)
+    cache.flush()
+    BCE.result_cache.clear()
+    BCE.species_cache.clear()
+    with BCE.limited(BCE.ComplexityLimits(**{limit: bound})):
+        assert complexityError(EQUATION)[0] == limit
+    assert cache.hits == 1
+    cache.close()
+
+def testPersistentCachesAreNotKeptAlive(tmp_path):
+    cache = BCE.PersistentCache(str(tmp_path / "results.db"))
+    copies = [pickle.loads(pickle.dumps(cache)) for _ in range(3)]
+    assert len(persistentCache._open_caches) >= 4
+    del copies
+    gc.collect()
+    assert set(persistentCache._open_caches) == {cache}
+    cache.close()
+    assert len(persistentCache._open_caches) == 0
+
+def testDroppedPersistentCacheWritesHeldBackSolutions(tmp_path):
+    path = str(tmp_path / "results.db")
+    cache = BCE.PersistentCache(path, batch_size=100, flush_interval=100)
+    cache.put((("H2", "O2"), ("H2O",)), [2, 1, 2], False)
+    del cache
+    gc.collect()
+    reopened = BCE.PersistentCache(path)
+    assert reopened.get((("H2", "O2"), ("H2O",))) == ([2, 1, 2], False)
+    reopened.close()
@@ -0,0 +1,32 @@
+"""
+Tests of the precision tiers: results beyond int64 are promoted to Python integers, not wrapped.
+"""
+import numpy as np
+import pytest
+import src.BCE as BCE
+
+@pytest.mark.parametrize("value, fits", [(2**63 - 1, True), (-(2**63 - 1), True), (2**63, False), (-2**63, False)])
+def testFitsInt64(value, fits):
+    assert BCE.fitsInt64(value) is fits
+
+def testHelpersAreExact():
+    array = np.array([2**62, -(2**62) - 1, 3], dtype=np.int64)
+    assert BCE.maxAbs(array) == 2**62 + 1
+    assert BCE.maxAbs(np.zeros(0, dtype=np.int64)) == 0
+    assert BCE.exactLcm(np.array([2**40 + 1, 2**40 - 1])) == 2**80 - 1
+    exact = BCE.toExact(array.reshape(3, 1))
+    assert exact.dtype == object and exact.shape == (3, 1) and exact[0, 0] == 2**62
+
+@pytest.mark.parametrize("equation, tier", [
+    ("H2 + O2 : H2O", "int64"),
+    (f"H{2**70} + O2 : H2O", "exact"),
+    # Counts that fit int64 but whose products in the reduction do not
+    (f"C{2**40}O3 + C3O{2**40} : CO", "exact"),
+])
+def testCoefficientTier(equation, tier):
+    result = BCE.BalanceResult(equation, memo=False)
+    result.reduced_matrix
+    assert result.tier == tier
+    assert BCE.precisionTier(result.coefficients) == tier
+    assert BCE.verifyBalanced([(equation, result.values)]).balanced.all()
+    assert BCE.coefficientArray(result.values, tier == "exact").tolist() == result.coefficients.tolist()
@@ -0,0 +1,39 @@
+"""
+Tests of reaction networks and `balanceNetwork`.
+"""
+import pytest
+import src.BCE as BCE
+
+MECHANISM = ["CH4 + O2 : CO2 + H2O", "H2 + O2 : H2O", "CO + O2 : CO2", "CH4 + H2O : CO + H2"]
+
+def testSpeciesAreStoredOnce():
+    network = BCE.ReactionNetwork(MECHANISM)
+    assert len(network) == 4
+    assert network.species == ["CH4", "O2", "CO2", "H2O", "H2", "CO"]
+    assert network.elements == ["C", "H", "O"]
+    assert network.nnz == 10
+    assert network.sidesTerms(3) == (["CH4", "H2O"], ["CO", "H2"])
+
+def testSystemMatrixMatchesEquation():
+    network = BCE.ReactionNetwork(MECHANISM)
+    for reaction, equation in enumerate(MECHANISM):
+        assert network.systemMatrix(reaction).tolist() == BCE.BalanceResult(equation).system_matrix.tolist()
+
+def testBalanceNetworkMatchesSingleEquations():
+    equations = MECHANISM + ["Fe + O2 : Fe2O3"]
+    outcomes = BCE.balanceNetwork(equations)
+    assert [outcome.index for outcome in outcomes] == list(range(len(equations)))
+    for outcome, equation in zip(outcomes, equations):
+        assert outcome.error is None
+        assert outcome.balanced == BCE.balanceChemicalEquation(equation)
+
+def testBalanceNetworkReportsEachFailure():
+    outcomes = BCE.balanceNetwork(["H2 + O2 : H2O", "H2 + O2 : H2z", "H2 : O2", "Fe + O2 : Fe2O3"])
+    assert [outcome.coefficients is None for outcome in outcomes] == [False, True, True, False]
+    assert outcomes[1].error.kind == "InvalidEquationError"
+    assert outcomes[2].error.kind == "UnsolvableEquationError"
+    assert list(outcomes[3].coefficients) == [4, 3, 2]
+
+def testInvalidReactionIsNamed():
+    with pytest.raises(BCE.InvalidEquationError, match="^Reaction 1: "):
+        BCE.ReactionNetwork(["H2 + O2 : H2O", "H2 + O2 H2O"])
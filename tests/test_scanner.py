@@ -0,0 +1,115 @@
+"""
+Tests of the scanner: what it accepts, where it reports errors, and that caches never change its answer.
+"""
+import pytest
+import src.BCE as BCE
+
+# Invalid equations and the index of the offending character
+INVALID = [
+    ("H2 +\tO2 : H2O", 4),
+    ("H2 + O2 : H2O\n", 13),
+    ("H2 + O2 :\x0bH2O", 9),
+    ("H2 + O2 : H2z", None),
+    ("h2 + O2 : H2O", 0),
+    ("H2 + O2 : H2O : O", 14),
+    ("H2 + O2", 7),
+    ("H2 O2 : H2O", 2),
+    ("(H2 + O2 : H2O", 0),
+    ("H2) + O2 : H2O", 2),
+    (")H2( + O2 : H2O", 0),
+    ("(2H) + O2 : H2O", 1),
+    ("2H2 + O2 : H2O", 0),
+]
+
+def testScanSplitsAndCounts():
+    scanned = BCE.scanEquation("Ca3(PO4)2 + H2SO4 : CaSO4 + H3PO4")
+    assert scanned.sides_terms == (["Ca3(PO4)2", "H2SO4"], ["CaSO4", "H3PO4"])
+    assert scanned.sides_compositions[0][0] == {"Ca": 3, "P": 2, "O": 8}
+    assert scanned.atoms == ["Ca", "H", "O", "P", "S"]
+
+def testScanIgnoresSpacesAndEmptyTerms():
+    assert BCE.scanEquation("  H2  +  + O2 :H2O ").sides_terms == (["H2", "O2"], ["H2O"])
+
+@pytest.mark.parametrize("equation, position", INVALID)
+def testScanRejects(equation, position):
+    with pytest.raises(BCE.InvalidEquationError) as raised:
+        BCE.scanEquation(equation)
+    if position is not None:
+        assert raised.value.position == position
+
+@pytest.mark.parametrize("equation, position", INVALID)
+def testRejectedWhateverIsCached(equation, position):
+    # Warm both caches with every valid term, and the result cache with the valid equation
+    BCE.balanceChemicalEquation("H2 + O2 : H2O")
+    BCE.scanEquation("H2 + O2 + H2O + H : O")
+    with pytest.raises(BCE.InvalidEquationError) as raised:
+        BCE.balanceChemicalEquation(equation)
+    if position is not None:
+        assert raised.value.position == position
+    assert BCE.equationError(equation) is not None
+
+@pytest.mark.parametrize("equation", [
+    "Ca3(PO4)2 + SiO2 + C : CaSiO3 + P4 + CO",
+    "K4Fe(CN)6 + KMnO4 + H2SO4 : KHSO4 + Fe2(SO4)3 + MnSO4 + HNO3 + CO2 + H2O",
+    "H2O H2 : H",
+    "H2O(: H",
+])
+def testCachedTermsScanTheSame(equation):
+    def scan():
+        try:
+            return BCE.scanEquation(equation)
+        except BCE.InvalidEquationError as err:
+            return str(err), err.position
+    cold = scan()
+    assert scan() == cold
+
+def testScanUsesSpeciesCache():
+    BCE.balanceChemicalEquation("H2 + O2 : H2O")
+    assert BCE.species_cache.info().misses == 3
+    BCE.findBalancingCoefficients("H2O + O2 : H2O2")
+    info = BCE.species_cache.info()
+    assert (info.hits, info.misses) == (2, 4)
+
+def testOnlyValidTermsAreCached():
+    with pytest.raises(BCE.InvalidEquationError):
+        BCE.termSpecies("(2H)")
+    assert "(2H)" not in BCE.species_cache
+    with pytest.raises(BCE.InvalidEquationError):
+        BCE.scanEquation("(2H) : H2")
+
+@pytest.mark.parametrize("term", ["(2H)", "h2", "(H2", "H2 O", "H2\t", "Ca((OH)2"])
+def testTermErrorAgreesWithScanner(term):
+    assert BCE.termError(term) is not None
+    with pytest.raises(BCE.InvalidEquationError):
+        BCE.scanEquation(term + " : H")
+
+def testTermErrorRequiresOneTerm():
+    assert BCE.termError("Ca(OH)2") is None
+    assert BCE.termError("H2 + O2") is not None
+    assert BCE.termError("") is not None
+
+def testSideErrorAgreesWithScanner():
+    assert BCE.sideError("H2 + O2") is None
+    assert str(BCE.sideError("H2 + (2H)")) == str(BCE.termError("(2H)"))
+    assert BCE.sideError("H2 O2") is not None
+
+def testValidatorsLeaveCacheAlone(capsys):
+    assert BCE.validateChemicalEquation("H2 + O2 : H2O")
+    assert not BCE.validateSide("H2 + (2H)")
+    assert BCE.validateTerm("Ca(OH)2")
+    assert BCE.equationError("NaCl : Na + Cl2") is None
+    info = BCE.species_cache.info()
+    assert (info.hits, info.misses, info.currsize) == (0, 0, 0)
+    assert capsys.readouterr().out == ""
+
+def testValidatorErrorsCarryPositions():
+    error = BCE.equationError("H2 + O2 : H2z")
+    assert isinstance(error, BCE.InvalidEquationError) and error.position == 12
+
+@pytest.mark.parametrize("equation, error", [
+    ("H2 + O2 : H2z", BCE.InvalidEquationError),
+    ("H2 : O2", BCE.UnsolvableEquationError),
+])
+def testFindBalancingCoefficientsRaises(equation, error):
+    with pytest.raises(error):
+        BCE.findBalancingCoefficients(equation)
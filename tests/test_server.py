@@ -0,0 +1,72 @@
+"""
+Tests of the local balancing service.
+"""
+import asyncio
+import json
+import src.BCE as BCE
+from src import server
+
+def request(**fields):
+    return json.dumps(fields).encode() + b"\n"
+
+def testServiceCoalescesAndBatches():
+    async def run():
+        async with server.BalanceService(batch_size=8, batch_latency=0.01) as service:
+            outcomes = await asyncio.gather(*[service.balance(equation) for equation in
+                                              ["H2 + O2 : H2O", "H2 + O2 : H2O", "Fe + O2 : Fe2O3", "H2 : O2"]])
+            return outcomes, service.info()
+
+    outcomes, info = asyncio.run(run())
+    assert [outcome.coefficients for outcome in outcomes[:3]] == [[2, 1, 2], [2, 1, 2], [4, 3, 2]]
+    assert outcomes[3].error.kind == "UnsolvableEquationError"
+    assert info == server.ServiceInfo(requests=4, coalesced=1, batches=1, equations=3)
+
+def testRespondRejectsBadRequests():
+    async def run():
+        async with server.BalanceService() as service:
+            return [await server.respond(service, line) for line in (b"{", request(id=3, formula="H2"))]
+
+    for record in asyncio.run(run()):
+        assert record["error"]["kind"] == "BadRequest"
+
+def testFailedBatchIsAnswered(monkeypatch):
+    def failingChunk(start, equations, arrays=True):
+        raise MemoryError("no memory left")
+
+    monkeypatch.setattr(BCE, "balanceChunk", failingChunk)
+
+    async def run():
+        async with server.BalanceService() as service:
+            return await server.respond(service, request(id=1, equation="H2 + O2 : H2O"))
+
+    record = asyncio.run(run())
+    assert record["id"] == 1 and record["equation"] == "H2 + O2 : H2O"
+    assert record["error"] == {"kind": "MemoryError", "message": "no memory left"}
+
+def testBrokenExecutorIsAnswered():
+    async def run():
+        async with server.BalanceService() as service:
+            service._executor.shutdown()
+            return await asyncio.wait_for(server.respond(service, request(id=2, equation="H2 + O2 : H2O")), 5)
+
+    record = asyncio.run(run())
+    assert record["id"] == 2 and record["error"]["kind"] == "RuntimeError"
+
+def testServerAnswersOverTCP():
+    async def run():
+        async with server.BalanceService() as service:
+            listening = await server.startServer(service, port=0)
+            host, port = listening.sockets[0].getsockname()[:2]
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request(id="a", equation="CH4 + O2 : CO2 + H2O") + b"\n" + request(id="b", equation="H2 + O2 : H2z"))
+            await writer.drain()
+            replies = [json.loads(await reader.readline()) for _ in range(2)]
+            writer.close()
+            await writer.wait_closed()
+            listening.close()
+            await listening.wait_closed()
+            return {reply["id"]: reply for reply in replies}
+
+    replies = asyncio.run(run())
+    assert replies["a"]["balanced"] == "CH4 + 2 O2 : CO2 + 2 H2O"
+    assert replies["b"]["error"]["kind"] == "InvalidEquationError"
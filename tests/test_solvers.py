@@ -0,0 +1,116 @@
+"""
+Differential tests of the solvers: each must find the coefficients of the fraction-free path.
+
+The fraction-free path (`diophantineRowReduce`, `validateDRMat`, `extract_smallest_solution`) is
+the reference; the other solvers must agree with it, coefficient for coefficient, on the corpus
+and on synthetic equations of every scale.
+"""
+from math import gcd
+from pathlib import Path
+import numpy as np
+import pytest
+import src.BCE as BCE
+from benchmarks.generate import Scale, syntheticEquations
+
+CORPUS = [line.strip() for line in (Path(__file__).parent.parent / "benchmarks" / "corpus.txt").read_text().splitlines()
+          if line.strip() and not line.startswith("#")]
+SYNTHETIC = [equation for scale in (Scale(4, 3, 1, 10), Scale(8, 7, 2, 100), Scale(16, 15, 3, 1000), Scale(24, 23, 3, 1000))
+             for equation in syntheticEquations(8, scale, seed=1)]
+# Equations without a unique solution
+UNSOLVABLE = ["H2 + O2 : H2O + H2O2", "C + O2 : CO + CO2", "H2 : O2", "Fe + Cu : Fe + Cu"]
+
+def systemMatrix(equation):
+    """Return the system matrix of an equation."""
+    return BCE.equationToMatrix(BCE.processEquation(equation))
+
+def fractionFree(matrix):
+    """Solve a system matrix with the fraction-free reduction, or raise UnsolvableEquationError."""
+    reduced = BCE.removeZeroRows(BCE.diophantineRowReduce(matrix))
+    if not BCE.validateDRMat(reduced):
+        raise BCE.UnsolvableEquationError("Unsolvable")
+    return [int(value) for value in BCE.extract_smallest_solution(reduced)]
+
+@pytest.mark.parametrize("equation", CORPUS + SYNTHETIC)
+def testFractionFreeSolutionsBalance(equation):
+    matrix = systemMatrix(equation)
+    expected = fractionFree(matrix)
+    assert min(expected) > 0 and gcd(*expected) == 1
+    assert not (matrix @ np.array(expected, dtype=object)).any()
+    assert BCE.solveSystemMatrix(matrix).tolist() == expected
+
+def testFractionFreeRowsArePrimitive():
+    reduced = BCE.diophantineRowReduce(np.array([[4, 0, -2], [0, 6, -3]]))
+    assert reduced.tolist() == [[2, 0, -1], [0, 2, -1]]
+
+@pytest.mark.parametrize("equation", UNSOLVABLE)
+def testSolversRejectUnsolvable(equation):
+    matrix = systemMatrix(equation)
+    with pytest.raises(BCE.UnsolvableEquationError):
+        fractionFree(matrix)
+    with pytest.raises(BCE.UnsolvableEquationError):
+        BCE.solveSystemMatrix(matrix)
+
+def testBatchedSolverAgrees():
+    equations = CORPUS + SYNTHETIC
+    matrices = [systemMatrix(equation) for equation in equations]
+    solutions, needs_scalar = BCE.solveSystemMatrices(matrices, min_group=1)
+    assert not needs_scalar.all()
+    for matrix, solution in zip(matrices, solutions):
+        if solution is not None:
+            assert solution.tolist() == fractionFree(matrix)
+
+def testBatchedSolverFlagsUnsolvable():
+    matrices = [systemMatrix(equation) for equation in UNSOLVABLE for _ in range(2)]
+    solutions, needs_scalar = BCE.solveSystemMatrices(matrices)
+    assert solutions == [None] * len(matrices) and needs_scalar.all()
+
+def testBatchRunsUnderTimeLimit():
+    equations = CORPUS + SYNTHETIC
+    with BCE.limited(BCE.ComplexityLimits(seconds=1e-9)):
+        outcomes = BCE.balanceMany(equations, workers=1)
+    assert {outcome.error.kind for outcome in outcomes} == {"BalancingTimeoutError"}
+
+@pytest.mark.parametrize("equation", CORPUS + SYNTHETIC)
+def testSmallSolverAgrees(equation):
+    matrix = systemMatrix(equation)
+    if matrix.shape[1] > BCE.SMALL_SYSTEM_LIMIT:
+        pytest.skip("solved with NumPy")
+    values, exact = BCE.smallSystemSolution(matrix.tolist())
+    assert values == fractionFree(matrix)
+    assert exact == (BCE.solveSystemMatrix(matrix).dtype == object)
+
+@pytest.mark.parametrize("equation", UNSOLVABLE)
+def testSmallSolverRejectsUnsolvable(equation):
+    with pytest.raises(BCE.UnsolvableEquationError):
+        BCE.smallSystemSolution(systemMatrix(equation).tolist())
+
+def testOverflowingCountsStayExact():
+    equation = f"H{2**70} + O2 : H2O"
+    matrix = systemMatrix(equation)
+    assert matrix.dtype == object
+    assert BCE.smallSystemSolution(matrix.tolist()) == ([1, 2**68, 2**69], True)
+    assert BCE.solveSystemMatrix(matrix).tolist() == fractionFree(matrix) == [1, 2**68, 2**69]
+
+@pytest.mark.parametrize("equation", CORPUS + SYNTHETIC)
+def testModularSolverAgrees(equation):
+    matrix = systemMatrix(equation)
+    modular = BCE.solveModular(matrix)
+    if modular is None:
+        pytest.skip("left to the fraction-free path")
+    assert modular.tolist() == fractionFree(matrix)
+
+@pytest.mark.parametrize("equation", UNSOLVABLE)
+def testModularSolverRejectsUnsolvable(equation):
+    # Systems with larger kernels are left to the fraction-free path, which rejects them
+    try:
+        assert BCE.solveModular(systemMatrix(equation)) is None
+    except BCE.UnsolvableEquationError:
+        pass
+
+def testLargeEquationsUseModularSolver():
+    equations = [equation for equation in SYNTHETIC if sum(map(len, BCE.scanEquation(equation).sides_terms)) >= BCE.MODULAR_SYSTEM_LIMIT]
+    assert equations
+    with BCE.instrumented() as instruments:
+        for equation in equations:
+            assert BCE.findBalancingCoefficients(equation).tolist() == fractionFree(systemMatrix(equation))
+    assert instruments.snapshot().stages["modular"].calls == len(equations)
@@ -0,0 +1,55 @@
+"""
+Tests of interned, packed species and the matrices built from them.
+"""
+import numpy as np
+import pytest
+import src.BCE as BCE
+
+EQUATIONS = [
+    "Ca3(PO4)2 + SiO2 + C : CaSiO3 + P4 + CO",
+    "K4Fe(CN)6 + KMnO4 + H2SO4 : KHSO4 + Fe2(SO4)3 + MnSO4 + HNO3 + CO2 + H2O",
+    "Xy2 + O2 : Xy2O",
+    f"H{2**70} + O2 : H2O",
+]
+
+def testSpeciesPacksCounts():
+    species = BCE.Species("Ca3(PO4)2", {"Ca": 3, "P": 2, "O": 8})
+    assert len(species) == 3 and isinstance(species.data, bytes)
+    assert species.composition() == {"Ca": 3, "P": 2, "O": 8}
+    assert [BCE.element_table.symbol(element_id) for element_id in species.elementIds()] == ["Ca", "P", "O"]
+    assert BCE.Species.fromRecords("Ca3(PO4)2", species.data).composition() == species.composition()
+
+def testSpeciesKeepsLargeCountsExact():
+    species = BCE.Species("H", {"H": 2**70})
+    assert species.counts().tolist() == [2**70]
+    assert species.composition() == {"H": 2**70}
+
+def testPeriodicTableIdsAreFixed():
+    assert [BCE.element_table.intern(symbol) for symbol in ("H", "He", "O", "Og")] == [0, 1, 7, 117]
+
+@pytest.mark.parametrize("equation", EQUATIONS)
+def testMatricesFromSpecies(equation):
+    scanned = BCE.scanEquation(equation)
+    expected = BCE.equationToMatrix(BCE.processEquation(equation))
+    matrix = BCE.speciesToMatrix(scanned.atoms, scanned.sides_species)
+    assert matrix.dtype == expected.dtype and matrix.tolist() == expected.tolist()
+    assert BCE.speciesRows(scanned.atoms, scanned.sides_species) == expected.tolist()
+    assert BCE.compositionsToMatrix(scanned.atoms, scanned.sides_compositions).tolist() == expected.tolist()
+
+@pytest.mark.parametrize("equation", EQUATIONS)
+def testCachedSpeciesAreCarriedThrough(equation):
+    cold = BCE.scanEquation(equation)
+    warm = BCE.scanEquation(equation)
+    assert warm.atoms == cold.atoms and warm.sides_terms == cold.sides_terms
+    for term, species in zip(warm.sides_terms[0] + warm.sides_terms[1], warm.sides_species[0] + warm.sides_species[1]):
+        assert species is BCE.species_cache.get(term)
+
+def testSpeciesSymbols():
+    species = [BCE.termSpecies("H2SO4"), BCE.termSpecies("NaCl"), BCE.Species("H", {"H": 2**70})]
+    assert BCE.speciesSymbols(species) == {"H", "S", "O", "Na", "Cl"}
+    assert BCE.speciesSymbols([]) == set()
+
+def testSpeciesMatrixScattersColumns():
+    species = [BCE.termSpecies("H2O"), BCE.termSpecies("O2")]
+    assert BCE.speciesMatrix(["H", "O"], species).tolist() == [[2, 0], [1, 2]]
+    assert BCE.speciesMatrix(["H", "N", "O"], species).dtype == np.int64
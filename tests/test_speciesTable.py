@@ -0,0 +1,40 @@
+"""
+Tests of species tables and the scanner's use of them.
+"""
+import pytest
+import src.BCE as BCE
+
+def compile(tmp_path, formulas):
+    path = str(tmp_path / "species.table")
+    BCE.compileSpeciesTable(formulas, path)
+    return BCE.SpeciesTable(path)
+
+def testCompilingLeavesSpeciesCacheEmpty(tmp_path):
+    compile(tmp_path, ["H2", "O2", "H2O", "K4Fe(CN)6"])
+    assert BCE.species_cache.info().currsize == 0
+
+def testTableMatchesScanner(tmp_path):
+    formulas = ["H2O", "K4Fe(CN)6", "(NH4)2SO4", "C6H12O6", "H2O", "Xx3Yy"]
+    table = compile(tmp_path, formulas)
+    assert len(table) == 5
+    for formula in formulas:
+        assert table.get(formula).composition() == BCE.scanTerm(formula, cache=False)
+    assert table.get("NaCl") is None
+
+def testInvalidFormulaIsRejected(tmp_path):
+    with pytest.raises(BCE.InvalidEquationError, match="H2 \\+ O2"):
+        compile(tmp_path, ["H2O", "H2 + O2"])
+
+def testScannerReadsSpeciesTable(tmp_path):
+    table = compile(tmp_path, ["H2", "O2", "H2O"])
+    looked_up = []
+
+    class RecordingTable:
+        def get(self, formula, default=None):
+            looked_up.append(formula)
+            return table.get(formula, default)
+
+    BCE.setSpeciesTable(RecordingTable())
+    assert BCE.balanceChemicalEquation("H2 + O2 : H2O") == "2 H2 + O2 : 2 H2O"
+    assert looked_up == ["H2", "O2", "H2O"]
+    assert BCE.species_cache.info().currsize == 3
@@ -0,0 +1,71 @@
+"""
+Tests of step tracing and its sinks.
+"""
+import json
+import threading
+import numpy as np
+import src.BCE as BCE
+
+def testTraceRecordsSteps():
+    sink = BCE.ListSink()
+    with BCE.tracing(sink):
+        BCE.balanceChemicalEquation("H2 + O2 : H2O")
+        try:
+            BCE.balanceChemicalEquation("H2 : O2")
+        except BCE.UnsolvableEquationError:
+            pass
+    solved, unsolvable = sink.traces
+    assert solved.matrix.tolist() == [[2, 0, -2], [0, 2, -1]]
+    assert solved.reduced_matrix.tolist() == [[1, 0, -1], [0, 2, -1]]
+    assert solved.coefficients.tolist() == [2, 1, 2]
+    assert solved.balanced == "2 H2 + O2 : 2 H2O" and solved.error is None
+    assert unsolvable.coefficients is None and unsolvable.error.startswith("Unsolvable")
+    assert unsolvable.reduced_matrix is not None
+
+def testTracingKeepsTheSolver():
+    with BCE.instrumented() as instruments, BCE.tracing(BCE.ListSink()):
+        BCE.balanceChemicalEquation("CH4 + O2 : CO2 + H2O")
+    assert "small" in instruments.snapshot().stages
+
+def testSampledTracing():
+    sink = BCE.ListSink()
+    with BCE.tracing(sink, rate=0.0):
+        BCE.balanceChemicalEquation("H2 + O2 : H2O")
+    assert sink.traces == []
+
+def recordFromThreads(sink, threads=8, records=50):
+    trace = BCE.stepTrace(BCE.BalanceResult("Fe + O2 : Fe2O3"))
+
+    def record():
+        for _ in range(records):
+            sink.record(trace)
+
+    workers = [threading.Thread(target=record) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    sink.close()
+    return threads * records
+
+def testJSONLSinkSharedByThreads(tmp_path):
+    path = tmp_path / "steps.jsonl"
+    recorded = recordFromThreads(BCE.JSONLSink(str(path)))
+    lines = path.read_text().splitlines()
+    assert len(lines) == recorded
+    assert all(json.loads(line)["coefficients"] == [4, 3, 2] for line in lines)
+
+def testNpzSinkSharedByThreads(tmp_path):
+    path = str(tmp_path / "steps.npz")
+    recorded = recordFromThreads(BCE.NpzSink(path), threads=4, records=10)
+    with np.load(path) as archive:
+        assert len(archive.files) == recorded * 5
+        assert archive[f"{recorded - 1}/coefficients"].tolist() == [4, 3, 2]
+
+def testNpzSinkKeepsExactIntegers(tmp_path):
+    path = str(tmp_path / "steps.npz")
+    sink = BCE.NpzSink(path)
+    sink.record(BCE.stepTrace(BCE.BalanceResult(f"H{2**70} + O2 : H2O")))
+    sink.close()
+    with np.load(path) as archive:
+        assert [int(value) for value in archive["0/coefficients"]] == [1, 2**68, 2**69]
@@ -0,0 +1,60 @@
+"""
+Tests of `validateDRMat` and `removeZeroRows` against the conditions they check, row by row.
+"""
+import itertools
+import numpy as np
+import pytest
+import src.BCE as BCE
+
+def rowByRow(matrix):
+    """
+    Check a reduced matrix one row at a time: row i has a positive pivot in column i, its
+    last element and nothing else, for each of the first m-1 rows; any further rows are zero.
+    """
+    rows = [list(row) for row in matrix]
+    k = len(rows[0]) - 1 if rows else 0
+    if len(rows) < k:
+        return False
+    for idx, row in enumerate(rows):
+        nonzero = [col for col, value in enumerate(row) if value]
+        if idx < k and (nonzero != [idx, k] or row[idx] < 0):
+            return False
+        if idx >= k and nonzero:
+            return False
+    return True
+
+@pytest.mark.parametrize("matrix, valid", [
+    ([[2, -1]], True),
+    ([[2, 0, -1], [0, 3, -2]], True),
+    ([[2, 0, -1], [0, 3, -2], [0, 0, 0]], True),
+    ([[1, 1, 0]], False),
+    ([[1, 0, 1], [0, 0, 0], [0, 1, 1]], False),
+    ([[-2, 0, 1], [0, 3, -2]], False),
+    ([[0, 3, -2], [2, 0, -1]], False),
+    ([[2, 0, 0], [0, 3, -2]], False),
+    ([[2, 1, -1], [0, 3, -2]], False),
+])
+def testKnownMatrices(matrix, valid):
+    assert BCE.validateDRMat(np.array(matrix)) is valid
+    assert BCE.validateDRMat(np.array(matrix, dtype=object)) is valid
+    assert rowByRow(matrix) is valid
+
+def testAgreesRowByRow():
+    rng = np.random.default_rng(1)
+    for rows, cols in itertools.product(range(1, 5), range(2, 5)):
+        for _ in range(300):
+            matrix = rng.choice([-1, 0, 0, 0, 1, 2], size=(rows, cols))
+            if rng.random() < 0.5:
+                # Mostly valid: a positive diagonal, the last column and a few perturbations
+                k = cols - 1
+                matrix[:] = 0
+                matrix[:min(rows, k), :k][np.diag_indices(min(rows, k))] = rng.integers(1, 4, min(rows, k))
+                matrix[:min(rows, k), k] = rng.integers(-3, 0, min(rows, k))
+                matrix[rng.integers(rows), rng.integers(cols)] += rng.integers(-1, 2)
+            assert BCE.validateDRMat(matrix) == rowByRow(matrix), matrix
+
+def testRemoveZeroRowsKeepsOrder():
+    matrix = np.array([[0, 0, 0], [2, 0, -1], [0, 0, 0], [0, 3, -2]])
+    assert BCE.removeZeroRows(matrix).tolist() == [[2, 0, -1], [0, 3, -2]]
+    nonzero = np.array([[2, 0, -1], [0, 3, -2]])
+    assert BCE.removeZeroRows(nonzero) is nonzero
@@ -0,0 +1,52 @@
+"""
+Tests of the bulk verifier of balanced equations.
+"""
+import src.BCE as BCE
+
+def testChecksEachPair():
+    report = BCE.verifyBalanced([
+        ("H2 + O2 : H2O", [2, 1, 2]),
+        ("H2 + O2 : H2O", [4, 2, 4]),
+        ("H2 + O2 : H2O", [1, 1, 1]),
+        ("Fe + O2 : Fe2O3", [-4, -3, -2]),
+        ("CH4 + O2 : CO2 + H2O", [1, 2, 1, 2]),
+    ])
+    assert report.balanced.tolist() == [True, True, False, True, True]
+    assert report.minimal.tolist() == [True, False, True, True, True]
+    assert report.positive.tolist() == [True, True, True, False, True]
+    assert report.errors == {}
+
+def testUncheckablePairsHaveErrors():
+    report = BCE.verifyBalanced([("H2 + O2 : H2O", [2, 1]), ("H2 + O2 H2O", [1, 1]), ("H2 + O2 : H2z", [1, 1, 1]),
+                                 ("H2 + O2 : H2O", [2.0, 1, 2]), ("H2 + O2 : H2O", [2, 1, 2])])
+    assert sorted(report.errors) == [0, 1, 2, 3]
+    assert isinstance(report.errors[2], BCE.InvalidEquationError)
+    assert report.balanced.tolist() == [False, False, False, False, True]
+
+def testChunksAgreeWithOneChunk():
+    pairs = [(equation, BCE.BalanceResult(equation).values) for equation in
+             ["H2 + O2 : H2O", "Fe + O2 : Fe2O3", "K4Fe(CN)6 + KMnO4 + H2SO4 : KHSO4 + Fe2(SO4)3 + MnSO4 + HNO3 + CO2 + H2O"]]
+    pairs += [(equation, [2 * coef for coef in coefs]) for equation, coefs in pairs]
+    whole, chunked = BCE.verifyBalanced(pairs), BCE.verifyBalanced(pairs, chunksize=2)
+    for field in ("balanced", "minimal", "positive"):
+        assert getattr(whole, field).tolist() == getattr(chunked, field).tolist()
+    assert whole.balanced.all() and whole.minimal.tolist() == [True] * 3 + [False] * 3
+
+def testLargeValuesAreCheckedExactly():
+    report = BCE.verifyBalanced([
+        (f"C{2**70}O2 : C + O2", [1, 2**70, 1]),
+        (f"C{2**70}O2 : C + O2", [1, 2**70 + 1, 1]),
+        ("C + O2 : CO2", [2**62, 2**62, 2**62]),
+        ("C + O2 : CO2", [2**62, 2**62, 2**62 - 1]),
+    ])
+    assert report.balanced.tolist() == [True, False, True, False]
+    assert report.minimal.tolist() == [True, True, False, True]
+
+def testTermsAreCachedAsSpecies():
+    BCE.verifyBalanced([("H2 + O2 : H2O", [2, 1, 2])])
+    assert BCE.species_cache.get("H2O").composition() == {"H": 2, "O": 1}
+    assert BCE.species_cache.info().currsize == 3
+
+def testEmptyInput():
+    report = BCE.verifyBalanced([])
+    assert len(report.balanced) == 0 and report.errors == {}